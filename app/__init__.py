@@ -1,21 +1,27 @@
-from flask import Flask
+from flask import Flask, request
 from flask_cors import CORS
 import os
-from dotenv import load_dotenv
 import logging
-from app.routes.search import bp
+from app.routes.search import bp, get_service
 from app.config import Config
+from src.core.scheduler import client_var, client_identity
+from src.core.metrics import register_flask
+from src.core.preload import warm_templates
+from src.core.delivery import install_delivery
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
-
 def create_app(test_config=None):
-    """Create and configure the Flask application."""
+    """
+    Create and configure the Flask application.
+
+    Everything a worker needs is built here, so with gunicorn --preload the
+    workers fork from a fully warmed parent.
+    """
     app = Flask(__name__, instance_relative_config=True)
+    Config.log_status()
     
     # Configure the app
     app.config.from_mapping(
@@ -42,6 +48,14 @@ def create_app(test_config=None):
 
     # Register blueprints
     app.register_blueprint(bp)
+    register_flask(app)
+    # Pages and static files are served prebuilt and precompressed; large JSON is compressed
+    delivery = install_delivery(app, pages=('index.html', 'terms.html'))
+
+    @app.before_request
+    def tag_client():
+        # Upstream admission queues fairly per end client
+        client_var.set(client_identity(request.headers.get('X-Forwarded-For'), request.remote_addr))
 
     # Register error handlers
     @app.errorhandler(404)
@@ -52,4 +66,9 @@ def create_app(test_config=None):
     def internal_error(error):
         return {'error': 'Internal server error'}, 500
 
+    # Warm the service, templates and prebuilt pages once, before any worker forks
+    get_service()
+    warm_templates(app)
+    delivery.build()
+
     return app 
\ No newline at end of file
@@ -0,0 +1,27 @@
+"""
+ASGI entry point for the app package.
+
+Run with `uvicorn app.asgi:application` or
+`gunicorn app.asgi:application -k uvicorn.workers.UvicornWorker`.
+/api/search runs directly on the server's event loop; pages are served by create_app().
+"""
+
+from app import create_app
+from app.routes.search import handle_search
+from src.core.asgi import AsyncRouter
+from src.core.http_pool import get_shared_pool
+from src.core.settings import getenv
+
+application = AsyncRouter(factory=create_app)
+application.route("/api/search")(handle_search)
+
+
+@application.on_startup
+async def warm_upstream():
+    if getenv("UPSTREAM_WARMUP", "1").lower() in ("1", "true", "yes"):
+        await get_shared_pool().warmup()
+
+
+@application.on_shutdown
+async def close_upstream():
+    await get_shared_pool().aclose()
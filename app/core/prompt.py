@@ -1,4 +1,5 @@
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
+from src.utils.matcher import KeywordMatcher
 
 category_map = {
     "price": {
@@ -16,13 +17,13 @@ category_map = {
     }
 }
 
+_matcher = KeywordMatcher(category_map)
+
 def detect_category(prompt: str) -> Optional[Tuple[str, str]]:
-    lowered = prompt.lower()
-    for category, config in category_map.items():
-        for kw in config["keywords"]:
-            if kw in lowered:
-                return category, config["template"]
-    return None
+    category = _matcher.match(prompt)
+    if category is None:
+        return None
+    return category, _matcher.templates[category]
 
 def build_prompt(user_input: str) -> str:
     result = detect_category(user_input)
@@ -79,13 +80,16 @@ If the query is unclear or unsafe, return a fallback response:
 
 Always respond in valid JSON format. Never output plain text or markdown."""
 
-DEFAULT_TIP = {
-    "role": "system",
-    "content": (
-        "💡 You should provide a category or description of what you're looking for to have a better experience.\n\n"
-        "**Examples:**\n"
-        "`price` – for product comparisons\n"
-        "`event` or `timetable` (Polish: kiedy gra / kiedy będzie) – for sports, music, or game schedules\n"
-        "`compare`, `define`, `summary`, `contact`, etc."
-    )
-} 
\ No newline at end of file
+def default_tip() -> Dict[str, str]:
+    """System tip asking for a category or description, as a fresh message dict."""
+    return {
+        "role": "system",
+        "content": (
+            "💡 You should provide a category or description of what you're looking for to have a better experience.\n\n"
+            "**Examples:**\n"
+            "`price` – for product comparisons\n"
+            "`event` or `timetable` (Polish: kiedy gra / kiedy będzie) – for sports, music, or game schedules\n"
+            "`compare`, `define`, `summary`, `contact`, etc."
+        )
+    }
+ 
\ No newline at end of file
@@ -1,42 +1,56 @@
-from flask import Blueprint, request, jsonify, render_template
+from functools import lru_cache
+from flask import Blueprint, Response, current_app, request, jsonify
 from app.services.openrouter_service import OpenRouterService
-import asyncio
-from app.services.search_service import search_service
+from src.core.loop import background_loop
+from src.core.capture import captured
+from src.core.metrics import REGISTRY, STAGE_SECONDS
 
 # Create a single blueprint for all routes
 bp = Blueprint('main', __name__)
-openrouter_service = OpenRouterService()
 
-@bp.route('/', methods=['GET'])
-def index():
-    return render_template('index.html')
-
-@bp.route('/terms')
-def terms():
-    return render_template('terms.html')
+@lru_cache(maxsize=None)
+def get_service() -> OpenRouterService:
+    """The process-wide search service, created on first use (or by create_app)."""
+    service = OpenRouterService()
+    REGISTRY.add_collector(service.collect_metrics)
+    return service
 
-@bp.route('/api/search', methods=['POST'])
-def search():
+@captured("/api/search")
+async def handle_search(data):
+    """Shared /api/search logic for the WSGI view and the ASGI entry point (app.asgi)."""
     try:
-        data = request.get_json()
         query = data.get('query', '').strip()
         
         if not query:
-            return jsonify({
+            return {
                 "error": "Query is required",
                 "suggestions": [{"text": "Please enter a search term", "category": "input"}]
-            }), 400
+            }, 400
 
-        # Run the async function in the event loop
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        response = loop.run_until_complete(openrouter_service.get_ai_response(query))
-        loop.close()
+        response = await get_service().get_ai_response(query)
         
-        return jsonify(response)
+        with STAGE_SECONDS.time("serialize"):
+            return response.to_json(), 200
 
     except Exception as e:
-        return jsonify({
+        return {
             "error": str(e),
             "suggestions": [{"text": "Try again", "category": "retry"}]
-        }), 500 
\ No newline at end of file
+        }, 500
+
+@bp.route('/', methods=['GET'])
+def index():
+    return current_app.extensions['delivery'].page('index.html')
+
+@bp.route('/terms')
+def terms():
+    return current_app.extensions['delivery'].page('terms.html')
+
+@bp.route('/api/search', methods=['POST'])
+def search():
+    # Run on the worker's long-lived loop so pooled connections are reused
+    payload, status = background_loop.run(handle_search(request.get_json(silent=True) or {}))
+    if isinstance(payload, bytes):
+        # Already serialized by the reply model
+        return Response(payload, status, mimetype='application/json')
+    return jsonify(payload), status
@@ -1,109 +1,183 @@
-import httpx
-import json
+import time
 import logging
+from typing import Iterator, Optional, Tuple
 from app.config import Config
+from src.core.http_pool import UpstreamPool
+from src.core.cache import ResponseCache, make_key
+from src.core.prefetch import Prefetcher
+from src.core.scheduler import client_var
+from src.core.capture import detach
+from src.core.singleflight import SingleFlight
+from src.core.backends import Backend, backend_from_env
+from src.core.engine import CompletionEngine, UpstreamError
+from app.services.structured_reply import StructuredReply, error_reply, fallback_reply, parse_structured_reply
+from src.core.metrics import ERRORS, STAGE_SECONDS, with_labels
+from src.core.settings import getenv
 
 logger = logging.getLogger(__name__)
 
+# Static, so it is built once and sent as the cacheable prefix of every search request
+SYSTEM_PROMPT = """You are a structured assistant that provides detailed information about products and topics.
+Analyze the query and provide information in the following JSON format:
+{
+    "mode": "product",
+    "name": "Main topic/product name",
+    "description": [
+        "Key point 1",
+        "Key point 2",
+        "Key point 3",
+        "Key point 4",
+        "Summary"
+    ],
+    "source_info": "Brief source information",
+    "suggestions": [
+        {"text": "Related topic 1", "category": "related"},
+        {"text": "Related topic 2", "category": "related"}
+    ],
+    "actions": [
+        {"type": "chat", "label": "Ask More", "query": "Related question"}
+    ]
+}
+
+Provide detailed information (up to 600 characters) and include suggestions.
+Always return valid JSON matching this structure.
+
+IMPORTANT: Use the suggestions as new keywords to generate a new response when clicked."""
+
+
+# Suggestion categories added by this service itself (not worth prefetching)
+SYSTEM_SUGGESTIONS = ("refinement", "retry", "input")
+
+
 class OpenRouterService:
-    def __init__(self):
-        self.api_key = Config.OPENROUTER_API_KEY
-        self.api_url = Config.OPENROUTER_API_URL
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "HTTP-Referer": "http://localhost:5000",
-            "X-Title": "Chaysh Search",
-            "Content-Type": "application/json"
-        }
-
-    async def get_ai_response(self, query: str) -> dict:
+    def __init__(self, pool: Optional[UpstreamPool] = None, backend: Optional[Backend] = None, use_cache: Optional[bool] = None):
+        self.inflight = SingleFlight()
+        self.backend = backend or backend_from_env(
+            pool,
+            extra_headers={"HTTP-Referer": "http://localhost:5000", "X-Title": "Chaysh Search"},
+            require_key=False
+        )
+        # Searches use the "search" chain from MODEL_CHAINS when configured
+        self.engine = CompletionEngine.from_env(self.backend, Config.DEFAULT_MODEL)
+        self.models = self.engine.models
+        if use_cache is None:
+            use_cache = getenv("CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+        self.cache = ResponseCache.from_env() if use_cache else None
+        # Optional (PREFETCH_ENABLED): warm the cache with each reply's suggestions, yielding to user traffic
+        self.prefetcher = None
+        if self.cache is not None:
+            self.prefetcher = Prefetcher.from_env(self._prefetch, self._key, lambda: self.engine.scheduler.queued > 0)
+
+    def _key(self, query: str) -> Tuple:
+        return make_key(query, "", None, self.models.models("search")[0])
+
+    async def get_ai_response(self, query: str) -> StructuredReply:
         try:
-            if not self.api_key:
+            if not self.backend.api_key and self.backend.name != "mock":
                 logger.error("API key is not configured")
                 return self._get_error_response("API key is not configured")
 
-            # Use Config settings for tokens
-            max_tokens = Config.MAX_TOKENS
-            char_limit = 600  # Limit the generated answer to 600 characters
-
-            system_prompt = f"""You are a structured assistant that provides detailed information about products and topics.\nAnalyze the query and provide information in the following JSON format:\n{{\n    \"mode\": \"product\",\n    \"name\": \"Main topic/product name\",\n    \"description\": [\n        \"Key point 1\",\n        \"Key point 2\",\n        \"Key point 3\",\n        \"Key point 4\",\n        \"Summary\"\n    ],\n    \"source_info\": \"Brief source information\",\n    \"suggestions\": [\n        {{\"text\": \"Related topic 1\", \"category\": \"related\"}},\n        {{\"text\": \"Related topic 2\", \"category\": \"related\"}}\n    ],\n    \"actions\": [\n        {{\"type\": \"chat\", \"label\": \"Ask More\", \"query\": \"Related question\"}}\n    ]\n}}\n\nProvide detailed information (up to 600 characters) and include suggestions.\nAlways return valid JSON matching this structure.\n\nIMPORTANT: Use the suggestions as new keywords to generate a new response when clicked."""
-
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": query}
-            ]
-
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.api_url,
-                    headers=self.headers,
-                    json={
-                        "model": Config.DEFAULT_MODEL,
-                        "messages": messages,
-                        "max_tokens": max_tokens,
-                        "temperature": 0.7
-                    }
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    ai_response = result['choices'][0]['message']['content']
-                    return self._format_response(ai_response, char_limit)
-                else:
-                    error_detail = response.text
-                    logger.error(f"API Error {response.status_code}: {error_detail}")
-                    return self._get_error_response(f"API Error {response.status_code}: {error_detail}")
+            key = self._key(query)
+            prefetched = self.prefetcher is not None and self.prefetcher.consumed(key)
+            reply = self.cache.get(key) if self.cache is not None else None
+            if reply is None:
+                # Identical concurrent queries share one upstream call (including a prefetch in flight)
+                reply, _ = await self.inflight.do(key, lambda: self._fetch_and_cache(query, key))
+            if prefetched and reply.mode != "error":
+                # A clicked suggestion: keep it for the normal TTL rather than the prefetch window
+                self._store(key, reply)
+            if self.prefetcher is not None and reply.mode != "error":
+                self.prefetcher.schedule(self._suggestion_queries(reply))
+            return reply
 
         except Exception as e:
+            ERRORS.inc("search")
             logger.error(f"Error in get_ai_response: {str(e)}")
             return self._get_error_response(f"Error: {str(e)}")
 
-    def _format_response(self, ai_response: str, char_limit: int = 600) -> dict:
+    async def _fetch_and_cache(self, query: str, key: Tuple, ttl: Optional[float] = None) -> Tuple[StructuredReply, int]:
+        reply, tokens = await self._fetch_ai_response(query)
+        if reply.mode != "error":
+            self._store(key, reply, ttl)
+        return reply, tokens
+
+    def _store(self, key: Tuple, reply: StructuredReply, ttl: Optional[float] = None) -> None:
+        if self.cache is not None:
+            self.cache.set(key, reply, size=len(reply.to_json()), ttl=ttl)
+
+    async def _prefetch(self, query: str) -> int:
+        """Fetch a suggestion into the cache (for ttl = the prefetch window); returns tokens used."""
+        key = self._key(query)
+        if key in self.cache:
+            return 0
+        # Queued as its own client, so the scheduler's round-robin never favours prefetches
+        client_var.set("prefetch")
+        detach()
+        _, tokens = await self.inflight.do(key, lambda: self._fetch_and_cache(query, key, self.prefetcher.window))
+        return tokens
+
+    @staticmethod
+    def _suggestion_queries(reply: StructuredReply) -> Iterator[str]:
+        # What a click submits (the suggestion text), skipping our own refine/retry hints
+        for suggestion in reply.suggestions:
+            if suggestion.get("category") not in SYSTEM_SUGGESTIONS:
+                yield suggestion.get("text", "")
+
+    async def _fetch_ai_response(self, query: str) -> Tuple[StructuredReply, int]:
+        # Use Config settings for tokens
+        max_tokens = Config.MAX_TOKENS
+        char_limit = 600  # Limit the generated answer to 600 characters
+
+        # The system prompt is part of the prebuilt envelope
+        messages = [{"role": "user", "content": query}]
+
         try:
-            # Try to parse the AI response as JSON
-            parsed_response = json.loads(ai_response)
-            
-            # Ensure all required fields are present
-            response = Config.RESPONSE_STRUCTURE.copy()
-            response.update(parsed_response)
-            
-            # Validate and clean up the response
-            if not isinstance(response['description'], list):
-                response['description'] = [response['description']]
-            # Limit each description entry to char_limit
-            response['description'] = [str(d)[:char_limit] for d in response['description']]
-            
-            if not isinstance(response['suggestions'], list):
-                response['suggestions'] = []
-            # Ensure each suggestion has a default action if none is provided
-            for suggestion in response['suggestions']:
-                if 'actions' not in suggestion:
-                    suggestion['actions'] = [{"type": "chat", "label": "Ask More", "query": suggestion.get('text', '')}]
-            
-            if not isinstance(response['actions'], list):
-                response['actions'] = []
-            
-            return response
-            
-        except json.JSONDecodeError:
+            model, (ai_response, tokens) = await self.engine.hedged(
+                "search", lambda model: self._request_completion(messages, model, max_tokens)
+            )
+        except UpstreamError as e:
+            ERRORS.inc("search_upstream")
+            logger.error(str(e))
+            return self._get_error_response(str(e)), 0
+        with STAGE_SECONDS.time("format"):
+            return self._format_response(ai_response, char_limit), tokens
+
+    async def _request_completion(self, messages: list, model: str, max_tokens: int) -> Tuple[str, int]:
+        envelope = self.engine.envelope(
+            (SYSTEM_PROMPT, max_tokens), model, SYSTEM_PROMPT, {"max_tokens": max_tokens, "temperature": 0.7}
+        )
+        started = time.perf_counter()
+        result = await self.engine.complete(model, envelope.encode(messages))
+        choice = result['choices'][0]
+        usage = result.get('usage') or {}
+        self.engine.count_tokens(model, "search", usage)
+        self.engine.record_reply("search", time.perf_counter() - started, usage, choice.get('finish_reason'))
+        return choice['message']['content'], usage.get('total_tokens') or 0
+
+    def collect_metrics(self):
+        """Metric families for the search cache, prefetching, coalescing and admission control."""
+        families = [
+            ("chaysh_inflight_shared_total", "counter", "Requests that joined an identical in-flight call", [({}, self.inflight.shared)])
+        ]
+        if self.cache is not None:
+            stats = self.cache.stats()
+            families.append(("chaysh_cache_entries", "gauge", "Entries in the response cache", [({}, stats["entries"])]))
+            families.append((
+                "chaysh_cache_events_total", "counter", "Response cache hits, misses, evictions and expirations",
+                [({"event": event}, stats[event]) for event in ("hits", "misses", "evictions", "expirations")]
+            ))
+        if self.prefetcher is not None:
+            families.extend(self.prefetcher.collect_metrics())
+        # The assistant reports the same families; the label keeps the series apart
+        return with_labels(families, service="search") + self.engine.collect_metrics("search")
+
+    def _format_response(self, ai_response: str, char_limit: int = 600) -> StructuredReply:
+        # Validate and normalize the JSON (bare, fenced or wrapped in prose) in one pass
+        reply = parse_structured_reply(ai_response, char_limit)
+        if reply is None:
             # If the response isn't valid JSON, create a structured response
-            return {
-                "mode": "product",
-                "name": "Response",
-                "description": [ai_response[:char_limit]],  # Limit to char_limit chars
-                "source_info": "AI Response",
-                "suggestions": [{"text": "Try a more specific query", "category": "refinement", "actions": [{"type": "chat", "label": "Ask More", "query": "Try a more specific query"}]}],
-                "actions": [{"type": "chat", "label": "Ask More", "query": ""}]
-            }
-        except Exception as e:
-            return self._get_error_response(f"Formatting Error: {str(e)}")
-
-    def _get_error_response(self, error_message: str) -> dict:
-        return {
-            "mode": "error",
-            "name": "Error",
-            "description": [error_message],
-            "source_info": "System Error",
-            "suggestions": [{"text": "Try again", "category": "retry"}],
-            "actions": [{"type": "retry", "label": "Retry", "query": ""}]
-        } 
\ No newline at end of file
+            reply = fallback_reply(ai_response, char_limit)
+        return reply
+
+    def _get_error_response(self, error_message: str) -> StructuredReply:
+        return error_reply(error_message)
@@ -0,0 +1,152 @@
+"""
+Schema for the structured /api/search reply.
+Validates the model's JSON straight from text with pydantic-core, normalizes it in one
+pass and serializes directly to response bytes. Defaults are copied per instance, so
+nothing shared is mutated.
+"""
+
+import re
+from typing import Any, List, Optional
+from typing_extensions import TypedDict
+from pydantic import BaseModel, ConfigDict, ValidationError, ValidationInfo, field_validator, model_validator
+
+DEFAULT_CHAR_LIMIT = 600
+
+# Opening code fence, e.g. ```json
+_FENCE = re.compile(r"```[a-zA-Z]*\s*")
+
+
+def _as_text(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+class Action(TypedDict, total=False):
+    __pydantic_config__ = ConfigDict(extra="allow", coerce_numbers_to_str=True)
+
+    type: str
+    label: str
+    query: str
+
+
+class Suggestion(TypedDict, total=False):
+    __pydantic_config__ = ConfigDict(extra="allow", coerce_numbers_to_str=True)
+
+    text: str
+    category: str
+    actions: List[Action]
+
+
+class StructuredReply(BaseModel):
+    """The reply shape requested from the model for /api/search."""
+
+    model_config = ConfigDict(extra="allow", coerce_numbers_to_str=True)
+
+    mode: str = "product"
+    name: Optional[str] = ""
+    description: List[str] = []
+    source_info: Optional[str] = ""
+    # Suggestions and actions stay plain dicts: cheaper to build and serialize than nested models
+    suggestions: List[Suggestion] = []
+    actions: List[Action] = []
+
+    @field_validator("description", mode="before")
+    @classmethod
+    def _as_list(cls, value: Any) -> Any:
+        if value is None:
+            return []
+        return value if isinstance(value, list) else [value]
+
+    @field_validator("suggestions", mode="before")
+    @classmethod
+    def _suggestion_dicts(cls, value: Any) -> Any:
+        if not isinstance(value, list):
+            return []
+        # A bare string is a suggestion's text
+        return [{"text": item} if isinstance(item, str) else item for item in value]
+
+    @field_validator("actions", mode="before")
+    @classmethod
+    def _list_or_empty(cls, value: Any) -> Any:
+        return value if isinstance(value, list) else []
+
+    @model_validator(mode="after")
+    def _normalize(self, info: ValidationInfo) -> "StructuredReply":
+        limit = (info.context or {}).get("char_limit", DEFAULT_CHAR_LIMIT)
+        if any(len(item) > limit for item in self.description):
+            self.description = [item[:limit] for item in self.description]
+
+        # Validation produced fresh dicts, so filling them in mutates nothing shared
+        for suggestion in self.suggestions:
+            if "actions" not in suggestion:
+                # Every suggestion is clickable: default to asking about its text
+                suggestion["actions"] = [{"type": "chat", "label": "Ask More", "query": suggestion.get("text", "")}]
+        return self
+
+    def to_json(self) -> bytes:
+        """Serialize to UTF-8 JSON bytes for the HTTP response."""
+        return self.__pydantic_serializer__.to_json(self)
+
+
+def extract_json(text: str) -> Optional[str]:
+    """
+    Locate the JSON object in a model reply.
+
+    Handles bare JSON, ```json fences and prose before or after the object.
+
+    Args:
+        text: Raw model output
+
+    Returns:
+        The candidate JSON object text, or None if there is no object
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    end = text.rfind("}")
+    if end < start:
+        return None
+    return text[start:end + 1]
+
+
+def parse_structured_reply(text: str, char_limit: int = DEFAULT_CHAR_LIMIT) -> Optional[StructuredReply]:
+    """
+    Validate a model reply against StructuredReply.
+
+    Args:
+        text: Raw model output
+        char_limit: Maximum characters per description entry
+
+    Returns:
+        The normalized reply, or None if it holds no valid JSON object
+    """
+    candidate = extract_json(text)
+    if candidate is None:
+        return None
+    try:
+        return StructuredReply.model_validate_json(candidate, context={"char_limit": char_limit})
+    except ValidationError:
+        return None
+
+
+def fallback_reply(text: str, char_limit: int = DEFAULT_CHAR_LIMIT) -> StructuredReply:
+    """Wrap a non-JSON model reply as a structured reply."""
+    # Drop a stray fence so it is not shown to the user
+    text = _FENCE.sub("", text).strip()
+    return StructuredReply(
+        name="Response",
+        description=[text[:char_limit]],
+        source_info="AI Response",
+        suggestions=[{"text": "Try a more specific query", "category": "refinement"}],
+        actions=[{"type": "chat", "label": "Ask More", "query": ""}]
+    )
+
+
+def error_reply(message: str) -> StructuredReply:
+    return StructuredReply(
+        mode="error",
+        name="Error",
+        description=[message],
+        source_info="System Error",
+        suggestions=[{"text": "Try again", "category": "retry", "actions": []}],
+        actions=[{"type": "retry", "label": "Retry", "query": ""}]
+    )
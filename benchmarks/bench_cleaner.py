@@ -0,0 +1,56 @@
+"""
+Micro-benchmark: clean_gpt_reply vs. the previous per-call regex implementation.
+
+Usage:
+    python -m benchmarks.bench_cleaner [--number N]
+"""
+
+import re
+import argparse
+import timeit
+from src.utils.cleaner import clean_gpt_reply
+
+
+def legacy_clean_gpt_reply(reply: str) -> str:
+    """The pre-compiled-cleaner implementation, kept verbatim for comparison."""
+    if not reply:
+        return ""
+    patterns = [
+        r"(Can you elaborate.*?|Would you like more.*?|What specific aspects.*?|Would you like me to.*?|Is there anything else.*?)$",
+        r"(Let me know if you need.*?|Feel free to ask.*?|I'm here to help.*?)$",
+        r"(Would you like to know.*?|Do you want me to.*?|Should I.*?)$",
+        r"(I hope this helps.*?|Let me know if.*?|Please let me know.*?)$"
+    ]
+    cleaned = reply
+    for pattern in patterns:
+        cleaned = re.sub(pattern, "", cleaned, flags=re.IGNORECASE | re.DOTALL)
+    return cleaned.strip()
+
+
+SENTENCE = "The iPhone 16 adds a faster A18 chip, a camera control button and better battery life. "
+
+CASES = {
+    "short": "Rust is a systems programming language focused on safety and speed. I hope this helps!",
+    "long (600 tokens)": SENTENCE * 28 + "Let me know if you need more details.",
+    "very long (20k chars)": SENTENCE * 230 + "Would you like me to compare it with the Pixel 9?",
+    "adversarial prefixes": "Let me know i" * 2000 + " done.",
+    "adversarial markers": ("Should I " + SENTENCE) * 200,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000, help="calls per measurement")
+    args = parser.parse_args()
+
+    print(f"{'case':<24}{'chars':>8}{'legacy us':>12}{'current us':>12}{'speedup':>10}")
+    for name, text in CASES.items():
+        legacy = min(timeit.repeat(lambda: legacy_clean_gpt_reply(text), number=args.number, repeat=3))
+        current = min(timeit.repeat(lambda: clean_gpt_reply(text), number=args.number, repeat=3))
+        legacy_us = legacy / args.number * 1e6
+        current_us = current / args.number * 1e6
+        print(f"{name:<24}{len(text):>8}{legacy_us:>12.2f}{current_us:>12.2f}{legacy_us / current_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Micro-benchmarks for the pure-Python work done on every request.
+
+Covers category detection, prompt building, reply cleaning, table formatting and
+structured-reply formatting over realistic and worst-case inputs.
+
+Usage:
+    python -m benchmarks.bench_hotpath [--filter clean] [--json results.json]
+    python -m benchmarks.bench_hotpath --compare baseline.json [--threshold 0.10]
+"""
+
+import os
+import sys
+import json
+import time
+import timeit
+import argparse
+import platform
+from typing import Callable, Dict, List, Tuple
+
+os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+
+from src.prompt_categories import category_map, detect_category
+from src.utils.cleaner import clean_gpt_reply, format_table_response
+from src.core.assistant import Assistant
+from src.core.fingerprint import NearDuplicateIndex, normalize
+from app.services.openrouter_service import OpenRouterService
+
+SENTENCE = "The iPhone 16 adds a faster A18 chip, a camera control button and better battery life. "
+POLISH = "Jaka będzie pogoda w Łodzi i Gdańsku w przyszłym tygodniu? Zażółć gęślą jaźń. "
+ALL_KEYWORDS = " ".join(kw for info in category_map.values() for kw in info["keywords"])
+
+TABLE = "| Feature | iPhone 16 | Pixel 9 |\n|---|---|---|\n" + "| Chip | A18 | Tensor G4 |\n" * 20
+
+STRUCTURED = json.dumps({
+    "mode": "product",
+    "name": "iPhone 16",
+    "description": [SENTENCE] * 5,
+    "source_info": "Apple",
+    "suggestions": [{"text": f"Related {i}", "category": "related"} for i in range(8)],
+    "actions": [{"type": "chat", "label": "Ask More", "query": "iPhone 16 camera"}]
+})
+
+FENCED = "Here is the information you asked for:\n```json\n" + STRUCTURED + "\n```\nLet me know if you need more."
+
+
+def _context(turns: int) -> List[Dict[str, str]]:
+    context = []
+    for i in range(turns):
+        context.append({"role": "user", "content": f"Question {i}: " + SENTENCE})
+        context.append({"role": "assistant", "content": SENTENCE * 6})
+    return context
+
+
+def build_cases() -> List[Tuple[str, Callable[[], object]]]:
+    # No cache tiers: every case measures the uncached path
+    assistant = Assistant(use_cache=False)
+    service = OpenRouterService(use_cache=False)
+    long_context = _context(20)
+    messages = [{"role": "system", "content": assistant.system_prompts["en"]}, *long_context]
+    index = NearDuplicateIndex()
+    for i in range(2048):
+        scope, fingerprint = index.sketch(f"Question {i}: " + SENTENCE, ("en", None, "model"))
+        index.add(i, scope, fingerprint)
+    return [
+        ("detect_category/short", lambda: detect_category("compare iphone 16 and pixel 9")),
+        ("detect_category/no match", lambda: detect_category(SENTENCE * 3)),
+        ("detect_category/all keywords", lambda: detect_category(ALL_KEYWORDS)),
+        ("detect_category/polish", lambda: detect_category(POLISH * 4)),
+        ("detect_category/long prompt", lambda: detect_category(SENTENCE * 40 + " weather")),
+        ("normalize/polish", lambda: normalize(POLISH)),
+        ("near-duplicate lookup/2048 entries", lambda: index.find(*index.sketch("Questoin 7: " + SENTENCE, ("en", None, "model")))),
+        ("build_prompt/no context", lambda: assistant.build_prompt("price of iphone 16")),
+        ("build_prompt/polish", lambda: assistant.build_prompt(POLISH)),
+        ("build_prompt/40-message context", lambda: assistant.build_prompt("and the pixel?", long_context)),
+        ("_request_body/40-message context", lambda: assistant._request_body(messages, None, assistant.model)),
+        ("clean_gpt_reply/short", lambda: clean_gpt_reply("Rust is fast and safe. I hope this helps!")),
+        ("clean_gpt_reply/600 tokens", lambda: clean_gpt_reply(SENTENCE * 28 + "Let me know if you need more.")),
+        ("clean_gpt_reply/20k chars", lambda: clean_gpt_reply(SENTENCE * 230 + "Should I compare it?")),
+        ("clean_gpt_reply/adversarial", lambda: clean_gpt_reply("Let me know i" * 2000 + " done.")),
+        ("format_table_response/table", lambda: format_table_response(TABLE)),
+        ("format_table_response/prose", lambda: format_table_response(SENTENCE * 28)),
+        # Measured through serialization to the response bytes
+        ("_format_response+to_json/structured", lambda: service._format_response(STRUCTURED).to_json()),
+        ("_format_response+to_json/prose", lambda: service._format_response(SENTENCE * 10).to_json()),
+        ("_format_response+to_json/fenced", lambda: service._format_response(FENCED).to_json()),
+    ]
+
+
+def measure(func: Callable[[], object], min_time: float) -> Dict[str, float]:
+    """Best-of-5 time per call, with the loop count chosen so each run takes >= min_time."""
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time:
+            break
+        number *= 2
+    best = min(timer.repeat(repeat=5, number=number)) / number
+    return {"us_per_call": round(best * 1e6, 3), "calls": number}
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline_path: str, threshold: float) -> int:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = 0
+    print(f"\n{'case':<36}{'baseline us':>13}{'current us':>12}{'change':>9}")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:<36}{'-':>13}{result['us_per_call']:>12.2f}{'new':>9}")
+            continue
+        before = baseline[name]["us_per_call"]
+        change = result["us_per_call"] / before - 1 if before else 0.0
+        flag = ""
+        if change > threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{name:<36}{before:>13.2f}{result['us_per_call']:>12.2f}{change:>+8.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filter", default="", help="only run cases containing this text")
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per measurement run")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON (use as a baseline later)")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown treated as a regression")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'case':<36}{'us/call':>12}{'calls':>10}")
+    for name, func in build_cases():
+        if args.filter not in name:
+            continue
+        results[name] = measure(func, args.min_time)
+        print(f"{name:<36}{results[name]['us_per_call']:>12.2f}{results[name]['calls']:>10}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "timestamp": int(time.time()),
+                "results": results
+            }, f, indent=2)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"\n{regressions} case(s) slower than baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
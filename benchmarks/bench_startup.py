@@ -0,0 +1,124 @@
+"""
+Startup benchmark: cold import time of the entry points and first- vs second-request latency.
+
+Every measurement runs in a fresh interpreter, so nothing is shared between samples.
+First requests go to an in-process mock of the OpenRouter API (benchmarks.mock_openrouter),
+comparing a lazily built app (`src.main:app`) with the warmed factory (`src.main:create_app()`).
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 7] [--json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List
+
+IMPORTS = ["src.core.assistant", "app.config", "src.main", "src.asgi", "app.asgi"]
+
+# name: (module, attribute or factory call, request path, request body)
+APPS = {
+    "src.main:app": ("src.main", "app", "/api/ask", {"query": "Tell me about Rust"}),
+    "src.main:create_app()": ("src.main", "create_app()", "/api/ask", {"query": "Tell me about Rust"}),
+    "app:create_app()": ("app", "create_app()", "/api/search", {"query": "Tell me about Rust"}),
+}
+
+CHILD_ENV = {
+    "OPENROUTER_API_KEY": os.getenv("OPENROUTER_API_KEY", "bench"),
+    "CACHE_ENABLED": "0",
+    "UPSTREAM_RPS": "1000",
+}
+
+
+def _child(argv: List[str]) -> subprocess.CompletedProcess:
+    env = dict(os.environ, **CHILD_ENV)
+    return subprocess.run([sys.executable, *argv], env=env, capture_output=True, text=True, check=True)
+
+
+def time_import(module: str) -> Dict[str, float]:
+    """Import one module in a fresh interpreter; returns import and whole-process seconds."""
+    code = (
+        "import time; started = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(time.perf_counter() - started)"
+    )
+    started = time.perf_counter()
+    result = _child(["-c", code])
+    return {"import": float(result.stdout.strip().splitlines()[-1]), "process": time.perf_counter() - started}
+
+
+def first_requests(name: str) -> Dict[str, float]:
+    """Build one app in a fresh interpreter and time its first and second requests."""
+    result = _child(["-m", "benchmarks.bench_startup", "--child", name])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_child(name: str) -> None:
+    """Child process: mock the upstream, build the app, time requests, print JSON."""
+    import importlib
+    import httpx
+    from src.core import http_pool
+    from benchmarks.mock_openrouter import MockOpenRouter, MockSettings
+
+    mock = MockOpenRouter(MockSettings(latency=0.0, jitter=0.0, token_delay=0.0))
+    http_pool._shared_pool = http_pool.UpstreamPool(transport=httpx.ASGITransport(app=mock))
+
+    module_name, attribute, path, body = APPS[name]
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    flask_app = getattr(module, "create_app")() if attribute == "create_app()" else getattr(module, attribute)
+    timings = {"build": time.perf_counter() - started}
+
+    client = flask_app.test_client()
+    for label in ("first", "second"):
+        started = time.perf_counter()
+        client.get("/")
+        timings[f"{label}_page"] = time.perf_counter() - started
+        started = time.perf_counter()
+        response = client.post(path, json=body)
+        timings[f"{label}_api"] = time.perf_counter() - started
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    print(json.dumps(timings))
+
+
+def _median_ms(samples: List[Dict[str, float]]) -> Dict[str, float]:
+    return {key: round(statistics.median(s[key] for s in samples) * 1000, 2) for key in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7, help="fresh interpreters per measurement (median reported)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--child", choices=sorted(APPS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+
+    # Compile bytecode once so every sample measures a warm-disk, cached-bytecode start
+    _child(["-m", "compileall", "-q", "src", "app", "benchmarks"])
+    report = {
+        "imports_ms": {module: _median_ms([time_import(module) for _ in range(args.runs)]) for module in IMPORTS},
+        "first_request_ms": {name: _median_ms([first_requests(name) for _ in range(args.runs)]) for name in APPS},
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'import':<26}{'import ms':>12}{'process ms':>12}")
+    for module, result in report["imports_ms"].items():
+        print(f"{module:<26}{result['import']:>12.1f}{result['process']:>12.1f}")
+    print(f"\n{'app':<26}{'build':>9}{'1st page':>10}{'2nd page':>10}{'1st api':>10}{'2nd api':>10}")
+    for name, result in report["first_request_ms"].items():
+        print(f"{name:<26}{result['build']:>9.1f}{result['first_page']:>10.1f}{result['second_page']:>10.1f}"
+              f"{result['first_api']:>10.1f}{result['second_api']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Per-category generation report: replies, output tokens and latency against each category's budget.
+
+Reads the Prometheus metrics of a running worker (or a saved scrape) and summarizes
+chaysh_completion_tokens, chaysh_reply_seconds and chaysh_truncated_replies_total, so
+max_tokens in category_map can be tightened (or loosened) with data. Each worker reports
+its own metrics; scrape several and pass them all to combine them.
+
+Usage:
+    python -m benchmarks.category_report [--url http://127.0.0.1:5000/metrics] [--file scrape.txt ...] [--json]
+"""
+
+import re
+import json
+import argparse
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from src.prompt_categories import get_category_generation
+
+_SAMPLE = re.compile(r'^(\w+)\{([^}]*)\}\s+(\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse(text: str) -> Dict[str, List[Tuple[Dict[str, str], float]]]:
+    """Parse labelled samples from Prometheus text format into {metric: [(labels, value)]}."""
+    samples = defaultdict(list)
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if match:
+            name, labels, value = match.groups()
+            samples[name].append((dict(_LABEL.findall(labels)), float(value.replace("+Inf", "inf"))))
+    return samples
+
+
+def _quantile(buckets: Dict[float, float], q: float) -> Optional[float]:
+    """Upper bound of the bucket holding the q-quantile of a cumulative histogram."""
+    if not buckets:
+        return None
+    total = buckets[max(buckets)]
+    for bound in sorted(buckets):
+        if total and buckets[bound] >= q * total:
+            return bound
+    return None
+
+
+def summarize(scrapes: List[str]) -> Dict[str, Dict[str, Optional[float]]]:
+    """
+    Combine scrapes into per-category figures.
+
+    Returns:
+        {category: {replies, avg_tokens, p95_tokens, max_tokens, truncated, avg_seconds, p95_seconds}}
+    """
+    sums = defaultdict(float)
+    buckets: Dict[Tuple[str, str], Dict[float, float]] = defaultdict(lambda: defaultdict(float))
+    for text in scrapes:
+        samples = parse(text)
+        for metric in ("chaysh_completion_tokens", "chaysh_reply_seconds"):
+            for labels, value in samples.get(f"{metric}_bucket", []):
+                buckets[(metric, labels["category"])][float(labels["le"])] += value
+            for suffix in ("sum", "count"):
+                for labels, value in samples.get(f"{metric}_{suffix}", []):
+                    sums[(metric, suffix, labels["category"])] += value
+        for labels, value in samples.get("chaysh_truncated_replies_total", []):
+            sums[("truncated", labels["category"])] += value
+
+    report = {}
+    categories = sorted({key[-1] for key in sums})
+    for category in categories:
+        replies = sums[("chaysh_reply_seconds", "count", category)]
+        token_count = sums[("chaysh_completion_tokens", "count", category)]
+        report[category] = {
+            "replies": replies,
+            "avg_tokens": sums[("chaysh_completion_tokens", "sum", category)] / token_count if token_count else None,
+            "p95_tokens": _quantile(buckets[("chaysh_completion_tokens", category)], 0.95),
+            "max_tokens": get_category_generation(category).get("max_tokens"),
+            "truncated": sums[("truncated", category)],
+            "avg_seconds": sums[("chaysh_reply_seconds", "sum", category)] / replies if replies else None,
+            "p95_seconds": _quantile(buckets[("chaysh_reply_seconds", category)], 0.95),
+        }
+    return report
+
+
+def _cell(value: Optional[float], spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", action="append", default=[], help="metrics endpoint to scrape (repeatable)")
+    parser.add_argument("--file", action="append", default=[], help="saved metrics scrape (repeatable)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    urls = args.url or ([] if args.file else ["http://127.0.0.1:5000/metrics"])
+    scrapes = [httpx.get(url, timeout=10).text for url in urls]
+    for path in args.file:
+        with open(path, encoding="utf-8") as f:
+            scrapes.append(f.read())
+    report = summarize(scrapes)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'category':<12}{'replies':>9}{'avg tok':>9}{'p95 tok':>9}{'budget':>8}{'cut off':>9}{'avg s':>8}{'p95 s':>8}")
+    for category, row in report.items():
+        print(f"{category:<12}{row['replies']:>9.0f}{_cell(row['avg_tokens'], '.0f'):>9}{_cell(row['p95_tokens'], '.0f'):>9}"
+              f"{_cell(row['max_tokens'], 'd'):>8}{row['truncated']:>9.0f}"
+              f"{_cell(row['avg_seconds'], '.2f'):>8}{_cell(row['p95_seconds'], '.2f'):>8}")
+
+
+if __name__ == "__main__":
+    main()
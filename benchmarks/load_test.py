@@ -0,0 +1,240 @@
+"""
+Load test: drive /api/ask, /api/ask/stream or /api/search against a local mock OpenRouter.
+
+Starts benchmarks.mock_openrouter and the app in the chosen serving mode, runs a
+closed-loop load at fixed concurrency and reports throughput, latency percentiles
+and error rate. Nothing leaves the machine and no API credits are used.
+
+Usage:
+    python -m benchmarks.load_test [--endpoint ask|stream|search] [--mode gunicorn|asgi|wsgi]
+        [--concurrency 32] [--duration 20] [--workers 2] [--json]
+        [--latency 0.4 --jitter 0.2 --error-rate 0.01 --rate-limit-rate 0.02 ...]
+    python -m benchmarks.load_test --url http://127.0.0.1:5000 --endpoint ask   # already running server
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+from typing import Dict, List, Optional
+import httpx
+from benchmarks.mock_openrouter import COMPLETIONS_PATH, MODELS_PATH, add_mock_arguments
+
+ENDPOINTS = {
+    # name: (path, ASGI app, WSGI app)
+    "ask": ("/api/ask", "src.asgi:app", "src.main:create_app()"),
+    "stream": ("/api/ask/stream", "src.asgi:app", "src.main:create_app()"),
+    "search": ("/api/search", "app.asgi:application", "app:create_app()"),
+}
+
+QUERIES = [
+    "Tell me about Rust",
+    "Compare iPhone 16 and Pixel 9",
+    "Price of a Tesla Model 3",
+    "Weather in Warsaw",
+    "Who is Marie Curie",
+    "Jaka jest pogoda w Krakowie",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(samples: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of unsorted samples."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def mock_command(args: argparse.Namespace, port: int) -> List[str]:
+    """Command starting benchmarks.mock_openrouter with the options from add_mock_arguments."""
+    return [
+        sys.executable, "-m", "benchmarks.mock_openrouter",
+        "--port", str(port), "--latency", str(args.latency), "--jitter", str(args.jitter),
+        "--distribution", args.distribution, "--token-delay", str(args.token_delay),
+        "--error-rate", str(args.error_rate), "--rate-limit-rate", str(args.rate_limit_rate),
+        "--retry-after", str(args.retry_after), "--seed", str(args.seed)
+    ]
+
+
+def server_command(mode: str, endpoint: str, port: int, workers: int, threads: int) -> List[str]:
+    _, asgi_app, wsgi_app = ENDPOINTS[endpoint]
+    bind = f"127.0.0.1:{port}"
+    if mode == "gunicorn":
+        # Production setup (Procfile / render.yaml)
+        return [sys.executable, "-m", "gunicorn", asgi_app, "-k", "uvicorn.workers.UvicornWorker", "-w", str(workers), "-b", bind, "--log-level", "warning"]
+    if mode == "asgi":
+        return [sys.executable, "-m", "uvicorn", asgi_app.replace("()", ""), "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    return [sys.executable, "-m", "gunicorn", wsgi_app, "-w", str(workers), "--threads", str(threads), "-b", bind, "--log-level", "warning"]
+
+
+def wait_ready(url: str, process: Optional[subprocess.Popen], timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode} before becoming ready")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not become ready within {timeout}s")
+
+
+def is_error(endpoint: str, status: int, body: bytes) -> bool:
+    """Errors come back as non-200s or as 200s carrying an error payload."""
+    if status != 200:
+        return True
+    if endpoint == "stream":
+        return b"event: error" in body
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return True
+    if endpoint == "search":
+        return payload.get("mode") == "error"
+    return "error" in payload
+
+
+async def run_load(
+    base_url: str,
+    endpoint: str,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    unique: bool
+) -> Dict[str, object]:
+    path = ENDPOINTS[endpoint][0]
+    latencies: List[float] = []
+    first_bytes: List[float] = []
+    errors = 0
+    counter = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    timeout = httpx.Timeout(120.0)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        started = time.monotonic()
+        measure_from = started + warmup
+        stop_at = measure_from + duration
+
+        async def worker():
+            nonlocal counter, errors
+            while time.monotonic() < stop_at:
+                counter += 1
+                query = QUERIES[counter % len(QUERIES)]
+                if unique:
+                    # Defeat the response cache and request coalescing so every call goes upstream
+                    query = f"{query} #{counter}"
+                sent = time.monotonic()
+                first = None
+                try:
+                    async with client.stream("POST", path, json={"query": query}) as response:
+                        chunks = []
+                        async for chunk in response.aiter_bytes():
+                            if first is None:
+                                first = time.monotonic()
+                            chunks.append(chunk)
+                    failed = is_error(endpoint, response.status_code, b"".join(chunks))
+                except httpx.HTTPError:
+                    failed = True
+                finished = time.monotonic()
+                if sent < measure_from:
+                    continue
+                latencies.append(finished - sent)
+                if first is not None:
+                    first_bytes.append(first - sent)
+                errors += failed
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.monotonic() - measure_from
+
+    total = len(latencies)
+    report = {
+        "endpoint": path,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else None,
+        "throughput_rps": round(total / elapsed, 2) if elapsed > 0 else None,
+    }
+    for name, samples in (("latency", latencies), ("ttfb", first_bytes)):
+        for q in (50, 95, 99):
+            value = percentile(samples, q)
+            report[f"{name}_p{q}_ms"] = round(value * 1000, 1) if value is not None else None
+    report["latency_max_ms"] = round(max(latencies) * 1000, 1) if latencies else None
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="ask")
+    parser.add_argument("--mode", choices=("gunicorn", "asgi", "wsgi"), default="gunicorn",
+                        help="gunicorn: uvicorn workers (production); asgi: plain uvicorn; wsgi: threaded gunicorn")
+    parser.add_argument("--url", help="test an already running server instead of starting one (and the mock)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8, help="threads per worker in wsgi mode")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds of load before measuring")
+    parser.add_argument("--cacheable", action="store_true", help="repeat queries so the cache and coalescing can help")
+    parser.add_argument("--upstream-rps", type=float, default=1000.0, help="UPSTREAM_RPS for the app under test")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    processes: List[subprocess.Popen] = []
+    try:
+        base_url = args.url
+        if base_url is None:
+            mock_port = free_port()
+            processes.append(subprocess.Popen(mock_command(args, mock_port)))
+            mock_url = f"http://127.0.0.1:{mock_port}"
+            wait_ready(mock_url + MODELS_PATH, processes[-1])
+
+            app_port = free_port()
+            env = dict(
+                os.environ,
+                OPENROUTER_API_KEY=os.getenv("OPENROUTER_API_KEY", "mock-key"),
+                OPENROUTER_API_URL=mock_url + COMPLETIONS_PATH,
+                UPSTREAM_WARMUP_URL=mock_url + MODELS_PATH,
+                UPSTREAM_RPS=str(args.upstream_rps),
+                CACHE_ENABLED="1" if args.cacheable else "0",
+            )
+            command = server_command(args.mode, args.endpoint, app_port, args.workers, args.threads)
+            processes.append(subprocess.Popen(command, env=env))
+            base_url = f"http://127.0.0.1:{app_port}"
+            wait_ready(base_url + "/", processes[-1])
+
+        report = asyncio.run(run_load(
+            base_url, args.endpoint, args.concurrency, args.duration, args.warmup, unique=not args.cacheable
+        ))
+        report["mode"] = args.mode if args.url is None else "external"
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for key, value in report.items():
+        print(f"{key:<18}{value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Local stand-in for the OpenRouter chat completions API, for load tests without network or credits.
+
+Usage:
+    python -m benchmarks.mock_openrouter [--port 8787] [--latency 0.4] [--jitter 0.2]
+        [--distribution lognormal] [--error-rate 0.01] [--rate-limit-rate 0.02]
+
+Point the app at it with OPENROUTER_API_URL=http://127.0.0.1:8787/api/v1/chat/completions
+and UPSTREAM_WARMUP_URL=http://127.0.0.1:8787/api/v1/models.
+"""
+
+import json
+import math
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass
+
+COMPLETIONS_PATH = "/api/v1/chat/completions"
+MODELS_PATH = "/api/v1/models"
+
+TEXT_REPLY = (
+    "Rust is a systems programming language focused on memory safety without garbage collection. "
+    "It offers zero-cost abstractions, fearless concurrency and a strong type system. "
+    "Cargo handles builds and dependencies. I hope this helps!"
+)
+
+TABLE_REPLY = (
+    "| Feature | iPhone 16 | Pixel 9 |\n"
+    "|---|---|---|\n"
+    "| Chip | A18 | Tensor G4 |\n"
+    "| Price | $799 | $799 |"
+)
+
+# What the structured /api/search prompt asks for
+STRUCTURED_REPLY = json.dumps({
+    "mode": "product",
+    "name": "Rust",
+    "description": ["Memory safe", "Fast", "Great tooling", "Growing ecosystem", "A modern systems language"],
+    "source_info": "Mock upstream",
+    "suggestions": [{"text": "Rust vs Go", "category": "related"}],
+    "actions": [{"type": "chat", "label": "Ask More", "query": "Rust ownership"}]
+})
+
+
+@dataclass
+class MockSettings:
+    latency: float = 0.4
+    jitter: float = 0.2
+    distribution: str = "lognormal"
+    token_delay: float = 0.01
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    seed: int = 0
+
+
+class MockOpenRouter:
+    """ASGI app imitating the chat completions endpoint, including SSE streaming."""
+
+    def __init__(self, settings: MockSettings):
+        self.settings = settings
+        self.random = random.Random(settings.seed or None)
+        self.requests = 0
+
+    def latency(self) -> float:
+        s = self.settings
+        if s.distribution == "fixed":
+            return s.latency
+        if s.distribution == "uniform":
+            return max(0.0, self.random.uniform(s.latency - s.jitter, s.latency + s.jitter))
+        # Lognormal with the given mean: a long tail like real model latency
+        if s.latency <= 0:
+            return 0.0
+        sigma = math.sqrt(math.log(1 + (s.jitter / s.latency) ** 2))
+        return self.random.lognormvariate(0, sigma) * s.latency / math.exp(sigma * sigma / 2)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                else:
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        if scope["path"] == MODELS_PATH:
+            await self._send_json(send, 200, {"data": []})
+            return
+        if scope["path"] != COMPLETIONS_PATH or scope["method"] != "POST":
+            await self._send_json(send, 404, {"error": {"message": "Not found"}})
+            return
+
+        self.requests += 1
+        request = json.loads(body or b"{}")
+        roll = self.random.random()
+        if roll < self.settings.rate_limit_rate:
+            await self._send_json(send, 429, {"error": {"message": "Rate limit exceeded"}},
+                                  [(b"retry-after", str(self.settings.retry_after).encode("ascii"))])
+            return
+        if roll < self.settings.rate_limit_rate + self.settings.error_rate:
+            await asyncio.sleep(self.latency() / 4)
+            await self._send_json(send, 502, {"error": {"message": "Upstream provider error"}})
+            return
+
+        reply = self._reply_for(request)
+        if request.get("stream"):
+            await self._stream(send, request, reply)
+            return
+
+        await asyncio.sleep(self.latency())
+        await self._send_json(send, 200, {
+            "id": f"mock-{self.requests}",
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            "usage": self._usage(request, reply)
+        })
+
+    @staticmethod
+    def _reply_for(request: dict) -> str:
+        messages = request.get("messages") or [{}]
+        system = messages[0].get("content", "") if messages[0].get("role") == "system" else ""
+        if "JSON format" in system:
+            return STRUCTURED_REPLY
+        prompt = messages[-1].get("content", "").lower()
+        if "compare" in prompt or "price" in prompt or "table" in prompt:
+            return TABLE_REPLY
+        return TEXT_REPLY
+
+    @staticmethod
+    def _usage(request: dict, reply: str) -> dict:
+        prompt_chars = sum(len(m.get("content", "")) for m in request.get("messages") or [])
+        prompt_tokens = prompt_chars // 4 + 4
+        completion_tokens = len(reply) // 4 + 1
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+    async def _stream(self, send, request: dict, reply: str) -> None:
+        # Time to first token is the latency draw; the rest arrives word by word
+        await asyncio.sleep(self.latency())
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream")]
+        })
+        for word in reply.split(" "):
+            chunk = {"choices": [{"index": 0, "delta": {"content": word + " "}}]}
+            await send({"type": "http.response.body", "body": f"data: {json.dumps(chunk)}\n\n".encode(), "more_body": True})
+            if self.settings.token_delay:
+                await asyncio.sleep(self.settings.token_delay)
+        usage = {"choices": [], "usage": self._usage(request, reply)}
+        tail = f"data: {json.dumps(usage)}\n\ndata: [DONE]\n\n"
+        await send({"type": "http.response.body", "body": tail.encode()})
+
+    @staticmethod
+    async def _send_json(send, status: int, payload: dict, headers=()) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("ascii")), *headers]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the mock upstream options to a parser (shared with the load test)."""
+    group = parser.add_argument_group("mock upstream")
+    group.add_argument("--latency", type=float, default=0.4, help="mean upstream latency / time to first token in seconds")
+    group.add_argument("--jitter", type=float, default=0.2, help="latency spread (standard deviation for lognormal, +/- for uniform)")
+    group.add_argument("--distribution", choices=("fixed", "uniform", "lognormal"), default="lognormal")
+    group.add_argument("--token-delay", type=float, default=0.01, help="delay between streamed words in seconds")
+    group.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 502")
+    group.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    group.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    group.add_argument("--seed", type=int, default=0, help="random seed (0 for nondeterministic)")
+
+
+def settings_from_args(args: argparse.Namespace) -> MockSettings:
+    return MockSettings(
+        latency=args.latency,
+        jitter=args.jitter,
+        distribution=args.distribution,
+        token_delay=args.token_delay,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(MockOpenRouter(settings_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
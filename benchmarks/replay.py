@@ -0,0 +1,247 @@
+"""
+Replay captured traffic against two builds and compare their latency and throughput.
+
+Reads the JSONL files written with CAPTURE_PATH set (see src.core.capture), then for each
+build starts a fresh, seeded benchmarks.mock_openrouter and the app, and re-sends every
+captured /api/ask and /api/search request at its original offset (scaled by --speed).
+A build is a directory or a git ref; refs are checked out into a temporary worktree.
+Nothing leaves the machine and no API credits are used.
+
+Usage:
+    python -m benchmarks.replay captures/traffic.*.jsonl [--baseline HEAD] [--candidate .]
+        [--speed 1.0] [--limit 1000] [--mode gunicorn|asgi|wsgi] [--workers 2] [--no-cache] [--json]
+        [--latency 0.4 --jitter 0.2 --seed 1 ...]
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+import httpx
+from benchmarks.load_test import ENDPOINTS, free_port, is_error, mock_command, percentile, server_command, wait_ready
+from benchmarks.mock_openrouter import COMPLETIONS_PATH, MODELS_PATH, add_mock_arguments
+
+# Captured path -> load_test endpoint name
+REPLAYED = {ENDPOINTS[name][0]: name for name in ("ask", "search")}
+
+
+def load_capture(patterns: List[str], limit: Optional[int] = None) -> List[Dict]:
+    """
+    Read capture files (globs allowed, e.g. rotated files) into records sorted by time.
+
+    Args:
+        patterns: Capture file paths or glob patterns
+        limit: Keep only the first records
+
+    Returns:
+        Replayable records, oldest first
+    """
+    records = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A worker killed mid-write leaves a partial last line
+                        continue
+                    if record.get("endpoint") in REPLAYED:
+                        records.append(record)
+    records.sort(key=lambda record: record["ts"])
+    return records[:limit] if limit else records
+
+
+def request_body(record: Dict) -> Dict:
+    if record["endpoint"] == ENDPOINTS["search"][0]:
+        return {"query": record.get("query") or ""}
+    body = {"query": record.get("query") or "", "lang": record.get("lang") or "en"}
+    if record.get("category_override"):
+        body["category_override"] = record["category_override"]
+    return body
+
+
+@contextmanager
+def checkout(build: str) -> Iterator[str]:
+    """Yield a directory holding a build: the directory itself, or a temporary worktree of a git ref."""
+    if os.path.isdir(build):
+        yield os.path.abspath(build)
+        return
+    path = tempfile.mkdtemp(prefix="chaysh-replay-")
+    subprocess.run(["git", "worktree", "add", "--detach", "--quiet", path, build], check=True)
+    try:
+        yield path
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", path], check=False)
+
+
+async def replay(
+    base_urls: Dict[str, str],
+    records: List[Dict],
+    speed: float,
+    concurrency: int,
+    timeout: float
+) -> Dict[str, Dict]:
+    """
+    Send every record at its captured offset divided by speed (speed 0: as fast as concurrency allows).
+
+    Returns:
+        {endpoint: {requests, errors, seconds, throughput_rps, p50_ms, p95_ms, p99_ms, mean_ms}}
+    """
+    latencies: Dict[str, List[float]] = {name: [] for name in base_urls}
+    errors: Dict[str, int] = {name: 0 for name in base_urls}
+    # Only limits the unpaced mode; paced replay is open-loop, like the captured traffic
+    semaphore = asyncio.Semaphore(concurrency if speed <= 0 else len(records) or 1)
+    first = records[0]["ts"] if records else 0.0
+
+    async def send(client: httpx.AsyncClient, record: Dict) -> None:
+        name = REPLAYED[record["endpoint"]]
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.post(base_urls[name] + record["endpoint"], json=request_body(record))
+                failed = is_error(name, response.status_code, response.content)
+            except httpx.HTTPError:
+                failed = True
+            latencies[name].append(time.perf_counter() - started)
+            errors[name] += failed
+
+    limits = httpx.Limits(max_connections=max(concurrency, 100), max_keepalive_connections=max(concurrency, 100))
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        tasks = []
+        for record in records:
+            if speed > 0:
+                delay = (record["ts"] - first) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(send(client, record)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    report = {}
+    for name, samples in latencies.items():
+        if not samples:
+            continue
+        report[name] = {
+            "requests": len(samples),
+            "errors": errors[name],
+            "seconds": round(elapsed, 2),
+            "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else None,
+            "p50_ms": round(percentile(samples, 50) * 1000, 1),
+            "p95_ms": round(percentile(samples, 95) * 1000, 1),
+            "p99_ms": round(percentile(samples, 99) * 1000, 1),
+            "mean_ms": round(sum(samples) / len(samples) * 1000, 1),
+        }
+    return report
+
+
+def run_build(build: str, records: List[Dict], args: argparse.Namespace) -> Dict[str, Dict]:
+    """Start the mock and the app of one build, replay the records and stop everything."""
+    endpoints = sorted({REPLAYED[record["endpoint"]] for record in records})
+    processes: List[subprocess.Popen] = []
+    with checkout(build) as path:
+        try:
+            # A fresh mock per build, so both builds draw the same seeded upstream latencies
+            mock_port = free_port()
+            processes.append(subprocess.Popen(mock_command(args, mock_port)))
+            mock_url = f"http://127.0.0.1:{mock_port}"
+            wait_ready(mock_url + MODELS_PATH, processes[-1])
+
+            env = {key: value for key, value in os.environ.items() if not key.startswith("CAPTURE_")}
+            env.update(
+                PYTHONPATH=path,
+                OPENROUTER_API_KEY=os.getenv("OPENROUTER_API_KEY", "mock-key"),
+                OPENROUTER_API_URL=mock_url + COMPLETIONS_PATH,
+                UPSTREAM_WARMUP_URL=mock_url + MODELS_PATH,
+                UPSTREAM_RPS=str(args.upstream_rps),
+                CACHE_ENABLED="0" if args.no_cache else "1",
+            )
+            base_urls = {}
+            for name in endpoints:
+                port = free_port()
+                processes.append(subprocess.Popen(server_command(args.mode, name, port, args.workers, args.threads), cwd=path, env=env))
+                base_urls[name] = f"http://127.0.0.1:{port}"
+                wait_ready(base_urls[name] + "/", processes[-1])
+
+            return asyncio.run(replay(base_urls, records, args.speed, args.concurrency, args.timeout))
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+            for process in processes:
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+
+def compare(baseline: Dict[str, Dict], candidate: Dict[str, Dict]) -> Dict[str, Dict[str, Optional[float]]]:
+    """Candidate change relative to the baseline, in percent, per endpoint and figure."""
+    diff = {}
+    for name in sorted(set(baseline) & set(candidate)):
+        diff[name] = {}
+        for figure in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "mean_ms"):
+            before, after = baseline[name][figure], candidate[name][figure]
+            diff[name][figure] = round((after - before) / before * 100, 1) if before else None
+    return diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("capture", nargs="+", help="capture files or glob patterns")
+    parser.add_argument("--baseline", default="HEAD", help="directory or git ref of the reference build")
+    parser.add_argument("--candidate", default=".", help="directory or git ref of the build under test")
+    parser.add_argument("--speed", type=float, default=1.0, help="pacing multiplier (2 = twice as fast; 0 = no pacing)")
+    parser.add_argument("--limit", type=int, help="replay only the first N records")
+    parser.add_argument("--mode", choices=("gunicorn", "asgi", "wsgi"), default="gunicorn",
+                        help="gunicorn: uvicorn workers (production); asgi: plain uvicorn; wsgi: threaded gunicorn")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8, help="threads per worker in wsgi mode")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent requests when --speed is 0")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--no-cache", action="store_true", help="disable the response cache in both builds")
+    parser.add_argument("--upstream-rps", type=float, default=1000.0, help="UPSTREAM_RPS for both builds")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    add_mock_arguments(parser)
+    # Deterministic upstream by default, so differences come from the builds
+    parser.set_defaults(seed=1)
+    args = parser.parse_args()
+
+    records = load_capture(args.capture, args.limit)
+    if not records:
+        sys.exit("No replayable records (/api/ask, /api/search) in the capture")
+
+    report = {
+        "records": len(records),
+        "speed": args.speed,
+        "baseline": {"build": args.baseline, "endpoints": run_build(args.baseline, records, args)},
+        "candidate": {"build": args.candidate, "endpoints": run_build(args.candidate, records, args)},
+    }
+    report["change_pct"] = compare(report["baseline"]["endpoints"], report["candidate"]["endpoints"])
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{len(records)} records at speed {args.speed}: {args.baseline} (baseline) vs {args.candidate} (candidate)")
+    print(f"{'endpoint':<10}{'build':<11}{'requests':>9}{'errors':>8}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'mean ms':>9}")
+    for name in sorted(report["change_pct"]):
+        for build in ("baseline", "candidate"):
+            row = report[build]["endpoints"][name]
+            print(f"{name:<10}{build:<11}{row['requests']:>9}{row['errors']:>8}{row['throughput_rps']:>8}"
+                  f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['mean_ms']:>9}")
+        change = report["change_pct"][name]
+        print(f"{name:<10}{'change %':<11}{'':>17}" + "".join(
+            f"{'-' if change[figure] is None else format(change[figure], '+.1f'):>{width}}"
+            for figure, width in (("throughput_rps", 8), ("p50_ms", 9), ("p95_ms", 9), ("p99_ms", 9), ("mean_ms", 9))
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Gunicorn settings and hooks for Chaysh.
+Preloads the app in the master so workers fork from a warmed parent, pre-warms the
+upstream connection pool in each worker and closes it on exit.
+"""
+
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Import and warm the app once in the master; workers share it copy-on-write.
+# Connection pools and the background loop are still created per worker, after fork.
+preload_app = os.getenv("GUNICORN_PRELOAD", "1").lower() in ("1", "true", "yes")
+
+
+def when_ready(server):
+    """Build the preloaded app and freeze its heap so worker garbage collections do not copy it."""
+    if server.cfg.preload_app:
+        from src.core.preload import freeze_heap
+        # ASGI entry points build their app lazily; build it here so workers inherit it
+        build = getattr(server.app.wsgi(), "build", None)
+        if build is not None:
+            build()
+        server.log.info(f"Froze {freeze_heap()} preloaded objects before forking workers")
+
+
+def post_worker_init(worker):
+    """Open upstream connections before the worker accepts traffic."""
+    from src.core.settings import getenv
+    if getenv("UPSTREAM_WARMUP", "1").lower() not in ("1", "true", "yes"):
+        return
+    if type(worker).__module__.startswith("uvicorn"):
+        # ASGI workers warm the pool on their own loop via the lifespan startup hook
+        return
+    from src.core.http_pool import get_shared_pool
+    from src.core.loop import background_loop
+    try:
+        connections = int(getenv("UPSTREAM_WARMUP_CONNECTIONS", "2"))
+        background_loop.run(get_shared_pool().warmup(connections), timeout=10)
+    except Exception as e:
+        logger.warning(f"Upstream warm-up skipped: {str(e)}")
+
+
+def worker_exit(server, worker):
+    """Release pooled upstream connections on shutdown."""
+    if type(worker).__module__.startswith("uvicorn"):
+        return
+    from src.core.http_pool import get_shared_pool
+    from src.core.loop import background_loop
+    try:
+        background_loop.run(get_shared_pool().aclose(), timeout=5)
+        background_loop.stop()
+    except Exception as e:
+        logger.warning(f"Upstream pool close failed: {str(e)}")
@@ -0,0 +1,28 @@
+"""
+ASGI entry point for Chaysh.
+
+Run with `uvicorn src.asgi:app` or `gunicorn src.asgi:app -k uvicorn.workers.UvicornWorker`.
+The /api/ask routes run directly on the server's event loop; pages are served by the Flask app.
+"""
+
+from src.core.asgi import AsyncRouter
+from src.core.http_pool import get_shared_pool
+from src.core.settings import getenv
+from src.main import create_app, handle_ask, stream_ask, handle_batch, stream_batch
+
+app = AsyncRouter(factory=create_app)
+app.route("/api/ask")(handle_ask)
+app.stream_route("/api/ask/stream")(stream_ask)
+app.route("/api/ask/batch")(handle_batch)
+app.stream_route("/api/ask/batch/stream", media_type="application/x-ndjson")(stream_batch)
+
+
+@app.on_startup
+async def warm_upstream():
+    if getenv("UPSTREAM_WARMUP", "1").lower() in ("1", "true", "yes"):
+        await get_shared_pool().warmup()
+
+
+@app.on_shutdown
+async def close_upstream():
+    await get_shared_pool().aclose()
@@ -0,0 +1,230 @@
+"""
+Minimal ASGI front for the Flask apps.
+Serves the async API routes natively on the server's event loop and hands
+everything else (pages, static files) to the wrapped WSGI app.
+"""
+
+import json
+import time
+import asyncio
+import logging
+import warnings
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from src.core.scheduler import client_var, client_identity
+from src.core.metrics import REQUEST_SECONDS, STAGE_SECONDS
+from src.core.delivery import available_encodings, compress, compress_min_size, negotiate
+
+logger = logging.getLogger(__name__)
+
+# An async route takes the decoded JSON body and returns (payload, status);
+# payload is JSON-serializable or already-encoded JSON bytes
+AsyncHandler = Callable[[Any], Awaitable[Tuple[Any, int]]]
+# A stream route takes the decoded JSON body and yields text chunks (SSE events, NDJSON lines)
+StreamHandler = Callable[[Any], AsyncIterator[str]]
+
+
+class AsyncRouter:
+    """
+    ASGI application dispatching JSON API routes to coroutines.
+
+    The WSGI app for everything else is passed directly or as a factory, which is
+    called by build(): at lifespan startup, on first use, or in the gunicorn master
+    when the app is preloaded. Importing an entry point therefore needs no configuration.
+    """
+
+    def __init__(self, wsgi_app: Optional[Callable] = None, factory: Optional[Callable[[], Callable]] = None):
+        self.routes: Dict[Tuple[str, str], AsyncHandler] = {}
+        self.streams: Dict[Tuple[str, str], Tuple[StreamHandler, str]] = {}
+        self.startup: List[Callable[[], Awaitable[None]]] = []
+        self.shutdown: List[Callable[[], Awaitable[None]]] = []
+        self.fallback = None
+        self.factory = factory
+        # JSON bodies at least this large are compressed for clients that accept it (0 disables);
+        # resolved on first use
+        self.compress_min_size: Optional[int] = None
+        if wsgi_app is not None:
+            self._mount(wsgi_app)
+
+    def _mount(self, wsgi_app: Callable) -> None:
+        from uvicorn.middleware.wsgi import WSGIMiddleware
+        with warnings.catch_warnings():
+            # uvicorn's bundled adapter is deprecated in favour of a2wsgi, which it prefers when installed
+            warnings.simplefilter("ignore", DeprecationWarning)
+            self.fallback = WSGIMiddleware(wsgi_app)
+
+    def build(self) -> "AsyncRouter":
+        """Create the WSGI app from the factory, once."""
+        if self.fallback is None and self.factory is not None:
+            self._mount(self.factory())
+        return self
+
+    def route(self, path: str, methods: Tuple[str, ...] = ("POST",)):
+        """
+        Register an async JSON handler.
+
+        Args:
+            path: Exact request path
+            methods: HTTP methods served by the handler
+        """
+        def decorator(handler: AsyncHandler) -> AsyncHandler:
+            for method in methods:
+                self.routes[(method, path)] = handler
+            return handler
+        return decorator
+
+    def stream_route(self, path: str, methods: Tuple[str, ...] = ("POST",), media_type: str = "text/event-stream"):
+        """
+        Register a streaming handler.
+
+        Args:
+            path: Exact request path
+            methods: HTTP methods served by the handler
+            media_type: Content type of the stream
+        """
+        def decorator(handler: StreamHandler) -> StreamHandler:
+            for method in methods:
+                self.streams[(method, path)] = (handler, media_type)
+            return handler
+        return decorator
+
+    def on_startup(self, hook: Callable[[], Awaitable[None]]):
+        self.startup.append(hook)
+        return hook
+
+    def on_shutdown(self, hook: Callable[[], Awaitable[None]]):
+        self.shutdown.append(hook)
+        return hook
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+
+        handler = stream = None
+        if scope["type"] == "http":
+            route = (scope["method"], scope["path"])
+            handler = self.routes.get(route)
+            stream = self.streams.get(route)
+
+        if handler is None and stream is None:
+            self.build()
+            if self.fallback is None:
+                await self._send_json(send, {"error": "Not found"}, 404)
+                return
+            await self.fallback(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        client = scope.get("client")
+        client_var.set(client_identity(self._header(scope, b"x-forwarded-for"), client[0] if client else None))
+
+        body = await self._read_body(receive)
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            await self._send_json(send, {"error": "Invalid JSON body"}, 400)
+            return
+
+        if stream is not None:
+            stream_handler, media_type = stream
+            await self._send_stream(stream_handler(data), media_type, receive, send)
+            REQUEST_SECONDS.observe(time.perf_counter() - started, scope["path"])
+            return
+
+        payload, status = await handler(data)
+        await self._send_json(send, payload, status, self._header(scope, b"accept-encoding"))
+        REQUEST_SECONDS.observe(time.perf_counter() - started, scope["path"])
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    self.build()
+                    for hook in self.startup:
+                        await hook()
+                except Exception as e:
+                    logger.error(f"Startup failed: {str(e)}")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for hook in self.shutdown:
+                    try:
+                        await hook()
+                    except Exception as e:
+                        logger.warning(f"Shutdown hook failed: {str(e)}")
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    def _header(scope, name: bytes) -> Optional[str]:
+        for key, value in scope.get("headers", []):
+            if key == name:
+                return value.decode("latin1")
+        return None
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        return b"".join(chunks)
+
+    async def _send_json(self, send, payload: Any, status: int, accept_encoding: Optional[str] = None) -> None:
+        if isinstance(payload, bytes):
+            # Pre-serialized JSON
+            body = payload
+        else:
+            with STAGE_SECONDS.time("serialize"):
+                body = json.dumps(payload).encode("utf-8")
+        headers = [(b"content-type", b"application/json")]
+        if self.compress_min_size is None:
+            self.compress_min_size = compress_min_size()
+        if 0 < self.compress_min_size <= len(body):
+            encoding = negotiate(accept_encoding, available_encodings())
+            if encoding:
+                with STAGE_SECONDS.time("compress"):
+                    body = compress(body, encoding, fast=True)
+                headers.append((b"content-encoding", encoding.encode("ascii")))
+            headers.append((b"vary", b"Accept-Encoding"))
+        headers.append((b"content-length", str(len(body)).encode("ascii")))
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": headers
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    async def _send_stream(events: AsyncIterator[str], media_type: str, receive, send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", media_type.encode("ascii")),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no")
+            ]
+        })
+
+        async def pump():
+            async for event in events:
+                await send({"type": "http.response.body", "body": event.encode("utf-8"), "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        # Stop generating (and cancel the upstream stream) as soon as the client goes away
+        pump_task = asyncio.ensure_future(pump())
+        watch_task = asyncio.ensure_future(watch_disconnect())
+        done, pending = await asyncio.wait({pump_task, watch_task}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        if pump_task in done:
+            pump_task.result()
@@ -4,30 +4,79 @@ Handles prompt rewriting, context management, and response formatting.
 """
 
 import os
-import httpx
+import json
+import time
 import logging
-from typing import Dict, Any, List, Optional
-from src.prompt_categories import detect_category, category_map
-from src.utils.cleaner import clean_gpt_reply, format_table_response
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from src.prompt_categories import resolve_category, get_category_generation, get_category_models, get_category_ttl
+from src.utils.cleaner import clean_gpt_reply, format_table_response, StreamingCleaner
+from src.core.http_pool import UpstreamPool
+from src.core.cache import ResponseCache, make_key
+from src.core.fingerprint import NearDuplicateIndex
+from src.core.shared_cache import SharedCache
+from src.core.envelope import cached_tokens
+from src.core.singleflight import SingleFlight
+from src.core.sessions import SessionStore
+from src.core.backends import Backend, backend_from_env
+from src.core.engine import CompletionEngine
+from src.core.metrics import ERRORS, STAGE_SECONDS, with_labels
+from src.core.tokens import TokenCalibration, estimate_messages, estimate_tokens, pack_context
+from src.core.settings import getenv
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Only load .env in development
-if os.environ.get("FLASK_ENV") != "production":
-    from dotenv import load_dotenv
-    load_dotenv()
+# Sentinel for build_prompt: category not resolved by the caller yet
+_UNRESOLVED = object()
 
-# Get API key at module level
-api_key = os.getenv("OPENROUTER_API_KEY")
-if not api_key:
-    raise Exception("OPENROUTER_API_KEY not found")
+# Languages with a system prompt
+LANGUAGES = ('en', 'pl')
 
 class Assistant:
-    def __init__(self):
-        """Initialize the assistant with OpenRouter configuration."""
-        self.api_url = "https://openrouter.ai/api/v1/chat/completions"
-        self.model = "openai/gpt-4.1-nano"  # Updated to GPT-4.1 Nano
+    def __init__(
+        self,
+        pool: Optional[UpstreamPool] = None,
+        cache: Optional[ResponseCache] = None,
+        sessions: Optional[SessionStore] = None,
+        backend: Optional[Backend] = None,
+        model: Optional[str] = None,
+        use_cache: Optional[bool] = None
+    ):
+        """
+        Initialize the assistant.
+
+        Args:
+            pool: Connection pool for HTTP backends (defaults to the shared pool)
+            cache: Response cache (built from CACHE_* settings unless caching is off)
+            sessions: Conversation session store
+            backend: Upstream backend (defaults to ASSISTANT_BACKEND, i.e. OpenRouter)
+            model: Default model (overridden by MODEL_CHAINS["default"])
+            use_cache: False disables every cache tier (None: CACHE_ENABLED)
+        """
+        # Resolved here rather than at import (also loads .env in development)
+        backend = backend or backend_from_env(pool)
+        if use_cache is None:
+            use_cache = getenv("CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+        if not use_cache:
+            cache = None
+        elif cache is None:
+            cache = ResponseCache.from_env()
+        self.cache = cache
+        # Near-duplicate queries (typos, extra words) are answered from the cache too
+        self.similar = NearDuplicateIndex.from_env() if cache is not None else None
+        self.near_hits = 0
+        # Optional second tier shared by all workers on the host (SHARED_CACHE_PATH)
+        self.shared = SharedCache.from_env() if cache is not None else None
+        self.inflight = SingleFlight()
+        self.sessions = sessions if sessions is not None else SessionStore.from_env()
+        
+        # Upstream calls (admission, retries, hedging over per-category model chains, metrics)
+        self.engine = CompletionEngine.from_env(
+            backend, model or "openai/gpt-4.1-nano", get_category_models()  # GPT-4.1 Nano by default
+        )
+        self.models = self.engine.models
+        self.model = self.models.primary
+        # Defaults for uncategorized prompts; category_map entries override them per category
         self.max_tokens = 300  # Limit response length
         self.temperature = 0.7  # Balanced creativity
         self.top_p = 0.9  # Increased determinism
@@ -38,61 +87,412 @@ class Assistant:
             'pl': "Jesteś Chaysh, pomocnym asystentem AI. Odpowiadaj jasno i zwięźle zgodnie z wykrytą kategorią."
         }
         
+        # Prompt token budgets (system prompt + context + question), per model
+        self.prompt_token_budget = int(getenv("PROMPT_TOKEN_BUDGET", "1200"))
+        self.prompt_budgets: Dict[str, int] = json.loads(getenv("PROMPT_TOKEN_BUDGETS", "{}"))
+        self.collapse_chars = int(getenv("CONTEXT_COLLAPSE_CHARS", "160")) or None
+        self.calibration = TokenCalibration()
+        self._system_tokens = max(estimate_messages([{"content": p}]) for p in self.system_prompts.values())
+        
         # Log API key verification (first 4 chars only)
-        if os.getenv("FLASK_DEBUG", "").lower() in ("1", "true", "yes"):
-            logger.info(f"[Chaysh] API key: {api_key[:4]}... ✅")
+        if os.getenv("FLASK_DEBUG", "").lower() in ("1", "true", "yes") and backend.api_key:
+            logger.info(f"[Chaysh] {backend.name} API key: {backend.api_key[:4]}... ✅")
+
+    def collect_metrics(self):
+        """Metric families for the cache, coalescing, admission control and model latency."""
+        families = []
+        if self.cache is not None:
+            stats = self.cache.stats()
+            families.append(("chaysh_cache_entries", "gauge", "Entries in the response cache", [({}, stats["entries"])]))
+            families.append(("chaysh_cache_bytes", "gauge", "Bytes held by the response cache", [({}, stats["bytes"])]))
+            families.append((
+                "chaysh_cache_events_total", "counter", "Response cache hits, misses, evictions and expirations",
+                [({"event": event}, stats[event]) for event in ("hits", "misses", "evictions", "expirations")]
+            ))
+            families.append(("chaysh_cache_near_hits_total", "counter", "Replies served for a near-duplicate query", [({}, self.near_hits)]))
+        if self.shared is not None:
+            stats = self.shared.stats()
+            families.append(("chaysh_shared_cache_entries", "gauge", "Entries in the shared cache file at the last compaction", [({}, stats["entries"])]))
+            families.append(("chaysh_shared_cache_bytes", "gauge", "Bytes held by the shared cache at the last compaction", [({}, stats["bytes"])]))
+            families.append((
+                "chaysh_shared_cache_events_total", "counter", "Shared cache hits, misses, writes, dropped writes and errors",
+                [({"event": event}, stats[event]) for event in ("hits", "misses", "writes", "dropped", "errors")]
+            ))
+        families.append(("chaysh_sessions", "gauge", "Live conversation sessions", [({}, len(self.sessions))]))
+        families.append(("chaysh_inflight_shared_total", "counter", "Requests that joined an identical in-flight call", [({}, self.inflight.shared)]))
+        # The search service reports the same families; the label keeps the series apart
+        return with_labels(families, service="assistant") + self.engine.collect_metrics("assistant")
 
     def _truncate_prompt(self, prompt: str, max_length: int = 600) -> str:
         """Truncate prompt to max length."""
         return prompt[:max_length] if len(prompt) > max_length else prompt
 
-    def build_prompt(self, user_input: str, context: List[Dict[str, str]] = None, category_override: Optional[str] = None) -> List[Dict[str, str]]:
+    def build_prompt(
+        self,
+        user_input: str,
+        context: List[Dict[str, str]] = None,
+        category_override: Optional[str] = None,
+        resolved: Optional[Tuple[str, str]] = _UNRESOLVED
+    ) -> List[Dict[str, str]]:
         """
         Build a complete prompt with context and category-based rewriting.
         
+        The category's sampling parameters (see generation_params) are applied when
+        the request body is encoded.
+        
         Args:
             user_input: The user's input message
             context: Optional conversation context
             category_override: Optional category to override auto-detection
+            resolved: Already resolved (category, template) or None, to skip detection
             
         Returns:
             List of message dictionaries for the API
         """
-        messages = []
-        
-        # Add conversation context if available (keep last 4 messages)
-        if context:
-            messages.extend(context[-4:])
-        
         # Handle category detection or override
-        if category_override and category_override in category_map:
-            # Use override if valid category
-            category = category_override
-            template = category_map[category]["template"]
+        if resolved is _UNRESOLVED:
+            resolved = resolve_category(user_input, category_override)
+        category = None
+        if resolved:
+            category, template = resolved
             rewritten_prompt = template.format(target=user_input.strip())
             if os.getenv("FLASK_DEBUG", "").lower() in ("1", "true", "yes"):
-                logger.debug(f"Category override: {category}")
+                logger.debug(f"Category: {category}")
         else:
-            # Auto-detect category
-            category_result = detect_category(user_input)
-            if category_result:
-                category, template = category_result
-                rewritten_prompt = template.format(target=user_input.strip())
-                if os.getenv("FLASK_DEBUG", "").lower() in ("1", "true", "yes"):
-                    logger.debug(f"Detected category: {category}")
-            else:
-                rewritten_prompt = user_input.strip()
-                category = None
+            rewritten_prompt = user_input.strip()
+        
+        messages = []
+        
+        # Add as much recent conversation context as fits the prompt token budget
+        if context:
+            # Sized for the model the category is routed to
+            model = self.models.models(category)[0]
+            budget = self.prompt_budget(model) - self._system_tokens - estimate_tokens(rewritten_prompt)
+            messages.extend(self._pack(context, budget))
         
         messages.append({"role": "user", "content": rewritten_prompt})
         return messages
 
+    def prompt_budget(self, model: str) -> int:
+        """Get the prompt token budget for a model."""
+        return self.prompt_budgets.get(model, self.prompt_token_budget)
+
+    def _pack(self, context: List[Dict[str, str]], budget: int) -> List[Dict[str, str]]:
+        return pack_context(context, budget, ratio=self.calibration.ratio, collapse_chars=self.collapse_chars)
+
+    async def _fetch_reply(
+        self,
+        messages: List[Dict[str, str]],
+        category: Optional[str] = None
+    ) -> Tuple[str, Dict[str, int]]:
+        """
+        Get a cleaned reply from the category's model chain, hedging slow models.
+        
+        Args:
+            messages: Complete message list including the system prompt
+            category: Resolved category of the request
+            
+        Returns:
+            Tuple of (cleaned reply, token usage)
+        """
+        model, reply = await self.engine.hedged(category, lambda model: self._request_reply(messages, category, model))
+        return reply
+
+    async def _request_reply(
+        self,
+        messages: List[Dict[str, str]],
+        category: Optional[str],
+        model: str
+    ) -> Tuple[str, Dict[str, int]]:
+        """
+        Ask one model through the engine and clean the reply.
+        
+        Args:
+            messages: Complete message list including the system prompt
+            category: Resolved category of the request
+            model: Model to ask
+            
+        Returns:
+            Tuple of (cleaned reply, token usage)
+        """
+        started = time.perf_counter()
+        result = await self.engine.complete(model, self._request_body(messages, category, model))
+        choice = result['choices'][0]
+        raw_response = choice['message']['content']
+        # Some providers send "usage": null
+        usage = result.get('usage') or {}
+        self.calibration.record(estimate_messages(messages), usage.get('prompt_tokens') or 0)
+        self.engine.count_tokens(model, category, usage)
+        self.engine.record_reply(category, time.perf_counter() - started, usage, choice.get('finish_reason'))
+        
+        # Clean the response
+        with STAGE_SECONDS.time("clean"):
+            cleaned_response = clean_gpt_reply(raw_response)
+        cleaned_response = self._postprocess(cleaned_response, category)
+        return cleaned_response, self._usage_tokens(usage)
+
+    async def _stream_reply(
+        self,
+        messages: List[Dict[str, str]],
+        category: Optional[str],
+        done: Dict[str, Any]
+    ) -> AsyncIterator[str]:
+        """
+        Stream a reply from the category's model chain, hedging models slow to first text.
+        
+        Args:
+            messages: Complete message list including the system prompt
+            category: Resolved category of the request
+            done: Filled with the final cleaned 'response' and 'tokens' once the stream ends
+            
+        Yields:
+            Text deltas that are safe to show to the user
+        """
+        async def open_stream(model: str):
+            attempt_done: Dict[str, Any] = {}
+            stream = self._stream_model(messages, category, model, attempt_done)
+            try:
+                first = await stream.__anext__()
+            except StopAsyncIteration:
+                first = ""
+            return stream, first, attempt_done
+        
+        async def discard(opened) -> None:
+            await opened[0].aclose()
+        
+        model, (stream, first, attempt_done) = await self.engine.hedged(category, open_stream, discard, first_token=True)
+        try:
+            if first:
+                yield first
+            async for text in stream:
+                yield text
+        finally:
+            await stream.aclose()
+        done.update(attempt_done)
+
+    async def _stream_model(
+        self,
+        messages: List[Dict[str, str]],
+        category: Optional[str],
+        model: str,
+        done: Dict[str, Any]
+    ) -> AsyncIterator[str]:
+        """
+        Stream a reply from one model, yielding cleaned text deltas.
+        
+        Args:
+            messages: Complete message list including the system prompt
+            category: Resolved category of the request
+            model: Model to ask
+            done: Filled with the final cleaned 'response' and 'tokens' once the stream ends
+            
+        Yields:
+            Text deltas that are safe to show to the user
+        """
+        cleaner = StreamingCleaner()
+        usage = {}
+        finish_reason = None
+        started = time.perf_counter()
+        body = self._request_body(messages, category, model, stream=True)
+        async for chunk in self.engine.chunks(model, body):
+            if chunk.get('usage'):
+                usage = chunk['usage']
+            for choice in chunk.get('choices') or []:
+                finish_reason = choice.get('finish_reason') or finish_reason
+                delta = (choice.get('delta') or {}).get('content')
+                if delta:
+                    text = cleaner.feed(delta)
+                    if text:
+                        yield text
+        
+        self.calibration.record(estimate_messages(messages), usage.get('prompt_tokens') or 0)
+        self.engine.count_tokens(model, category, usage)
+        self.engine.record_reply(category, time.perf_counter() - started, usage, finish_reason)
+        cleaned = cleaner.finish()
+        done["response"] = self._postprocess(cleaned, category)
+        done["tokens"] = self._usage_tokens(usage)
+        # The held-back ending, once it is known not to be filler
+        rest = cleaner.rest(cleaned)
+        if rest:
+            yield rest
+
+    def _request_body(
+        self,
+        messages: List[Dict[str, str]],
+        category: Optional[str],
+        model: str,
+        stream: bool = False
+    ) -> bytes:
+        """Encode the upstream body; only the messages after the system prompt are serialized per call."""
+        system_prompt = messages[0]["content"]
+        envelope = self.engine.envelope(
+            (system_prompt, category),
+            model,
+            system_prompt,
+            self.generation_params(category)
+        )
+        return envelope.encode(messages[1:], stream)
+
+    def generation_params(self, category: Optional[str]) -> Dict[str, Any]:
+        """Sampling parameters for a category: the assistant defaults with its category_map overrides."""
+        return {
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "top_p": self.top_p,
+            **get_category_generation(category)
+        }
+
+    def _postprocess(self, cleaned_response: str, category: Optional[str]) -> str:
+        """Log the cleaned reply and apply table formatting for table-style categories."""
+        # Log cleaned output in debug mode
+        if os.getenv("FLASK_DEBUG", "").lower() in ("1", "true", "yes"):
+            logger.debug(f"🧹 Cleaned GPT output: {cleaned_response}")
+        
+        # Format table response if needed
+        if category in ["compare", "price"]:
+            with STAGE_SECONDS.time("format"):
+                formatted_reply = format_table_response(cleaned_response)
+            if formatted_reply:
+                cleaned_response = formatted_reply
+        return cleaned_response
+
+    @staticmethod
+    def _usage_tokens(usage: Dict[str, int]) -> Dict[str, int]:
+        return {
+            "prompt": usage.get('prompt_tokens') or 0,
+            "completion": usage.get('completion_tokens') or 0,
+            "total": usage.get('total_tokens') or 0,
+            "cached": cached_tokens(usage)
+        }
+
+    async def _fetch_and_cache(
+        self,
+        request_key: Tuple,
+        messages: List[Dict[str, str]],
+        category: Optional[str],
+        sketch: Optional[Tuple] = None
+    ) -> Tuple[str, Dict[str, int]]:
+        """Fetch a reply and store it in the response cache (runs once per in-flight key)."""
+        cleaned_response, tokens = await self._fetch_reply(messages, category)
+        self._store(request_key, cleaned_response, tokens, category, sketch)
+        return cleaned_response, tokens
+
+    def _cached(self, request_key: Optional[Tuple], user_input: str) -> Tuple[Optional[Tuple[str, Dict[str, int]]], Optional[Tuple]]:
+        """
+        Look up a reply by the query's exact fingerprint, then among near-duplicate queries.
+
+        Returns:
+            Tuple of (cached (response, tokens) or None, near-duplicate sketch to index the reply under)
+        """
+        if not request_key or self.cache is None:
+            return None, None
+        cached = self.cache.get(request_key)
+        if cached is None and self.shared is not None:
+            cached = self._read_through(request_key)
+        if cached is not None or self.similar is None:
+            return cached, None
+        # Near-duplicates must share language, category and model (the rest of the key)
+        sketch = self.similar.sketch(user_input, request_key[1:])
+        alias = self.similar.find(*sketch)
+        if alias is not None:
+            cached = self.cache.get(alias)
+            if cached is not None:
+                self.near_hits += 1
+        return cached, sketch
+
+    def _read_through(self, request_key: Tuple) -> Optional[Tuple[str, Dict[str, int]]]:
+        """Fetch a reply another worker cached in the shared tier and keep it in-process for its remaining TTL."""
+        found = self.shared.get(request_key)
+        if found is None:
+            return None
+        (cleaned_response, tokens), ttl = found
+        cached = (cleaned_response, tokens)
+        self.cache.set(request_key, cached, size=len(cleaned_response.encode("utf-8")), ttl=ttl)
+        return cached
+
+    def _store(
+        self,
+        request_key: Optional[Tuple],
+        cleaned_response: str,
+        tokens: Dict[str, int],
+        category: Optional[str],
+        sketch: Optional[Tuple] = None
+    ) -> None:
+        if request_key and self.cache is not None:
+            ttl = get_category_ttl(category)
+            self.cache.set(
+                request_key,
+                (cleaned_response, tokens),
+                size=len(cleaned_response.encode("utf-8")),
+                ttl=ttl
+            )
+            if self.shared is not None:
+                # Write-behind: queued here, written to the shared file by a background thread
+                self.shared.put(request_key, [cleaned_response, tokens], self.cache.default_ttl if ttl is None else ttl)
+            if sketch is not None and self.similar is not None:
+                self.similar.add(request_key, *sketch)
+
+    def _new_context(
+        self,
+        context: Optional[List[Dict[str, str]]],
+        prompt: str,
+        cleaned_response: str
+    ) -> List[Dict[str, str]]:
+        budget = self.prompt_budget(self.model) - self._system_tokens
+        exchange = [{"role": "user", "content": prompt}, {"role": "assistant", "content": cleaned_response}]
+        return self._pack(list(context or []) + exchange, budget)
+
+    def _update_context(
+        self,
+        result: Dict[str, Any],
+        context: Optional[List[Dict[str, str]]],
+        session_id: Optional[str],
+        prompt: str,
+        cleaned_response: str
+    ) -> None:
+        """Record the exchange in the session, or return the updated context to clients that keep their own."""
+        if session_id:
+            # The session holds the history; sending it back would only grow every response
+            self.sessions.record(session_id, prompt, cleaned_response)
+        else:
+            result["context"] = self._new_context(context, prompt, cleaned_response)
+
+    def _prepare_request(
+        self,
+        user_input: str,
+        context: Optional[List[Dict[str, str]]],
+        category_override: Optional[str],
+        lang: str
+    ) -> Tuple[List[Dict[str, str]], Optional[str], Optional[Tuple]]:
+        """
+        Build the upstream messages, resolve the category and derive the request key.
+        
+        Returns:
+            Tuple of (messages, category, request key)
+        """
+        # Resolve the category once; the prompt, table formatting and payload all reuse it
+        with STAGE_SECONDS.time("category"):
+            resolved = resolve_category(user_input, category_override)
+        category = resolved[0] if resolved else None
+        
+        # Build the complete prompt
+        with STAGE_SECONDS.time("prompt"):
+            messages = self.build_prompt(user_input, context, category_override, resolved=resolved)
+            
+            # Add system prompt
+            messages.insert(0, {"role": "system", "content": self.system_prompts[lang]})
+        
+        # Follow-ups are keyed by the context actually sent, so only identical conversations share them
+        request_key = make_key(user_input, lang, category, self.models.models(category)[0], messages[1:-1])
+        return messages, category, request_key
+
     async def get_response(
         self,
         user_input: str,
         context: List[Dict[str, str]] = None,
         category_override: Optional[str] = None,
-        lang: str = 'en'
+        lang: str = 'en',
+        session_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Get a response from the assistant.
@@ -102,90 +502,110 @@ class Assistant:
             context: Optional conversation context
             category_override: Optional category to override auto-detection
             lang: Language code ('en' or 'pl')
+            session_id: Optional server-side session; its stored turns are used as context
             
         Returns:
-            Dictionary containing response, context, and category
+            Dictionary containing response, category and session id (and the updated
+            context when no session is used)
         """
+        if session_id and context is None:
+            context = self.sessions.context(session_id)
+        
         try:
-            # Build the complete prompt
-            messages = self.build_prompt(user_input, context, category_override)
-            
-            # Add system prompt
-            messages.insert(0, {"role": "system", "content": self.system_prompts[lang]})
+            messages, category, request_key = self._prepare_request(user_input, context, category_override, lang)
             
-            # Call OpenRouter API
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.api_url,
-                    headers={
-                        "Authorization": f"Bearer {api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": messages,
-                        "max_tokens": self.max_tokens,
-                        "temperature": self.temperature,
-                        "top_p": self.top_p
-                    }
-                )
-                
-                if response.status_code != 200:
-                    raise Exception(f"API error: {response.text}")
-                    
-                result = response.json()
-                raw_response = result['choices'][0]['message']['content']
-                
-                # Clean the response
-                cleaned_response = clean_gpt_reply(raw_response)
-                
-                # Log cleaned output in debug mode
-                if os.getenv("FLASK_DEBUG", "").lower() in ("1", "true", "yes"):
-                    logger.debug(f"🧹 Cleaned GPT output: {cleaned_response}")
-                
-                # Format table response if needed
-                if category_override in ["compare", "price"] or (category_result := detect_category(user_input)) and category_result[0] in ["compare", "price"]:
-                    formatted_reply = format_table_response(cleaned_response)
-                    if formatted_reply:
-                        cleaned_response = formatted_reply
-                
-                # Get category from the last message
-                category = None
-                if messages[-1]["role"] == "user":
-                    if category_override and category_override in category_map:
-                        category = category_override
-                    else:
-                        category_result = detect_category(user_input)
-                        category = category_result[0] if category_result else None
-                
-                # Update context with the new exchange (keep last 5 messages total)
-                new_context = messages[-4:] + [{"role": "assistant", "content": cleaned_response}]
-                
-                # Get token usage
-                usage = result.get('usage', {})
-                tokens = {
-                    "prompt": usage.get('prompt_tokens', 0),
-                    "completion": usage.get('completion_tokens', 0),
-                    "total": usage.get('total_tokens', 0)
-                }
-                
-                # Log success in debug mode
+            cached, sketch = self._cached(request_key, user_input)
+            if cached is not None:
+                cleaned_response, tokens = cached
                 if os.getenv("FLASK_DEBUG", "").lower() in ("1", "true", "yes"):
-                    logger.debug(f"Category: {category}, Tokens: {tokens['total']}")
-                
-                return {
-                    "response": cleaned_response,
-                    "context": new_context,
-                    "category": category,
-                    "tokens": tokens if os.getenv("FLASK_DEBUG", "").lower() in ("1", "true", "yes") else None
-                }
-                
+                    logger.debug(f"Cache hit for category: {category}")
+            else:
+                # Identical concurrent requests share one upstream call
+                cleaned_response, tokens = await self.inflight.do(
+                    request_key,
+                    lambda: self._fetch_and_cache(request_key, messages, category, sketch)
+                )
+            
+            # Log success in debug mode
+            if os.getenv("FLASK_DEBUG", "").lower() in ("1", "true", "yes"):
+                logger.debug(f"Category: {category}, Tokens: {tokens['total']}")
+            
+            result = {
+                "response": cleaned_response,
+                "category": category,
+                "session_id": session_id,
+                "tokens": tokens if os.getenv("FLASK_DEBUG", "").lower() in ("1", "true", "yes") else None
+            }
+            self._update_context(result, context, session_id, messages[-1]["content"], cleaned_response)
+            return result
+            
         except Exception as e:
             # Log the error and return a user-friendly message
+            ERRORS.inc("assistant")
+            logger.error(f"Error: {str(e)}")
+            result = {
+                "response": "I encountered an error. Please try again with a specific category like 'compare' or 'price'.",
+                "category": None,
+                "error": str(e) if os.getenv("FLASK_DEBUG", "").lower() in ("1", "true", "yes") else None
+            }
+            if not session_id:
+                result["context"] = context or []
+            return result
+
+    async def stream_response(
+        self,
+        user_input: str,
+        context: List[Dict[str, str]] = None,
+        category_override: Optional[str] = None,
+        lang: str = 'en',
+        session_id: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream a response from the assistant as it is generated.
+        
+        Args:
+            user_input: The user's input message
+            context: Optional conversation context
+            category_override: Optional category to override auto-detection
+            lang: Language code ('en' or 'pl')
+            session_id: Optional server-side session; its stored turns are used as context
+            
+        Yields:
+            ('delta', {"text"}) events, then one ('done', ...) event with the cleaned
+            response, category, session id and tokens (plus the updated context when no
+            session is used), or an ('error', ...) event
+        """
+        if session_id and context is None:
+            context = self.sessions.context(session_id)
+        
+        try:
+            messages, category, request_key = self._prepare_request(user_input, context, category_override, lang)
+            
+            cached, sketch = self._cached(request_key, user_input)
+            if cached is not None:
+                cleaned_response, tokens = cached
+                yield "delta", {"text": cleaned_response}
+            else:
+                done: Dict[str, Any] = {}
+                async for text in self._stream_reply(messages, category, done):
+                    yield "delta", {"text": text}
+                cleaned_response, tokens = done["response"], done["tokens"]
+                self._store(request_key, cleaned_response, tokens, category, sketch)
+            
+            result = {
+                "response": cleaned_response,
+                "category": category,
+                "session_id": session_id,
+                "tokens": tokens
+            }
+            self._update_context(result, context, session_id, messages[-1]["content"], cleaned_response)
+            yield "done", result
+            
+        except Exception as e:
+            ERRORS.inc("assistant_stream")
             logger.error(f"Error: {str(e)}")
-            return {
+            yield "error", {
                 "response": "I encountered an error. Please try again with a specific category like 'compare' or 'price'.",
-                "context": context or [],
                 "category": None,
                 "error": str(e) if os.getenv("FLASK_DEBUG", "").lower() in ("1", "true", "yes") else None
-            } 
\ No newline at end of file
+            }
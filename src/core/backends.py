@@ -0,0 +1,254 @@
+"""
+Pluggable transports for chat completion requests.
+Every backend takes an encoded OpenAI-style request body and returns an httpx
+response, so admission control, retries, streaming and metrics work the same for
+OpenRouter, any OpenAI-compatible API, blocking SDK clients and the offline mock.
+"""
+
+import json
+import logging
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncContextManager, AsyncIterator, Callable, ContextManager, Dict, Iterator, Optional
+import httpx
+from src.core import settings
+from src.core.http_pool import UpstreamPool, get_shared_pool
+from src.core.offload import OffloadPool, get_offload_pool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OPENAI_BASE_URL = "https://api.openai.com/v1"
+MOCK_URL = "http://mock.invalid/v1/chat/completions"
+
+BACKENDS = ("openrouter", "openai", "openai-sdk", "mock")
+
+
+class Backend(ABC):
+    """
+    Base transport.
+
+    Subclasses implement send() for complete responses and stream() for
+    server-sent-event responses.
+    """
+
+    name = "base"
+    # Provider prefix of OpenRouter model ids that this backend's API does not use (e.g. "openai/")
+    model_prefix = ""
+
+    def __init__(self, api_key: Optional[str]):
+        self.api_key = api_key
+
+    @property
+    def scheduler_key(self) -> str:
+        # Requests with the same API key share one rate-limit budget, whichever service sends them
+        return self.api_key or self.name
+
+    def model_id(self, model: str) -> str:
+        """Translate an OpenRouter model id into this backend's naming."""
+        if self.model_prefix and model.startswith(self.model_prefix):
+            return model[len(self.model_prefix):]
+        return model
+
+    @abstractmethod
+    async def send(self, body: bytes, extensions: Dict[str, Any]) -> httpx.Response:
+        """Send a complete (non-streaming) request."""
+
+    @abstractmethod
+    def stream(self, body: bytes, extensions: Dict[str, Any]) -> AsyncContextManager[httpx.Response]:
+        """Open a streaming request; the response body is read inside the context."""
+
+
+class HTTPBackend(Backend):
+    """Posts to an OpenAI-style chat completions endpoint over the shared connection pool."""
+
+    def __init__(
+        self,
+        url: str,
+        api_key: Optional[str],
+        pool: Optional[UpstreamPool] = None,
+        name: str = "openrouter",
+        extra_headers: Optional[Dict[str, str]] = None
+    ):
+        super().__init__(api_key)
+        self.url = url
+        self.name = name
+        self.pool = pool or get_shared_pool()
+        self.headers = {"Content-Type": "application/json", **(extra_headers or {})}
+        if api_key:
+            self.headers["Authorization"] = f"Bearer {api_key}"
+
+    async def send(self, body: bytes, extensions: Dict[str, Any]) -> httpx.Response:
+        return await self.pool.client.post(self.url, headers=self.headers, content=body, extensions=extensions)
+
+    def stream(self, body: bytes, extensions: Dict[str, Any]) -> AsyncContextManager[httpx.Response]:
+        return self.pool.client.stream("POST", self.url, headers=self.headers, content=body, extensions=extensions)
+
+
+class MockBackend(HTTPBackend):
+    """
+    Offline backend answering every request with a canned reply.
+
+    Needs no API key or network, for local development and smoke tests
+    (benchmarks.mock_openrouter simulates latency and failures for load tests).
+    """
+
+    def __init__(self, reply: str = "This is a mock reply to: {query}"):
+        self.reply = reply
+        super().__init__(MOCK_URL, None, UpstreamPool(transport=httpx.MockTransport(self._handle)), name="mock")
+
+    def _handle(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        user = [m["content"] for m in payload.get("messages", []) if m.get("role") == "user"]
+        text = self.reply.format(query=user[-1] if user else "")
+        usage = {"prompt_tokens": len(request.content) // 4, "completion_tokens": len(text) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        if not payload.get("stream"):
+            return httpx.Response(200, json={
+                "model": payload.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage
+            })
+        # One delta per word, like a real token stream
+        words = text.split(" ")
+        pieces = [word + " " for word in words[:-1]] + words[-1:]
+        events = [{"choices": [{"index": 0, "delta": {"content": piece}}]} for piece in pieces]
+        events[-1]["choices"][0]["finish_reason"] = "stop"
+        events.append({"choices": [], "usage": usage})
+        sse = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+        return httpx.Response(200, content=sse.encode("utf-8"), headers={"Content-Type": "text/event-stream"})
+
+
+class _OffloadedStream(httpx.AsyncByteStream):
+    """Async byte stream pulling each chunk of a blocking response on the offload pool."""
+
+    def __init__(self, chunks: Iterator[bytes], offload: OffloadPool):
+        self._chunks = chunks
+        self._offload = offload
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        while True:
+            chunk = await self._offload.run(next, self._chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+
+class ThreadedBackend(Backend):
+    """
+    Adapter for blocking clients (e.g. vendor SDKs).
+
+    Each call, and each chunk of a streamed reply, runs on the bounded offload pool,
+    so a slow completion never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        api_key: Optional[str],
+        send_blocking: Callable[[bytes], httpx.Response],
+        stream_blocking: Callable[[bytes], ContextManager[httpx.Response]],
+        offload: Optional[OffloadPool] = None
+    ):
+        super().__init__(api_key)
+        self.name = name
+        self._send_blocking = send_blocking
+        self._stream_blocking = stream_blocking
+        self.offload = offload or get_offload_pool()
+
+    async def send(self, body: bytes, extensions: Dict[str, Any]) -> httpx.Response:
+        return await self.offload.run(self._send_blocking, body)
+
+    @asynccontextmanager
+    async def stream(self, body: bytes, extensions: Dict[str, Any]) -> AsyncIterator[httpx.Response]:
+        manager = self._stream_blocking(body)
+        response = await self.offload.run(manager.__enter__)
+        try:
+            # Bytes are already decoded here (iter_bytes also covers bodies the client read up front)
+            headers = [(k, v) for k, v in response.headers.multi_items() if k.lower() != "content-encoding"]
+            yield httpx.Response(
+                response.status_code,
+                headers=headers,
+                stream=_OffloadedStream(response.iter_bytes(), self.offload),
+                request=response.request
+            )
+        finally:
+            await self.offload.run(manager.__exit__, None, None, None)
+
+
+def openai_sdk_backend(api_key: Optional[str], base_url: str) -> ThreadedBackend:
+    """
+    Build a backend on the blocking `openai` SDK client.
+
+    Raises:
+        RuntimeError: If the optional `openai` package is not installed
+    """
+    try:
+        import openai
+    except ImportError:
+        raise RuntimeError("ASSISTANT_BACKEND=openai-sdk requires the 'openai' package")
+
+    # Retries are left to the upstream scheduler, which also enforces the deadline
+    client = openai.OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+
+    def send(body: bytes) -> httpx.Response:
+        try:
+            return client.chat.completions.with_raw_response.create(**json.loads(body)).http_response
+        except openai.APIStatusError as e:
+            return e.response
+
+    @contextmanager
+    def stream(body: bytes) -> Iterator[httpx.Response]:
+        manager = client.chat.completions.with_streaming_response.create(**json.loads(body))
+        try:
+            raw = manager.__enter__()
+        except openai.APIStatusError as e:
+            yield e.response
+            return
+        try:
+            yield raw.http_response
+        finally:
+            manager.__exit__(None, None, None)
+
+    backend = ThreadedBackend("openai-sdk", api_key, send, stream)
+    backend.model_prefix = "openai/"
+    return backend
+
+
+def backend_from_env(
+    pool: Optional[UpstreamPool] = None,
+    extra_headers: Optional[Dict[str, str]] = None,
+    require_key: bool = True,
+    default: str = "openrouter"
+) -> Backend:
+    """
+    Build the backend selected by ASSISTANT_BACKEND (openrouter, openai, openai-sdk or mock).
+
+    Args:
+        pool: Connection pool for HTTP backends (defaults to the shared pool)
+        extra_headers: Additional HTTP headers (e.g. OpenRouter attribution)
+        require_key: Raise if the selected backend has no API key configured
+        default: Backend used when ASSISTANT_BACKEND is not set
+
+    Returns:
+        The configured Backend
+
+    Raises:
+        ValueError: If ASSISTANT_BACKEND names an unknown backend
+    """
+    kind = settings.getenv("ASSISTANT_BACKEND", default).lower()
+    if kind == "mock":
+        return MockBackend()
+    if kind in ("openai", "openai-sdk"):
+        api_key = settings.getenv("OPENAI_API_KEY")
+        if require_key and not api_key:
+            raise Exception("OPENAI_API_KEY not found")
+        base_url = (settings.getenv("OPENAI_BASE_URL") or DEFAULT_OPENAI_BASE_URL).rstrip("/")
+        if kind == "openai-sdk":
+            return openai_sdk_backend(api_key, base_url)
+        backend = HTTPBackend(f"{base_url}/chat/completions", api_key, pool, name="openai")
+        backend.model_prefix = "openai/"
+        return backend
+    if kind != "openrouter":
+        raise ValueError(f"Unknown ASSISTANT_BACKEND {kind!r}, expected one of {', '.join(BACKENDS)}")
+    api_key = settings.require_api_key() if require_key else settings.api_key()
+    return HTTPBackend(settings.api_url(), api_key, pool, name="openrouter", extra_headers=extra_headers)
@@ -0,0 +1,109 @@
+"""
+Batch querying with bounded concurrent fan-out.
+Identical items are answered once and the result is shared by every position.
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from src.core.assistant import LANGUAGES
+from src.core.fingerprint import normalize
+from src.core.settings import getenv
+
+logger = logging.getLogger(__name__)
+
+# (query, lang, category_override)
+BatchItem = Tuple[str, str, Optional[str]]
+
+
+def batch_limits() -> Tuple[int, int, int]:
+    """(max items, default concurrency, max concurrency) from BATCH_* environment variables."""
+    return (
+        int(getenv("BATCH_MAX_ITEMS", "500")),
+        int(getenv("BATCH_CONCURRENCY", "8")),
+        int(getenv("BATCH_MAX_CONCURRENCY", "32"))
+    )
+
+
+def parse_batch(data: Dict[str, Any]) -> Tuple[List[BatchItem], int]:
+    """
+    Validate a batch request body.
+
+    Args:
+        data: Decoded JSON body with "queries" (strings or {"query", "lang", "category_override"})
+            and an optional "concurrency"
+
+    Returns:
+        Tuple of (items, concurrency)
+
+    Raises:
+        ValueError: If the body is malformed or exceeds BATCH_MAX_ITEMS
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object")
+    max_items, default_concurrency, max_concurrency = batch_limits()
+    queries = data.get('queries')
+    if not isinstance(queries, list) or not queries:
+        raise ValueError("'queries' must be a non-empty list")
+    if len(queries) > max_items:
+        raise ValueError(f"At most {max_items} queries per batch")
+
+    items = []
+    for entry in queries:
+        if isinstance(entry, str):
+            entry = {"query": entry}
+        if not isinstance(entry, dict) or not str(entry.get('query', '')).strip():
+            raise ValueError("Every batch item needs a non-empty 'query'")
+        lang = entry.get('lang', 'en')
+        if not isinstance(lang, str) or lang not in LANGUAGES:
+            raise ValueError(f"'lang' must be one of: {', '.join(LANGUAGES)}")
+        category_override = entry.get('category_override')
+        if category_override is not None and not isinstance(category_override, str):
+            raise ValueError("'category_override' must be a string")
+        items.append((str(entry['query']), lang, category_override))
+
+    try:
+        concurrency = int(data.get('concurrency', default_concurrency))
+    except (TypeError, ValueError):
+        raise ValueError("'concurrency' must be an integer")
+    return items, max(1, min(concurrency, max_concurrency))
+
+
+async def run_batch(assistant, items: List[BatchItem], concurrency: int) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Answer batch items concurrently, yielding results as they complete.
+
+    Args:
+        assistant: Assistant used for each item
+        items: Parsed batch items
+        concurrency: Maximum upstream calls in flight for this batch
+
+    Yields:
+        (index, result) pairs in completion order; duplicates share one call
+    """
+    positions: Dict[Tuple, List[int]] = {}
+    unique: Dict[Tuple, BatchItem] = {}
+    for index, (query, lang, category_override) in enumerate(items):
+        key = (normalize(query), lang, category_override)
+        positions.setdefault(key, []).append(index)
+        unique.setdefault(key, (query, lang, category_override))
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def answer(key: Tuple) -> Tuple[Tuple, Dict[str, Any]]:
+        query, lang, category_override = unique[key]
+        async with semaphore:
+            result = await assistant.get_response(query, category_override=category_override, lang=lang)
+        result.pop('context', None)
+        return key, result
+
+    tasks = [asyncio.ensure_future(answer(key)) for key in unique]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            key, result = await finished
+            for index in positions[key]:
+                yield index, result
+    finally:
+        # Stop outstanding work if the consumer went away early
+        for task in tasks:
+            task.cancel()
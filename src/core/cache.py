@@ -0,0 +1,151 @@
+"""
+In-process response cache for the assistant.
+Entries expire by per-category TTL and are evicted least-recently-used once the
+entry count or byte budget is exceeded.
+"""
+
+import json
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from src.core.fingerprint import normalize
+from src.core.settings import getenv
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(
+    prompt: str,
+    lang: str,
+    category: Optional[str],
+    model: str,
+    context: Optional[List[Dict[str, str]]] = None
+) -> Tuple[str, ...]:
+    """
+    Build a cache key for a user query.
+
+    Only case and whitespace are normalized: word order and every word are kept, so
+    "usd to eur" and "eur to usd" get different keys (near-duplicates are matched separately).
+
+    Args:
+        prompt: User query
+        lang: Language code
+        category: Detected or overridden category (None if uncategorized)
+        model: Upstream model id
+        context: Conversation messages sent with the query, if any
+
+    Returns:
+        Hashable cache key (follow-ups also carry a digest of their context)
+    """
+    key = (normalize(prompt), lang, category or "", model)
+    if not context:
+        return key
+    digest = hashlib.sha256(json.dumps(
+        [(message["role"], message["content"]) for message in context], ensure_ascii=False
+    ).encode("utf-8")).hexdigest()[:16]
+    return key + (digest,)
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache bounded by entry count and approximate size in bytes."""
+
+    def __init__(self, max_entries: int = 2048, max_bytes: int = 32 * 1024 * 1024, default_ttl: float = 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Build a cache from CACHE_* environment variables."""
+        return cls(
+            max_entries=int(getenv("CACHE_MAX_ENTRIES", "2048")),
+            max_bytes=int(getenv("CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+            default_ttl=float(getenv("CACHE_DEFAULT_TTL", "3600"))
+        )
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Look up a live entry and mark it as recently used.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value, or None on a miss or expired entry
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Whether a live entry exists, without counting a hit or miss or touching LRU order."""
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def set(self, key: Hashable, value: Any, size: int, ttl: Optional[float] = None) -> None:
+        """
+        Store a value, evicting least-recently-used entries if over budget.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            size: Approximate size of the value in bytes
+            ttl: Time to live in seconds (defaults to default_ttl, <= 0 disables caching)
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with size and hit/miss/eviction counts
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
@@ -0,0 +1,304 @@
+"""
+Opt-in capture of API traffic for replay.
+Each captured request becomes one anonymized JSON line (query, language, category,
+timing, upstream latency and token usage). Requests only queue a small dict; a
+background thread per worker serializes, writes and rotates the log, so capture
+never blocks a request. Replay a capture with `python -m benchmarks.replay`.
+"""
+
+import os
+import re
+import hmac
+import json
+import time
+import queue
+import atexit
+import random
+import hashlib
+import logging
+import functools
+import threading
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from src.core.scheduler import client_var
+from src.core.settings import getenv
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+_UNSET = object()
+
+# Personal data that has no bearing on how a query performs
+_SCRUB = (
+    (re.compile(r"[\w.+-]+@[\w-]+(\.[\w-]+)+"), "<email>"),
+    (re.compile(r"https?://\S+|www\.\S+", re.IGNORECASE), "<url>"),
+    (re.compile(r"\+?\d[\d \-()]{5,}\d"), "<number>"),
+)
+
+# Upstream time and usage of the request being captured (None when not capturing)
+_stats: ContextVar[Optional[Dict[str, float]]] = ContextVar("capture_stats", default=None)
+
+
+def scrub(text: str) -> str:
+    """Replace e-mail addresses, URLs and long digit runs (phone, account numbers) with placeholders."""
+    for pattern, placeholder in _SCRUB:
+        text = pattern.sub(placeholder, text)
+    return text
+
+
+def note_upstream(seconds: float) -> None:
+    """Attribute one upstream call to the request being captured."""
+    stats = _stats.get()
+    if stats is not None:
+        stats["upstream_seconds"] += seconds
+        stats["upstream_calls"] += 1
+
+
+def note_usage(usage: Dict[str, Any]) -> None:
+    """Attribute upstream token usage to the request being captured."""
+    stats = _stats.get()
+    if stats is not None:
+        stats["prompt_tokens"] += usage.get("prompt_tokens") or 0
+        stats["completion_tokens"] += usage.get("completion_tokens") or 0
+
+
+def detach() -> None:
+    """Stop attributing upstream work in the current task (e.g. a background prefetch) to a request."""
+    _stats.set(None)
+
+
+class TrafficCapture:
+    """
+    Rotating JSONL request log written by a background thread.
+
+    Each worker writes its own file (the pid is added before the extension), so
+    workers never interleave lines or race on rotation.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 64 * 1024 * 1024,
+        backups: int = 5,
+        sample: float = 1.0,
+        salt: Optional[str] = None,
+        flush_interval: float = 1.0,
+        queue_size: int = 10000
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.sample = sample
+        # Without a shared salt, client ids cannot be linked across workers or restarts
+        self.salt = (salt or os.urandom(16).hex()).encode("utf-8")
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._writer: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["TrafficCapture"]:
+        """Build a capture from CAPTURE_* environment variables (None unless CAPTURE_PATH is set)."""
+        path = getenv("CAPTURE_PATH")
+        if not path:
+            return None
+        return cls(
+            path,
+            max_bytes=int(getenv("CAPTURE_MAX_BYTES", str(64 * 1024 * 1024))),
+            backups=int(getenv("CAPTURE_BACKUPS", "5")),
+            sample=float(getenv("CAPTURE_SAMPLE", "1")),
+            salt=getenv("CAPTURE_SALT")
+        )
+
+    def worker_path(self) -> str:
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.{os.getpid()}{ext or '.jsonl'}"
+
+    def pseudonym(self, value: Optional[str]) -> Optional[str]:
+        if not value:
+            return None
+        return hmac.new(self.salt, value.encode("utf-8"), hashlib.sha256).hexdigest()[:12]
+
+    def sampled(self) -> bool:
+        return self.sample >= 1 or random.random() < self.sample
+
+    def record(
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        payload: Any,
+        status: int,
+        seconds: float,
+        started: float,
+        stats: Dict[str, float]
+    ) -> None:
+        """
+        Queue one request record (never blocks; dropped when the queue is full).
+
+        Args:
+            endpoint: Request path
+            data: Decoded request body
+            payload: Handler payload (dict, or pre-serialized JSON bytes)
+            status: HTTP status
+            seconds: Handler time
+            started: Wall-clock start time
+            stats: Upstream time and usage noted while handling the request
+        """
+        if isinstance(payload, bytes):
+            # Pre-serialized search replies start with their mode
+            error = payload.startswith(b'{"mode":"error"')
+            category = None
+        else:
+            error = bool(payload.get("error"))
+            category = payload.get("category")
+        item = (started, endpoint, data, category, status, error, seconds, stats, client_var.get())
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def _line(self, item: Tuple) -> str:
+        started, endpoint, data, category, status, error, seconds, stats, client = item
+        query = data.get("query")
+        return json.dumps({
+            "ts": round(started, 3),
+            "endpoint": endpoint,
+            "query": scrub(query) if isinstance(query, str) else None,
+            "lang": data.get("lang"),
+            "category_override": data.get("category_override"),
+            "category": category,
+            "client": self.pseudonym(client),
+            "session": self.pseudonym(data.get("session_id")),
+            "status": status,
+            "error": error,
+            "seconds": round(seconds, 4),
+            "upstream_seconds": round(stats["upstream_seconds"], 4),
+            "upstream_calls": stats["upstream_calls"],
+            "prompt_tokens": stats["prompt_tokens"],
+            "completion_tokens": stats["completion_tokens"]
+        }, ensure_ascii=False) + "\n"
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._writer is None or self._pid != os.getpid():
+                if self._pid != os.getpid():
+                    # Items queued by the parent belong to the parent
+                    self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._writer = threading.Thread(target=self._run, name="chaysh-capture", daemon=True)
+                self._pid = os.getpid()
+                self._writer.start()
+                atexit.register(self.close)
+
+    def _run(self) -> None:
+        path = self.worker_path()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        f = open(path, "a", encoding="utf-8")
+        while True:
+            batch: List[Tuple] = []
+            stop = False
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                while True:
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                if batch:
+                    f.write("".join(self._line(item) for item in batch))
+                    f.flush()
+                    self.written += len(batch)
+                    if f.tell() >= self.max_bytes:
+                        f.close()
+                        self._rotate(path)
+                        f = open(path, "a", encoding="utf-8")
+            except (OSError, ValueError, TypeError) as e:
+                self.errors += 1
+                logger.warning(f"Traffic capture write failed: {str(e)}")
+            if stop:
+                f.close()
+                return
+
+    def _rotate(self, path: str) -> None:
+        # path -> path.1 -> ... -> path.<backups>; the oldest falls off
+        if self.backups <= 0:
+            os.remove(path)
+            return
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{index}"):
+                os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+        os.replace(path, f"{path}.1")
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write queued records and stop this process's writer thread."""
+        if self._writer is None or self._pid != os.getpid():
+            return
+        self._queue.put(_STOP)
+        self._writer.join(timeout)
+        self._writer = None
+
+    def collect_metrics(self):
+        """Metric families for captured, dropped and failed records."""
+        return [(
+            "chaysh_capture_records_total", "counter", "Captured request records by outcome",
+            [({"outcome": "written"}, self.written), ({"outcome": "dropped"}, self.dropped), ({"outcome": "error"}, self.errors)]
+        )]
+
+
+_capture: Any = _UNSET
+_capture_lock = threading.Lock()
+
+
+def get_capture() -> Optional[TrafficCapture]:
+    """
+    Get the process-wide capture, configured on first use.
+
+    Returns:
+        Shared TrafficCapture, or None when CAPTURE_PATH is not set
+    """
+    global _capture
+    if _capture is _UNSET:
+        with _capture_lock:
+            if _capture is _UNSET:
+                _capture = TrafficCapture.from_env()
+                if _capture is not None:
+                    from src.core.metrics import REGISTRY
+                    REGISTRY.add_collector(_capture.collect_metrics)
+    return _capture
+
+
+def captured(endpoint: str):
+    """
+    Capture every call of a shared async handler (`handle_x(data) -> (payload, status)`).
+
+    Args:
+        endpoint: Path recorded for the handler, e.g. "/api/ask"
+    """
+    def decorator(handler: Callable[[Any], Awaitable[Tuple[Any, int]]]):
+        @functools.wraps(handler)
+        async def wrapped(data):
+            capture = get_capture()
+            if capture is None or not isinstance(data, dict) or not capture.sampled():
+                return await handler(data)
+            stats = {"upstream_seconds": 0.0, "upstream_calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+            token = _stats.set(stats)
+            started_at = time.time()
+            started = time.perf_counter()
+            try:
+                payload, status = await handler(data)
+            finally:
+                _stats.reset(token)
+            capture.record(endpoint, data, payload, status, time.perf_counter() - started, started_at, stats)
+            return payload, status
+        return wrapped
+    return decorator
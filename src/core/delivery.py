@@ -0,0 +1,266 @@
+"""
+Precompressed delivery of pages, static assets and JSON responses.
+Pages without per-request state are rendered once and static files read once, each kept
+with gzip (and, when the `brotli` package is installed, brotli) variants and a strong
+ETag, so a page load is a dict lookup plus a 304 or a precompressed body. Static URLs
+carry a content fingerprint (?v=...), which makes them safe to cache as immutable.
+Large JSON API responses are compressed on the fly.
+"""
+
+import os
+import gzip
+import hashlib
+import logging
+import mimetypes
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+from src.core.settings import getenv
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Cached by the browser but revalidated (cheaply, via If-None-Match) on every use
+REVALIDATE = "no-cache"
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Content encodings this process can produce, most preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: Optional[str], encodings: Iterable[str]) -> Optional[str]:
+    """
+    Pick a content encoding acceptable to the client.
+
+    Args:
+        accept_encoding: The request's Accept-Encoding header
+        encodings: Encodings on offer, most preferred first
+
+    Returns:
+        The chosen encoding, or None for the identity encoding
+    """
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    for encoding in encodings:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str, fast: bool = False) -> bytes:
+    """
+    Compress a body.
+
+    Args:
+        body: Uncompressed bytes
+        encoding: "gzip" or "br"
+        fast: Favour speed (responses compressed per request) over ratio (built once)
+
+    Returns:
+        Compressed bytes
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=4 if fast else 11)
+    # mtime=0 keeps the output, and so the ETag, identical across restarts
+    return gzip.compress(body, compresslevel=6 if fast else 9, mtime=0)
+
+
+class PrecompressedAsset:
+    """One response body with its compressed variants and strong ETags."""
+
+    __slots__ = ("content_type", "version", "bodies")
+
+    def __init__(self, body: bytes, content_type: str):
+        self.content_type = content_type
+        self.version = hashlib.sha256(body).hexdigest()[:16]
+        self.bodies: Dict[Optional[str], bytes] = {None: body}
+        for encoding in available_encodings():
+            compressed = compress(body, encoding)
+            if len(compressed) < len(body):
+                self.bodies[encoding] = compressed
+
+    def etag(self, encoding: Optional[str]) -> str:
+        # Strong ETags identify exact bytes, so each encoding gets its own
+        return self.version if encoding is None else f"{self.version}-{encoding}"
+
+    def response(self, request, cache_control: str):
+        """
+        Build the response for a Flask request: 304 if the client's copy is current.
+
+        Args:
+            request: The Flask request
+            cache_control: Cache-Control header value
+        """
+        from flask import Response
+
+        encoding = negotiate(request.headers.get("Accept-Encoding"), [e for e in self.bodies if e])
+        etag = self.etag(encoding)
+        headers = {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304, headers=headers)
+        else:
+            response = Response(self.bodies[encoding], content_type=self.content_type, headers=headers)
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+        response.set_etag(etag)
+        return response
+
+
+class Delivery:
+    """
+    Precompressed pages and static files for one Flask app.
+
+    Pages are templates that render the same for everyone. Everything is built by
+    build() (from create_app, before gunicorn forks) or on first use.
+    """
+
+    def __init__(self, flask_app, pages: Iterable[str] = (), compress_min_size: Optional[int] = None):
+        self.app = flask_app
+        self.page_names = tuple(pages)
+        # None: COMPRESS_MIN_SIZE, resolved on the first response (not at import)
+        self.compress_min_size = compress_min_size
+        self.pages: Dict[str, PrecompressedAsset] = {}
+        self._assets: Optional[Dict[str, PrecompressedAsset]] = None
+        self._built = False
+        self._lock = threading.Lock()
+        self._assets_lock = threading.Lock()
+
+    def install(self) -> "Delivery":
+        """Serve static files from memory, fingerprint their URLs and compress large JSON responses."""
+        self.app.extensions["delivery"] = self
+        if self.app.has_static_folder:
+            self.app.view_functions["static"] = self.static_file
+            self.app.url_defaults(self._fingerprint)
+        self.app.after_request(self.compress_json)
+        return self
+
+    def build(self) -> int:
+        """
+        Read every static file and render every page, with their compressed variants.
+
+        Returns:
+            Number of pages and assets built
+        """
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self._build_pages()
+        return len(self.pages) + len(self.assets)
+
+    def _build_pages(self) -> None:
+        # Rendering calls url_for('static'), which reads the assets first (they are fingerprinted)
+        with self.app.test_request_context("/"):
+            from flask import render_template
+            self.pages = {
+                name: PrecompressedAsset(render_template(name).encode("utf-8"), "text/html; charset=utf-8")
+                for name in self.page_names
+            }
+        self._built = True
+        logger.debug(f"Prebuilt {len(self.pages)} pages and {len(self.assets)} static files")
+
+    @property
+    def assets(self) -> Dict[str, PrecompressedAsset]:
+        """Static files by path relative to the static folder, read on first use."""
+        if self._assets is None:
+            with self._assets_lock:
+                if self._assets is None:
+                    self._assets = self._read_static()
+        return self._assets
+
+    def _read_static(self) -> Dict[str, PrecompressedAsset]:
+        assets = {}
+        folder = self.app.static_folder
+        if not folder or not os.path.isdir(folder):
+            return assets
+        for root, _, files in os.walk(folder):
+            for filename in files:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, folder).replace(os.sep, "/")
+                content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+                    content_type += "; charset=utf-8"
+                with open(path, "rb") as f:
+                    assets[name] = PrecompressedAsset(f.read(), content_type)
+        return assets
+
+    def page(self, name: str):
+        """Response for a prebuilt page (view functions return this instead of render_template)."""
+        from flask import request
+        self.build()
+        return self.pages[name].response(request, REVALIDATE)
+
+    def static_file(self, filename: str):
+        """Replacement for Flask's static view, serving prebuilt assets."""
+        from flask import abort, request
+        asset = self.assets.get(filename)
+        if asset is None:
+            abort(404)
+        # Only a URL naming the current content can be cached forever
+        fingerprinted = request.args.get("v") == asset.version
+        return asset.response(request, IMMUTABLE if fingerprinted else REVALIDATE)
+
+    def _fingerprint(self, endpoint: str, values: Dict) -> None:
+        # url_for('static', filename=...) gains ?v=<content hash>
+        if endpoint == "static" and "filename" in values and "v" not in values:
+            asset = self.assets.get(values["filename"])
+            if asset is not None:
+                values["v"] = asset.version
+
+    def compress_json(self, response):
+        """after_request hook: compress JSON responses of at least compress_min_size bytes."""
+        from flask import request
+        if self.compress_min_size is None:
+            self.compress_min_size = compress_min_size()
+        if (
+            self.compress_min_size <= 0
+            or response.mimetype != "application/json"
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+        body = response.get_data()
+        if len(body) < self.compress_min_size:
+            return response
+        encoding = negotiate(request.headers.get("Accept-Encoding"), available_encodings())
+        if encoding is None:
+            return response
+        response.set_data(compress(body, encoding, fast=True))
+        response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        return response
+
+
+def compress_min_size() -> int:
+    """Smallest JSON response compressed on the fly, in bytes (COMPRESS_MIN_SIZE; 0 disables)."""
+    return int(getenv("COMPRESS_MIN_SIZE", "1024"))
+
+
+def install_delivery(flask_app, pages: Iterable[str] = ()) -> Delivery:
+    """
+    Set up precompressed delivery for a Flask app.
+
+    Args:
+        flask_app: Flask application
+        pages: Templates that render identically for every request
+
+    Returns:
+        The installed Delivery (call build() before forking workers)
+    """
+    return Delivery(flask_app, pages).install()
@@ -0,0 +1,193 @@
+"""
+Completion engine shared by every entry point.
+Sends chat completions through a pluggable backend with admission control, retries,
+per-category model hedging and metrics, so the assistant and /api/search behave alike.
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from src.core.backends import Backend
+from src.core.capture import note_upstream, note_usage
+from src.core.envelope import EnvelopeCache, RequestEnvelope, cached_tokens
+from src.core.hedging import LatencyStats, ModelChain, hedge
+from src.core.metrics import (
+    COMPLETION_TOKENS, REPLY_SECONDS, STAGE_SECONDS, TOKENS, TRUNCATED, UPSTREAM_REQUESTS, UpstreamTrace, with_labels
+)
+from src.core.scheduler import client_var, get_scheduler
+from src.core.streaming import iter_completion_chunks
+from src.core.settings import getenv
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamError(Exception):
+    """Raised when the upstream answers a completion with a non-200 status."""
+
+
+class CompletionEngine:
+    """
+    One backend plus everything around an upstream call.
+
+    Requests are admitted and retried by the per-key scheduler, hedged across the
+    category's model chain using observed latency, and recorded in the metrics.
+    """
+
+    def __init__(self, backend: Backend, models: ModelChain, first_token_budget: float = 1.5):
+        self.backend = backend
+        self.models = models
+        self.scheduler = get_scheduler(backend.scheduler_key)
+        # Request bodies with the static part serialized once
+        self.envelopes = EnvelopeCache()
+        self.latency = LatencyStats()
+        self.first_token = LatencyStats()
+        self.first_token_budget = first_token_budget
+
+    @classmethod
+    def from_env(
+        cls,
+        backend: Backend,
+        default_model: str,
+        chains: Optional[Dict[str, List[str]]] = None
+    ) -> "CompletionEngine":
+        """Build an engine with MODEL_CHAINS / HEDGE_* settings from the environment, over default `chains`."""
+        return cls(
+            backend,
+            ModelChain.from_env(default_model, chains),
+            first_token_budget=float(getenv("HEDGE_TTFT_BUDGET", "1.5"))
+        )
+
+    def envelope(self, key: Hashable, model: str, system_prompt: str, params: Dict[str, Any]) -> RequestEnvelope:
+        """
+        Get the prebuilt request envelope for a model.
+
+        Args:
+            key: Identifies the rest of the static part, e.g. (system prompt, category)
+            model: Model id (OpenRouter naming)
+            system_prompt: Static system prompt
+            params: Sampling parameters (max_tokens, temperature, ...)
+
+        Returns:
+            The shared RequestEnvelope
+        """
+        return self.envelopes.get((model, key), self.backend.model_id(model), system_prompt, params)
+
+    async def hedged(
+        self,
+        chain: Optional[str],
+        attempt: Callable[[str], Awaitable[Any]],
+        discard: Optional[Callable[[Any], Awaitable[None]]] = None,
+        first_token: bool = False
+    ) -> Tuple[str, Any]:
+        """
+        Run attempt(model) over a model chain, hedging to the next model when one is slow.
+
+        Args:
+            chain: Category (or "search") selecting the model chain
+            attempt: Coroutine function performing the request for one model
+            discard: Releases the result of a losing attempt (e.g. an open stream)
+            first_token: Budget by time to first streamed text instead of full reply latency
+
+        Returns:
+            Tuple of (winning model, its result)
+        """
+        if first_token:
+            stats = self.first_token
+            budget = lambda model: self.models.budget(model, stats, self.first_token_budget)
+        else:
+            stats = self.latency
+            budget = lambda model: self.models.budget(model, stats)
+        return await hedge(self.models.models(chain), attempt, budget, stats, discard)
+
+    async def complete(self, model: str, body: bytes) -> Dict[str, Any]:
+        """
+        Send one non-streaming completion.
+
+        Returns:
+            The decoded completion
+
+        Raises:
+            UpstreamError: If the upstream answers with a non-200 status after retries
+        """
+        trace = UpstreamTrace()
+        response = await self.scheduler.send(
+            lambda: self.backend.send(body, {"trace": trace}),
+            client_id=client_var.get()
+        )
+        trace.total()
+        note_upstream(time.perf_counter() - trace.started)
+        UPSTREAM_REQUESTS.inc(model, str(response.status_code))
+        if response.status_code != 200:
+            raise UpstreamError(f"API error {response.status_code}: {response.text}")
+        with STAGE_SECONDS.time("parse"):
+            return response.json()
+
+    async def chunks(self, model: str, body: bytes) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Send one streaming completion and yield its decoded chunks.
+
+        Failed attempts are retried only before anything has been streamed.
+
+        Raises:
+            UpstreamError: If the upstream answers with a non-200 status after retries
+        """
+        deadline = self.scheduler.new_deadline()
+        attempt = 0
+        while True:
+            attempt += 1
+            delay = None
+            async with self.scheduler.slot(client_var.get(), deadline):
+                trace = UpstreamTrace()
+                async with self.backend.stream(body, {"trace": trace}) as response:
+                    UPSTREAM_REQUESTS.inc(model, str(response.status_code))
+                    if response.status_code != 200:
+                        await response.aread()
+                        delay = self.scheduler.retry_delay(attempt, response, deadline)
+                        if delay is None:
+                            raise UpstreamError(f"API error {response.status_code}: {response.text}")
+                    else:
+                        async for chunk in iter_completion_chunks(response):
+                            yield chunk
+                        trace.total()
+                        note_upstream(time.perf_counter() - trace.started)
+            if delay is None:
+                return
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def count_tokens(model: str, category: Optional[str], usage: Dict[str, Any]) -> None:
+        note_usage(usage)
+        category = category or "none"
+        if usage.get('prompt_tokens'):
+            TOKENS.inc(model, category, "prompt", amount=usage['prompt_tokens'])
+        if usage.get('completion_tokens'):
+            TOKENS.inc(model, category, "completion", amount=usage['completion_tokens'])
+        if cached_tokens(usage):
+            TOKENS.inc(model, category, "cached", amount=cached_tokens(usage))
+
+    @staticmethod
+    def record_reply(category: Optional[str], seconds: float, usage: Dict[str, Any], finish_reason: Optional[str]) -> None:
+        """Record a completed reply's latency, output tokens and truncation for per-category budgets."""
+        category = category or "none"
+        REPLY_SECONDS.observe(seconds, category)
+        if usage.get('completion_tokens'):
+            COMPLETION_TOKENS.observe(usage['completion_tokens'], category)
+        if finish_reason == "length":
+            TRUNCATED.inc(category)
+
+    def collect_metrics(self, service: str):
+        """
+        Metric families for admission control and model latency.
+
+        Args:
+            service: Label for this engine's own series; the scheduler is shared per API key,
+                so its series are labelled by upstream instead
+        """
+        return [
+            *with_labels(self.scheduler.collect_metrics(), upstream=self.backend.name),
+            (
+                "chaysh_model_latency_p95_seconds", "gauge", "Observed p95 reply latency per model (hedging budgets)",
+                [({"service": service, "model": model}, stats["p95"]) for model, stats in self.latency.stats().items() if stats["p95"] is not None]
+            )
+        ]
@@ -0,0 +1,118 @@
+"""
+Prebuilt upstream request bodies.
+The static part of a chat completion request (model, sampling parameters and system
+prompt) is serialized once per (model, lang, category); each call only encodes its own
+messages. Where the provider supports it, the system prompt is marked for prompt caching.
+"""
+
+import json
+import threading
+from typing import Any, Dict, Hashable, List, Optional
+from src.core.settings import getenv
+
+# OpenRouter caches OpenAI, DeepSeek and Grok prompts automatically; these need explicit breakpoints
+DEFAULT_CACHE_CONTROL_MODELS = "anthropic/,google/gemini"
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def cache_control_models() -> List[str]:
+    """Model id prefixes whose system prompt is marked with cache_control (PROMPT_CACHE_MODELS)."""
+    if getenv("PROMPT_CACHE", "1").lower() not in ("1", "true", "yes"):
+        return []
+    prefixes = getenv("PROMPT_CACHE_MODELS", DEFAULT_CACHE_CONTROL_MODELS)
+    return [prefix.strip() for prefix in prefixes.split(",") if prefix.strip()]
+
+
+def system_message(text: str, cache_control: bool) -> Dict[str, Any]:
+    """
+    Build a system message, optionally marked as a prompt-cache breakpoint.
+
+    Args:
+        text: System prompt
+        cache_control: Mark the prompt as cacheable (Anthropic / Gemini style)
+
+    Returns:
+        Chat message dict
+    """
+    if not cache_control:
+        return {"role": "system", "content": text}
+    return {"role": "system", "content": [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]}
+
+
+def cached_tokens(usage: Dict[str, Any]) -> int:
+    """Prompt tokens the provider served from its prompt cache, per the usage block."""
+    details = usage.get("prompt_tokens_details") or {}
+    return details.get("cached_tokens") or 0
+
+
+class RequestEnvelope:
+    """
+    A chat completion body with its static part already serialized.
+
+    The system prompt always comes first, which is also what lets providers reuse
+    their cached prefix between calls.
+    """
+
+    def __init__(self, model: str, system_prompt: str, params: Dict[str, Any], cache_control: bool = False):
+        self.model = model
+        self.system = system_message(system_prompt, cache_control)
+        body = {"model": model, **params}
+        # "messages" is serialized last, so each body is a prefix + this call's messages + "]}"
+        self._prefix = _dumps({**body, "messages": [self.system]})[:-2].encode("utf-8")
+        self._stream_prefix = _dumps({
+            **body, "stream": True, "stream_options": {"include_usage": True}, "messages": [self.system]
+        })[:-2].encode("utf-8")
+
+    def encode(self, messages: List[Dict[str, Any]], stream: bool = False) -> bytes:
+        """
+        Serialize the body for one call.
+
+        Args:
+            messages: Messages following the system prompt
+            stream: Request a streamed (SSE) response with usage in the final chunk
+
+        Returns:
+            UTF-8 JSON request body
+        """
+        prefix = self._stream_prefix if stream else self._prefix
+        if not messages:
+            return prefix + b"]}"
+        return prefix + b"," + _dumps(messages)[1:-1].encode("utf-8") + b"]}"
+
+
+class EnvelopeCache:
+    """Builds each request envelope once and reuses it for the life of the process."""
+
+    def __init__(self, cache_control_prefixes: Optional[List[str]] = None):
+        self.cache_control_prefixes = cache_control_models() if cache_control_prefixes is None else cache_control_prefixes
+        self._envelopes: Dict[Hashable, RequestEnvelope] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, model: str, system_prompt: str, params: Dict[str, Any]) -> RequestEnvelope:
+        """
+        Get the envelope for a key, building it on first use.
+
+        Args:
+            key: Identifies the static part, e.g. (model, lang, category)
+            model: Upstream model id
+            system_prompt: Static system prompt
+            params: Sampling parameters (max_tokens, temperature, ...)
+
+        Returns:
+            The shared RequestEnvelope
+        """
+        envelope = self._envelopes.get(key)
+        if envelope is None:
+            with self._lock:
+                envelope = self._envelopes.get(key)
+                if envelope is None:
+                    cache_control = any(model.startswith(prefix) for prefix in self.cache_control_prefixes)
+                    envelope = RequestEnvelope(model, system_prompt, params, cache_control)
+                    self._envelopes[key] = envelope
+        return envelope
+
+    def __len__(self) -> int:
+        return len(self._envelopes)
@@ -0,0 +1,223 @@
+"""
+Query fingerprints for the response cache (English and Polish aware).
+Exact cache keys use the query with case and whitespace normalized; word order is kept,
+since it carries meaning ("from warsaw to london"). A MinHash/LSH index over the character
+trigrams of the content words then proposes near-duplicates such as typos ("powownaj"),
+and a candidate only matches if its words line up with the query's in order.
+"""
+
+import re
+import struct
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, FrozenSet, Hashable, Iterable, List, NamedTuple, Optional, Set, Tuple
+from src.core.settings import getenv
+
+# Letters without a Unicode decomposition to an ASCII base
+_FOLD = str.maketrans({"ł": "l", "ß": "ss", "æ": "ae", "ø": "o", "đ": "d"})
+_WORD = re.compile(r"\w+")
+
+# Stored folded, like the tokens they are compared against. Negations are kept on purpose.
+STOPWORDS: FrozenSet[str] = frozenset("""
+a an the and or of to in on at for from by with about as into than then
+is are was were be been being do does did has have had will would can could should
+i me my you your we our it its this that these those there here
+please tell show give find some any just also
+how what which
+czy i a o w we z ze na do od po za u przy dla to ten ta te tego tej tym sie
+jest sa byl byla bylo mi mnie ci ty my wy on ona ono oni jak jaki jaka jakie ktory ktora
+prosze powiedz pokaz podaj daj znajdz mozesz moglbys
+""".split())
+
+def fold(text: str) -> str:
+    """Lowercase and strip diacritics ("Porównaj Łódź" -> "porownaj lodz")."""
+    text = unicodedata.normalize("NFKD", text.lower().translate(_FOLD))
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokens(text: str) -> List[str]:
+    """Folded words of a query without stopwords, in their original order."""
+    return [word for word in _WORD.findall(fold(text)) if word not in STOPWORDS]
+
+
+def normalize(text: str) -> str:
+    """Exact fingerprint of a query: the text lowercased, with runs of whitespace collapsed."""
+    return " ".join(text.casefold().split())
+
+
+def anchors(words: List[str]) -> Tuple[str, ...]:
+    """
+    Tokens that must match exactly for two queries to count as near-duplicates.
+
+    Numbers and short words ("iphone 15" vs "iphone 16", "model s" vs "model y",
+    "java" vs "lava") change the meaning while barely changing the trigram set.
+    """
+    return tuple(sorted({w for w in words if len(w) <= 4 or any(c.isdigit() for c in w)}))
+
+
+def shingles(words: Iterable[str]) -> Set[str]:
+    """Character trigrams of each word, with word boundaries marked."""
+    grams = set()
+    for word in words:
+        padded = f"#{word}#"
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+def within_one_edit(a: str, b: str) -> bool:
+    """True if a and b differ by at most one insertion, deletion, substitution or transposition."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        swapped = i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i]
+        return a[i + 1:] == b[i + 1:] or (swapped and a[i + 2:] == b[i + 2:])
+    if len(a) > len(b):
+        return a[i + 1:] == b[i:]
+    return a[i:] == b[i + 1:]
+
+
+def aligned(words: Tuple[str, ...], other: Tuple[str, ...]) -> bool:
+    """
+    True if the queries have the same words in the same order, allowing one typo per word.
+
+    Numbers and short words (see anchors) must match exactly, so "to" never stands in for "do".
+    """
+    if len(words) != len(other):
+        return False
+    for word, candidate in zip(words, other):
+        if word != candidate and (len(word) <= 4 or any(c.isdigit() for c in word) or not within_one_edit(word, candidate)):
+            return False
+    return True
+
+
+@lru_cache(maxsize=65536)
+def _word_minhash(word: str, num_perm: int) -> Tuple[int, ...]:
+    # One independent 32-bit hash per permutation from a single extendable-output digest per trigram
+    hashes = [
+        struct.unpack(f"<{num_perm}I", hashlib.shake_128(gram.encode()).digest(4 * num_perm))
+        for gram in shingles((word,))
+    ]
+    return tuple(map(min, zip(*hashes)))
+
+
+class Fingerprint(NamedTuple):
+    minhash: Tuple[int, ...]
+    words: Tuple[str, ...]  # All folded words of the query, in order
+    grams: FrozenSet[str]
+
+
+class NearDuplicateIndex:
+    """
+    Thread-safe MinHash/LSH index from query fingerprints to cache keys.
+
+    Entries only match within the same scope (language, category, model and anchor
+    tokens). LSH buckets propose candidates; a candidate matches if its words line up with
+    the query's in order with at most one typo each and the trigram Jaccard similarity
+    reaches the threshold. The oldest entries are dropped once max_entries is exceeded.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.5,
+        num_perm: int = 60,
+        bands: int = 20,
+        max_entries: int = 2048
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Fingerprint, List[Hashable]]]" = OrderedDict()
+        self._buckets: Dict[Hashable, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["NearDuplicateIndex"]:
+        """Build an index from CACHE_SIMILARITY (0 disables near-duplicate matching)."""
+        threshold = float(getenv("CACHE_SIMILARITY", "0.5"))
+        if threshold <= 0 or threshold > 1:
+            return None
+        return cls(threshold=threshold, max_entries=int(getenv("CACHE_MAX_ENTRIES", "2048")))
+
+    def sketch(self, text: str, scope: Tuple) -> Tuple[Hashable, Fingerprint]:
+        """
+        Fingerprint a query for find() and add().
+
+        Args:
+            text: User query
+            scope: Hashable context the match must share (e.g. language, category, model)
+
+        Returns:
+            Tuple of (full scope including anchor tokens, fingerprint)
+        """
+        words = tokens(text)
+        fixed = anchors(words)
+        grams = frozenset(shingles(words))
+        if words:
+            # The MinHash of a union is the elementwise minimum of the parts' MinHashes
+            minhash = tuple(map(min, zip(*(_word_minhash(word, self.num_perm) for word in set(words)))))
+        else:
+            minhash = (0,) * self.num_perm
+        # Stopwords are kept for the final check: "from" and "to" decide what a query asks
+        ordered = tuple(_WORD.findall(fold(text)))
+        return (*scope, fixed), Fingerprint(minhash, ordered, grams)
+
+    def _bands(self, scope: Hashable, fingerprint: Fingerprint) -> List[Hashable]:
+        rows, minhash = self.rows, fingerprint.minhash
+        return [(scope, band, minhash[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+
+    def find(self, scope: Hashable, fingerprint: Fingerprint) -> Optional[Hashable]:
+        """
+        Look up the most similar stored query.
+
+        Returns:
+            Its cache key if it is a near-duplicate of the fingerprinted query, otherwise None
+        """
+        best_key, best = None, self.threshold
+        with self._lock:
+            candidates = set()
+            for band in self._bands(scope, fingerprint):
+                candidates.update(self._buckets.get(band, ()))
+            for key in candidates:
+                stored = self._entries[key][0]
+                union = len(fingerprint.grams | stored.grams)
+                similarity = len(fingerprint.grams & stored.grams) / union if union else 1.0
+                if similarity >= best and aligned(fingerprint.words, stored.words):
+                    best_key, best = key, similarity
+        return best_key
+
+    def add(self, key: Hashable, scope: Hashable, fingerprint: Fingerprint) -> None:
+        """Index a cache key under its query fingerprint."""
+        bands = self._bands(scope, fingerprint)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (fingerprint, bands)
+            for band in bands:
+                self._buckets.setdefault(band, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Hashable) -> None:
+        _, bands = self._entries.pop(key)
+        for band in bands:
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band]
+
+    def __len__(self) -> int:
+        return len(self._entries)
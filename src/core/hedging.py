@@ -0,0 +1,226 @@
+"""
+Latency-budgeted model fallback chains.
+Each category has an ordered list of models. If the current model has not answered
+within its latency budget, a hedged request goes to the next model; the first good
+answer wins and the others are cancelled. Budgets follow observed per-model latency.
+"""
+
+import json
+import time
+import asyncio
+import threading
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+from src.core.settings import getenv
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LatencyStats:
+    """Rolling window of per-model latencies (seconds) and error counts."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(model)
+            if samples is None:
+                samples = self._samples[model] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def record_error(self, model: str) -> None:
+        with self._lock:
+            self._errors[model] = self._errors.get(model, 0) + 1
+
+    def count(self, model: str) -> int:
+        samples = self._samples.get(model)
+        return len(samples) if samples else 0
+
+    def quantile(self, model: str, q: float) -> Optional[float]:
+        """
+        Get a latency quantile for a model.
+
+        Args:
+            model: Model identifier
+            q: Quantile in [0, 1]
+
+        Returns:
+            Latency in seconds, or None without samples
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(model) or ())
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        models = set(self._samples) | set(self._errors)
+        return {
+            model: {
+                "count": self.count(model),
+                "errors": self._errors.get(model, 0),
+                "p50": self.quantile(model, 0.5),
+                "p95": self.quantile(model, 0.95)
+            }
+            for model in sorted(models)
+        }
+
+
+class ModelChain:
+    """Ordered model lists per category with latency budgets derived from LatencyStats."""
+
+    def __init__(
+        self,
+        default_model: str,
+        chains: Optional[Dict[str, List[str]]] = None,
+        default_budget: float = 4.0,
+        quantile: float = 0.95,
+        min_budget: float = 0.5,
+        max_budget: float = 15.0,
+        min_samples: int = 20
+    ):
+        self.chains = dict(chains or {})
+        self.chains.setdefault("default", [default_model])
+        self.default_budget = default_budget
+        self.quantile = quantile
+        self.min_budget = min_budget
+        self.max_budget = max_budget
+        self.min_samples = min_samples
+
+    @classmethod
+    def from_env(cls, default_model: str, defaults: Optional[Dict[str, List[str]]] = None) -> "ModelChain":
+        """
+        Build a chain from MODEL_CHAINS and HEDGE_* environment variables.
+
+        MODEL_CHAINS is a JSON object mapping a category (or "default") to a list of models;
+        its entries replace the corresponding `defaults` (e.g. models set in category_map).
+        """
+        return cls(
+            default_model,
+            chains={**(defaults or {}), **json.loads(getenv("MODEL_CHAINS", "{}"))},
+            default_budget=float(getenv("HEDGE_BUDGET", "4")),
+            quantile=float(getenv("HEDGE_QUANTILE", "0.95")),
+            min_budget=float(getenv("HEDGE_MIN_BUDGET", "0.5")),
+            max_budget=float(getenv("HEDGE_MAX_BUDGET", "15"))
+        )
+
+    @property
+    def primary(self) -> str:
+        return self.chains["default"][0]
+
+    def models(self, category: Optional[str]) -> List[str]:
+        """Get the ordered models for a category (falls back to the default chain)."""
+        return self.chains.get(category) or self.chains["default"]
+
+    def budget(self, model: str, stats: LatencyStats, default: Optional[float] = None) -> float:
+        """
+        Get how long to wait on a model before hedging to the next one.
+
+        Args:
+            model: Model identifier
+            stats: Observed latencies for the kind of wait (full reply or first token)
+            default: Budget until enough samples exist (defaults to HEDGE_BUDGET)
+
+        Returns:
+            Budget in seconds
+        """
+        if stats.count(model) < self.min_samples:
+            return self.default_budget if default is None else default
+        observed = stats.quantile(model, self.quantile)
+        return min(self.max_budget, max(self.min_budget, observed))
+
+
+async def hedge(
+    models: List[str],
+    attempt: Callable[[str], Awaitable[T]],
+    budget: Callable[[str], float],
+    stats: LatencyStats,
+    discard: Optional[Callable[[T], Awaitable[None]]] = None
+) -> Tuple[str, T]:
+    """
+    Run `attempt` on the first model, hedging to the next whenever a budget expires.
+
+    A failed attempt moves on to the next model immediately. The first successful
+    result wins and every other attempt is cancelled.
+
+    Args:
+        models: Ordered model identifiers
+        attempt: Coroutine factory performing one request against a model
+        budget: Latency budget (seconds) per model
+        stats: Latency stats updated with each finished attempt
+        discard: Cleanup for a successful result that lost the race
+
+    Returns:
+        Tuple of (winning model, result)
+
+    Raises:
+        Exception: The last error if every model failed
+    """
+    async def timed(model: str) -> T:
+        started = time.monotonic()
+        try:
+            result = await attempt(model)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            stats.record_error(model)
+            raise
+        stats.record(model, time.monotonic() - started)
+        return result
+
+    if len(models) == 1:
+        return models[0], await timed(models[0])
+
+    remaining = list(models)
+    pending: Dict[asyncio.Future, str] = {}
+    last_error: Optional[BaseException] = None
+    hedge_at = 0.0
+
+    def launch() -> None:
+        nonlocal hedge_at
+        model = remaining.pop(0)
+        pending[asyncio.ensure_future(timed(model))] = model
+        hedge_at = time.monotonic() + budget(model)
+
+    launch()
+    try:
+        while pending:
+            timeout = max(0.0, hedge_at - time.monotonic()) if remaining else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                logger.info(f"Hedging {pending[next(iter(pending))]} -> {remaining[0]} after budget expired")
+                launch()
+                continue
+
+            winner = None
+            for task in done:
+                model = pending.pop(task)
+                if task.exception() is not None:
+                    last_error = task.exception()
+                    logger.warning(f"Model {model} failed: {last_error}")
+                elif winner is None:
+                    winner = model, task.result()
+                elif discard is not None:
+                    await discard(task.result())
+            if winner is not None:
+                return winner
+            if remaining:
+                launch()
+        raise last_error
+    finally:
+        # Cancel the losers and wait for them, so none is left pending or with an unretrieved error
+        losers = list(pending)
+        for task in losers:
+            task.cancel()
+        if losers:
+            for result in await asyncio.gather(*losers, return_exceptions=True):
+                # A loser that finished before its cancellation took effect
+                if discard is not None and not isinstance(result, BaseException):
+                    await discard(result)
@@ -0,0 +1,146 @@
+"""
+Process-wide pooled HTTP client for upstream (OpenRouter) calls.
+Keeps connections alive across requests so steady-state queries skip DNS, TCP and TLS.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+import httpx
+from src.core.settings import getenv
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WARMUP_URL = "https://openrouter.ai/api/v1/models"
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class UpstreamPool:
+    """
+    Owns a single keep-alive `httpx.AsyncClient` per event loop.
+
+    httpx connections are bound to the loop that opened them, so the client is
+    rebuilt if it is asked for from a different loop than the one it was created on.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive: int = 20,
+        keepalive_expiry: float = 60.0,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        http2: bool = False,
+        warmup_url: str = DEFAULT_WARMUP_URL,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.http2 = http2 and _http2_available()
+        if http2 and not self.http2:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed, using HTTP/1.1")
+        self.warmup_url = warmup_url
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def from_env(cls) -> "UpstreamPool":
+        """Build a pool from UPSTREAM_* environment variables."""
+        return cls(
+            max_connections=_env_int("UPSTREAM_MAX_CONNECTIONS", 100),
+            max_keepalive=_env_int("UPSTREAM_MAX_KEEPALIVE", 20),
+            keepalive_expiry=_env_float("UPSTREAM_KEEPALIVE_EXPIRY", 60.0),
+            connect_timeout=_env_float("UPSTREAM_CONNECT_TIMEOUT", 5.0),
+            read_timeout=_env_float("UPSTREAM_READ_TIMEOUT", 60.0),
+            http2=getenv("UPSTREAM_HTTP2", "").lower() in ("1", "true", "yes"),
+            warmup_url=getenv("UPSTREAM_WARMUP_URL", DEFAULT_WARMUP_URL)
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Get the pooled client for the running event loop.
+
+        Returns:
+            Shared AsyncClient bound to the current loop
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            if self._client is not None and not self._client.is_closed:
+                # The old loop is gone (or different); its sockets cannot be reused here
+                logger.debug("Rebinding upstream pool to a new event loop")
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2,
+                transport=self.transport
+            )
+            self._loop = loop
+        return self._client
+
+    async def warmup(self, connections: int = 1) -> None:
+        """
+        Open connections ahead of the first real request.
+
+        Args:
+            connections: Number of concurrent connections to establish
+        """
+        client = self.client
+
+        async def _touch():
+            try:
+                await client.get(self.warmup_url)
+            except httpx.HTTPError as e:
+                logger.warning(f"Upstream warm-up failed: {str(e)}")
+
+        await asyncio.gather(*(_touch() for _ in range(max(1, connections))))
+        logger.info(f"Upstream pool warmed ({connections} connection(s), http2={self.http2})")
+
+    async def aclose(self) -> None:
+        """Close the pooled client and release its connections."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+
+_shared_pool: Optional[UpstreamPool] = None
+
+
+def get_shared_pool() -> UpstreamPool:
+    """
+    Get the process-wide upstream pool, creating it on first use.
+
+    Returns:
+        Shared UpstreamPool instance
+    """
+    global _shared_pool
+    if _shared_pool is None:
+        _shared_pool = UpstreamPool.from_env()
+    return _shared_pool
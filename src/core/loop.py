@@ -0,0 +1,100 @@
+"""
+Long-lived event loop for running async work from synchronous (WSGI) views.
+One loop per worker process, so pooled upstream connections survive between requests.
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Awaitable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundLoop:
+    """Runs an asyncio loop in a daemon thread and executes coroutines on it."""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Get the worker loop, starting it on first use (and again after a fork).
+
+        Returns:
+            The running background event loop
+        """
+        if self._loop is None or self._pid != os.getpid():
+            with self._lock:
+                if self._loop is None or self._pid != os.getpid():
+                    self._start()
+        return self._loop
+
+    def _start(self) -> None:
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _run():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        thread = threading.Thread(target=_run, name="chaysh-loop", daemon=True)
+        thread.start()
+        ready.wait()
+        self._loop, self._thread, self._pid = loop, thread, os.getpid()
+        logger.debug(f"Background event loop started in pid {self._pid}")
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the worker loop and block until it finishes.
+
+        Args:
+            coro: Coroutine to execute
+            timeout: Optional timeout in seconds
+
+        Returns:
+            The coroutine's result
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return future.result(timeout)
+
+    def iterate(self, agen: AsyncIterator[Any]) -> Iterator[Any]:
+        """
+        Drive an async generator from synchronous code (e.g. a streamed WSGI response).
+
+        Args:
+            agen: Async generator to consume on the worker loop
+
+        Yields:
+            Items produced by the async generator
+        """
+        async def _next():
+            return await agen.__anext__()
+
+        try:
+            while True:
+                try:
+                    yield self.run(_next())
+                except StopAsyncIteration:
+                    return
+        finally:
+            # Also runs when the client disconnects and the WSGI server closes us early
+            self.run(agen.aclose())
+
+    def stop(self) -> None:
+        """Stop the loop and join its thread."""
+        if self._loop is None or self._pid != os.getpid():
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+        self._loop = self._thread = self._pid = None
+
+
+background_loop = BackgroundLoop()
@@ -0,0 +1,270 @@
+"""
+In-process metrics in Prometheus text format.
+Counters and histograms are plain dicts behind a lock, so recording a sample costs
+a perf_counter() call and a bisect; rendering happens only when /metrics is scraped.
+Each worker process keeps (and reports) its own metrics.
+"""
+
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request stages span ~100us (category detection) to tens of seconds (upstream)
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# (metric name, type, help, [(labels, value)])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = STAGE_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str):
+        """Observe the duration of the enclosed block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics plus collectors that report live values at scrape time."""
+
+    def __init__(self):
+        self.metrics: List = []
+        self.collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = STAGE_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        """
+        Register a callable returning metric families computed at scrape time.
+
+        Args:
+            collector: Returns (name, type, help, [(labels, value)]) tuples
+        """
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        """Render every metric in Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        # Collectors may report the same family (e.g. two services sharing a scheduler):
+        # one header per family, and a series reported twice is only rendered once
+        families: Dict[str, Tuple[str, str, Dict[Tuple, float]]] = {}
+        for collector in self.collectors:
+            for name, kind, help, samples in collector():
+                series = families.setdefault(name, (kind, help, {}))[2]
+                for labels, value in samples:
+                    series.setdefault(tuple(labels.items()), value)
+        for name, (kind, help, series) in families.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in series.items():
+                lines.append(f"{name}{_labels([k for k, _ in labels], [v for _, v in labels])} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def with_labels(families: Iterable[Family], **labels: str) -> List[Family]:
+    """Add constant labels (e.g. the reporting service) to every sample of collected families."""
+    return [
+        (name, kind, help, [({**labels, **sample_labels}, value) for sample_labels, value in samples])
+        for name, kind, help, samples in families
+    ]
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "chaysh_stage_seconds",
+    "Time spent in each stage of a request",
+    ("stage",)
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "chaysh_request_seconds",
+    "End-to-end handler time per route",
+    ("route",)
+)
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    "chaysh_upstream_requests_total",
+    "Upstream completion requests by model and HTTP status",
+    ("model", "status")
+)
+TOKENS = REGISTRY.counter(
+    "chaysh_tokens_total",
+    "Tokens reported by the upstream, by model, category and kind (prompt/completion/cached prompt)",
+    ("model", "category", "kind")
+)
+REPLY_SECONDS = REGISTRY.histogram(
+    "chaysh_reply_seconds",
+    "Upstream time per completed reply by category (full reply, including streaming)",
+    ("category",)
+)
+COMPLETION_TOKENS = REGISTRY.histogram(
+    "chaysh_completion_tokens",
+    "Output tokens per completed reply by category",
+    ("category",),
+    buckets=(16, 32, 64, 96, 128, 192, 256, 384, 512, 768, 1024, 2048)
+)
+TRUNCATED = REGISTRY.counter(
+    "chaysh_truncated_replies_total",
+    "Replies cut off by their max_tokens budget, by category",
+    ("category",)
+)
+ERRORS = REGISTRY.counter(
+    "chaysh_errors_total",
+    "Errors by where they were handled",
+    ("source",)
+)
+
+
+class UpstreamTrace:
+    """
+    httpx/httpcore trace hook recording connect and time-to-first-byte stages.
+
+    Pass an instance as `extensions={"trace": trace}` on an upstream request.
+    Connection setup is only observed when a new connection had to be opened.
+    """
+
+    __slots__ = ("started", "_connect_started")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._connect_started: Optional[float] = None
+
+    async def __call__(self, event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.started":
+            self._connect_started = time.perf_counter()
+        elif self._connect_started is not None and (
+            event == "connection.start_tls.complete" or event.endswith(".send_request_headers.started")
+        ):
+            # TCP + TLS, or TCP alone for plain-HTTP upstreams
+            STAGE_SECONDS.observe(time.perf_counter() - self._connect_started, "upstream_connect")
+            self._connect_started = None
+        elif event.endswith(".receive_response_headers.complete"):
+            STAGE_SECONDS.observe(time.perf_counter() - self.started, "upstream_ttfb")
+
+    def total(self) -> None:
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, "upstream_total")
+
+
+def register_flask(app) -> None:
+    """
+    Time every Flask request per route and serve GET /metrics.
+
+    Args:
+        app: Flask application
+    """
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - started, route)
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
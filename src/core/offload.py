@@ -0,0 +1,63 @@
+"""
+Bounded thread pool for blocking calls made from async code.
+Blocking SDK calls run here instead of on the event loop; the pool size caps how many
+threads they can tie up, and excess calls queue rather than spawning more threads.
+"""
+
+import os
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from src.core.settings import getenv
+
+
+class OffloadPool:
+    """A ThreadPoolExecutor created lazily per process (a fork does not inherit its threads)."""
+
+    def __init__(self, max_workers: int = 16):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="chaysh-offload")
+                    self._pid = os.getpid()
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run a blocking callable on the pool and await its result.
+
+        Args:
+            func: Blocking callable
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            func's return value (its exception is re-raised here)
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+
+_shared_offload: Optional[OffloadPool] = None
+
+
+def get_offload_pool() -> OffloadPool:
+    """
+    Get the process-wide offload pool (OFFLOAD_THREADS threads, default 16).
+
+    Returns:
+        Shared OffloadPool instance
+    """
+    global _shared_offload
+    if _shared_offload is None:
+        _shared_offload = OffloadPool(int(getenv("OFFLOAD_THREADS", "16")))
+    return _shared_offload
@@ -0,0 +1,184 @@
+"""
+Speculative prefetch of likely follow-up queries.
+After a reply is returned, its top suggestions are fetched in the background so a click
+is a cache hit. Prefetching is low priority: it has its own small concurrency budget,
+backs off whenever real requests are queued for the upstream, stops at a daily token
+cap, and gives up on (and expires) prefetches not consumed within a window.
+"""
+
+import time
+import asyncio
+import logging
+import datetime
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set
+from src.core.settings import getenv
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """
+    Background warmer for a cache.
+
+    `fetch(query)` fetches one query into the cache and returns the tokens it used
+    (0 when the query was already cached). `key(query)` maps a query to its cache key,
+    so consumption can be tracked; `busy()` reports whether user requests are waiting.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[int]],
+        key: Callable[[str], Hashable],
+        busy: Optional[Callable[[], bool]] = None,
+        top_n: int = 3,
+        concurrency: int = 2,
+        daily_tokens: int = 200000,
+        window: float = 120.0
+    ):
+        self.fetch = fetch
+        self.key = key
+        self.busy = busy or (lambda: False)
+        self.top_n = top_n
+        self.daily_tokens = daily_tokens
+        self.window = window
+        self.concurrency = concurrency
+        # Created on first use, on the loop that runs the prefetches
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Set[asyncio.Task] = set()
+        # Prefetched keys not yet consumed -> monotonic deadline
+        self._unconsumed: Dict[Hashable, float] = {}
+        self._day = self._today()
+        self.tokens_today = 0
+        self.scheduled = 0
+        self.completed = 0
+        self.consumed_hits = 0
+        self.expired = 0
+        self.cancelled = 0
+        self.skipped = 0
+
+    @classmethod
+    def from_env(
+        cls,
+        fetch: Callable[[str], Awaitable[int]],
+        key: Callable[[str], Hashable],
+        busy: Optional[Callable[[], bool]] = None
+    ) -> Optional["Prefetcher"]:
+        """
+        Build a prefetcher from PREFETCH_* environment variables.
+
+        Returns:
+            The Prefetcher, or None unless PREFETCH_ENABLED is set
+        """
+        if getenv("PREFETCH_ENABLED", "").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            fetch,
+            key,
+            busy,
+            top_n=int(getenv("PREFETCH_TOP_N", "3")),
+            concurrency=int(getenv("PREFETCH_CONCURRENCY", "2")),
+            daily_tokens=int(getenv("PREFETCH_DAILY_TOKENS", "200000")),
+            window=float(getenv("PREFETCH_WINDOW", "120"))
+        )
+
+    @staticmethod
+    def _today() -> datetime.date:
+        return datetime.datetime.now(datetime.timezone.utc).date()
+
+    def _over_budget(self) -> bool:
+        today = self._today()
+        if today != self._day:
+            self._day, self.tokens_today = today, 0
+        return self.tokens_today >= self.daily_tokens
+
+    def schedule(self, queries: Iterable[str]) -> int:
+        """
+        Start prefetching the first top_n distinct queries (call from the event loop).
+
+        Args:
+            queries: Candidate follow-up queries, most likely first
+
+        Returns:
+            Number of prefetches started
+        """
+        self._expire()
+        if self._over_budget():
+            return 0
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        started = 0
+        seen = set()
+        for query in queries:
+            if started >= self.top_n:
+                break
+            query = (query or "").strip()
+            if not query:
+                continue
+            key = self.key(query)
+            if key in seen or key in self._unconsumed:
+                continue
+            seen.add(key)
+            task = asyncio.ensure_future(self._run(query, key, time.monotonic() + self.window))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            self.scheduled += 1
+            started += 1
+        return started
+
+    async def _run(self, query: str, key: Hashable, deadline: float) -> None:
+        # Registered up front, so a click while the prefetch is in flight counts as consumed
+        self._unconsumed[key] = deadline
+        try:
+            if not await asyncio.wait_for(self._fetch(query), max(0.0, deadline - time.monotonic())):
+                self._unconsumed.pop(key, None)
+        except asyncio.TimeoutError:
+            # Not done within the window: nobody is likely to click it any more
+            self.cancelled += 1
+            self._unconsumed.pop(key, None)
+        except Exception as e:
+            self._unconsumed.pop(key, None)
+            logger.debug(f"Prefetch failed: {e}")
+
+    async def _fetch(self, query: str) -> bool:
+        async with self._semaphore:
+            # Yield to user traffic: prefetches never wait in the upstream queue ahead of it
+            if self.busy() or self._over_budget():
+                self.skipped += 1
+                return False
+            tokens = await self.fetch(query)
+        self.tokens_today += tokens or 0
+        self.completed += 1
+        return True
+
+    def consumed(self, key: Hashable) -> bool:
+        """
+        Record that a request was served for a key.
+
+        Returns:
+            True if the key had been prefetched (and not consumed before)
+        """
+        deadline = self._unconsumed.pop(key, None)
+        if deadline is None:
+            return False
+        self.consumed_hits += 1
+        return True
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, deadline in self._unconsumed.items() if deadline <= now]:
+            del self._unconsumed[key]
+            self.expired += 1
+
+    def collect_metrics(self):
+        """Metric families for prefetch effectiveness and spend."""
+        return [
+            (
+                "chaysh_prefetch_total", "counter", "Suggestion prefetches by outcome",
+                [({"outcome": outcome}, value) for outcome, value in (
+                    ("scheduled", self.scheduled), ("completed", self.completed), ("consumed", self.consumed_hits),
+                    ("expired", self.expired), ("cancelled", self.cancelled), ("skipped", self.skipped)
+                )]
+            ),
+            ("chaysh_prefetch_tokens_today", "gauge", "Tokens spent on prefetching today (UTC)", [({}, self.tokens_today)]),
+            ("chaysh_prefetch_inflight", "gauge", "Prefetches running or waiting for their budget", [({}, len(self._tasks))])
+        ]
@@ -0,0 +1,304 @@
+"""
+Upstream admission control.
+Enforces a requests-per-second rate and a concurrency cap per API key, serves
+waiting requests round-robin per client, and retries 429/5xx responses with
+jittered exponential back-off (honouring Retry-After) within a per-request deadline.
+"""
+
+import time
+import random
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Deque, Dict, Optional
+import httpx
+from src.core.settings import getenv
+
+logger = logging.getLogger(__name__)
+
+# Identity of the end client for the current request (set by the web layer)
+client_var: ContextVar[str] = ContextVar("upstream_client", default="")
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def client_identity(forwarded_for: Optional[str], remote_addr: Optional[str]) -> str:
+    """
+    Derive the end client identity behind a proxy.
+
+    Args:
+        forwarded_for: X-Forwarded-For header value, if any
+        remote_addr: Peer address of the connection
+
+    Returns:
+        Client identifier (the original client IP when known)
+    """
+    if forwarded_for:
+        return forwarded_for.split(",")[0].strip()
+    return remote_addr or ""
+
+
+class UpstreamBusy(Exception):
+    """Raised when a request cannot be admitted before its deadline."""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header (delta-seconds or HTTP-date).
+
+    Returns:
+        Seconds to wait, or None if absent/unparseable
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class UpstreamScheduler:
+    """Rate limiter, concurrency cap and fair queue in front of one upstream API key."""
+
+    def __init__(
+        self,
+        rps: float = 10.0,
+        max_concurrency: int = 50,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        deadline: float = 30.0
+    ):
+        self.rps = rps
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        # Burst of up to one second's worth of requests
+        self._tokens = max(1.0, rps)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._active = 0
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.retries = 0
+        self.throttled = 0
+
+    @classmethod
+    def from_env(cls) -> "UpstreamScheduler":
+        """Build a scheduler from UPSTREAM_* environment variables."""
+        return cls(
+            rps=float(getenv("UPSTREAM_RPS", "10")),
+            max_concurrency=int(getenv("UPSTREAM_MAX_CONCURRENCY", "50")),
+            max_retries=int(getenv("UPSTREAM_MAX_RETRIES", "3")),
+            base_delay=float(getenv("UPSTREAM_RETRY_BASE_DELAY", "0.5")),
+            max_delay=float(getenv("UPSTREAM_RETRY_MAX_DELAY", "8")),
+            deadline=float(getenv("UPSTREAM_DEADLINE", "30"))
+        )
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def collect_metrics(self):
+        """Metric families for the admission queue and retries."""
+        return [
+            ("chaysh_upstream_queued", "gauge", "Upstream requests waiting for admission", [({}, self.queued)]),
+            ("chaysh_upstream_active", "gauge", "Upstream requests in flight", [({}, self._active)]),
+            ("chaysh_upstream_retries_total", "counter", "Upstream request retries", [({}, self.retries)]),
+            ("chaysh_upstream_throttled_total", "counter", "Upstream 429 responses", [({}, self.throttled)])
+        ]
+
+    def new_deadline(self) -> float:
+        """Absolute (monotonic) deadline for a request starting now."""
+        return time.monotonic() + self.deadline
+
+    async def acquire(self, client_id: str = "", deadline: Optional[float] = None) -> None:
+        """
+        Wait for an admission slot, queued fairly behind other clients.
+
+        Args:
+            client_id: End client identity used for round-robin fairness
+            deadline: Absolute monotonic deadline
+
+        Raises:
+            UpstreamBusy: If no slot was granted before the deadline
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(client_id, deque()).append(future)
+        self._grant()
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Granted just as we gave up; hand the slot back
+                self.release()
+            else:
+                self._discard(client_id, future)
+            if isinstance(e, asyncio.TimeoutError):
+                raise UpstreamBusy("Upstream is busy, please try again shortly") from None
+            raise
+
+    def release(self) -> None:
+        self._active -= 1
+        self._grant()
+
+    @asynccontextmanager
+    async def slot(self, client_id: str = "", deadline: Optional[float] = None):
+        await self.acquire(client_id, deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def retry_delay(self, attempt: int, response: Optional[httpx.Response], deadline: Optional[float]) -> Optional[float]:
+        """
+        Decide whether and how long to wait before retrying.
+
+        Args:
+            attempt: Number of attempts made so far (1-based)
+            response: The failed response, or None for a transport error
+            deadline: Absolute monotonic deadline
+
+        Returns:
+            Delay in seconds, or None if the request should not be retried
+        """
+        if response is not None and response.status_code not in RETRY_STATUSES:
+            return None
+        if attempt > self.max_retries:
+            return None
+
+        retry_after = parse_retry_after(response.headers.get("retry-after")) if response is not None else None
+        if retry_after is not None:
+            delay = retry_after
+        else:
+            # Full jitter keeps retrying workers from synchronizing
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+        if response is not None and response.status_code == 429:
+            # The key is over its limit: hold back everyone, not just this request
+            self.throttled += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+        if deadline is not None and time.monotonic() + delay > deadline:
+            return None
+        self.retries += 1
+        return delay
+
+    async def send(
+        self,
+        factory: Callable[[], Awaitable[httpx.Response]],
+        client_id: str = "",
+        deadline: Optional[float] = None
+    ) -> httpx.Response:
+        """
+        Admit, send and (if needed) retry one upstream request.
+
+        Args:
+            factory: Zero-argument callable performing the request
+            client_id: End client identity used for fairness
+            deadline: Absolute monotonic deadline (defaults to now + UPSTREAM_DEADLINE)
+
+        Returns:
+            The final upstream response (which may still be an error)
+        """
+        deadline = self.new_deadline() if deadline is None else deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            response = error = None
+            async with self.slot(client_id, deadline):
+                try:
+                    response = await factory()
+                except httpx.TransportError as e:
+                    error = e
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                return response
+
+            delay = self.retry_delay(attempt, response, deadline)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            logger.warning(f"Upstream {response.status_code if response is not None else type(error).__name__}, retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.rps > 0:
+            self._tokens = min(max(1.0, self.rps), self._tokens + (now - self._updated) * self.rps)
+        self._updated = now
+
+    def _grant(self) -> None:
+        self._refill()
+        while self._queues and self._active < self.max_concurrency:
+            wait = self._paused_until - time.monotonic()
+            if self.rps > 0 and self._tokens < 1:
+                wait = max(wait, (1 - self._tokens) / self.rps)
+            if wait > 0:
+                self._schedule(wait)
+                return
+
+            # Round-robin: serve the client at the front, then move it to the back
+            client_id, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            if queue:
+                self._queues.move_to_end(client_id)
+            else:
+                del self._queues[client_id]
+            if future.done():
+                continue
+            future.set_result(None)
+            self._active += 1
+            if self.rps > 0:
+                self._tokens -= 1
+
+    def _schedule(self, delay: float) -> None:
+        if self._timer is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._timer = loop.call_later(delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._grant()
+
+    def _discard(self, client_id: str, future: asyncio.Future) -> None:
+        queue = self._queues.get(client_id)
+        if queue is None:
+            return
+        try:
+            queue.remove(future)
+        except ValueError:
+            return
+        if not queue:
+            del self._queues[client_id]
+
+
+_schedulers: Dict[str, UpstreamScheduler] = {}
+
+
+def get_scheduler(api_key: Optional[str]) -> UpstreamScheduler:
+    """
+    Get the process-wide scheduler for an API key.
+
+    Returns:
+        Shared UpstreamScheduler for the key
+    """
+    key = api_key or ""
+    if key not in _schedulers:
+        _schedulers[key] = UpstreamScheduler.from_env()
+    return _schedulers[key]
@@ -0,0 +1,108 @@
+"""
+Server-side conversation sessions.
+Keeps the last few turns of each conversation so clients only send a session id
+instead of round-tripping the whole history.
+"""
+
+import re
+import time
+import secrets
+import threading
+import logging
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+from src.core.settings import getenv
+
+logger = logging.getLogger(__name__)
+
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+class _Session:
+    __slots__ = ("turns", "last_seen")
+
+    def __init__(self, max_messages: int):
+        # (role, content) tuples; the deque drops the oldest turn when full
+        self.turns: Deque[Tuple[str, str]] = deque(maxlen=max_messages)
+        self.last_seen = time.monotonic()
+
+
+class SessionStore:
+    """Bounded, idle-expiring store of recent conversation turns keyed by session id."""
+
+    def __init__(self, max_sessions: int = 10000, max_messages: int = 8, idle_ttl: float = 1800, max_chars: int = 2000):
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.idle_ttl = idle_ttl
+        self.max_chars = max_chars
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SessionStore":
+        """Build a store from SESSION_* environment variables."""
+        return cls(
+            max_sessions=int(getenv("SESSION_MAX", "10000")),
+            max_messages=int(getenv("SESSION_MAX_MESSAGES", "8")),
+            idle_ttl=float(getenv("SESSION_IDLE_TTL", "1800")),
+            max_chars=int(getenv("SESSION_MAX_CHARS", "2000"))
+        )
+
+    @staticmethod
+    def new_id() -> str:
+        return secrets.token_urlsafe(16)
+
+    @staticmethod
+    def is_valid_id(session_id: Optional[str]) -> bool:
+        return bool(session_id) and isinstance(session_id, str) and bool(_SESSION_ID.match(session_id))
+
+    def context(self, session_id: str) -> List[Dict[str, str]]:
+        """
+        Get a session's recent turns in chat message format.
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            List of message dictionaries, oldest first (empty for unknown sessions)
+        """
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            session.last_seen = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return [{"role": role, "content": content} for role, content in session.turns]
+
+    def record(self, session_id: str, user_content: str, assistant_content: str) -> None:
+        """
+        Append one exchange to a session, creating it if needed.
+
+        Args:
+            session_id: Session identifier
+            user_content: Prompt sent upstream for this turn
+            assistant_content: Cleaned assistant reply
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _Session(self.max_messages)
+            session.turns.append(("user", user_content[:self.max_chars]))
+            session.turns.append(("assistant", assistant_content[:self.max_chars]))
+            session.last_seen = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def _evict_idle(self) -> None:
+        # Sessions are kept in last-access order, so idle ones sit at the front
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_seen > cutoff:
+                break
+            del self._sessions[session_id]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,62 @@
+"""
+Lazily resolved settings shared by both apps.
+Importing this module does no I/O; the .env file is read once, on first use.
+"""
+
+import os
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+_env_loaded = False
+_env_lock = threading.Lock()
+
+
+def load_env() -> None:
+    """
+    Load the .env file once per process (skipped when FLASK_ENV is production).
+
+    DOTENV_PATH selects the file; by default python-dotenv searches from the working directory.
+    Values already present in the environment win.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _env_lock:
+        if _env_loaded:
+            return
+        if os.environ.get("FLASK_ENV") != "production":
+            from dotenv import load_dotenv
+            load_dotenv(os.getenv("DOTENV_PATH") or None)
+        _env_loaded = True
+
+
+def getenv(name: str, default: Optional[str] = None) -> Optional[str]:
+    """os.getenv after making sure the .env file has been loaded."""
+    load_env()
+    return os.getenv(name, default)
+
+
+def api_key() -> Optional[str]:
+    return getenv("OPENROUTER_API_KEY")
+
+
+def require_api_key() -> str:
+    """
+    Get the OpenRouter API key.
+
+    Raises:
+        Exception: If OPENROUTER_API_KEY is not configured
+    """
+    key = api_key()
+    if not key:
+        raise Exception("OPENROUTER_API_KEY not found")
+    return key
+
+
+def api_url() -> str:
+    return getenv("OPENROUTER_API_URL") or DEFAULT_API_URL
@@ -0,0 +1,264 @@
+"""
+Host-wide second cache tier, shared by every worker through one SQLite file.
+Readers never wait for the writer (WAL mode); writes are queued and flushed in
+batches by a background thread per worker, which also expires old entries and
+keeps the file within its size caps. Entries survive restarts and deploys.
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import random
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from src.core.settings import getenv
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at);
+"""
+
+# Queue item telling the writer thread to flush and exit
+_STOP = object()
+
+
+class SharedCache:
+    """
+    SQLite-backed TTL cache with read-through gets and write-behind puts.
+
+    Keys are hashable tuples of JSON-serializable parts and values must be
+    JSON-serializable. Connections and the writer thread are created lazily per
+    process, so an instance built before gunicorn forks is safe to use in workers.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_entries: int = 100000,
+        flush_interval: float = 0.5,
+        compact_interval: float = 60.0,
+        queue_size: int = 1024,
+        read_timeout: float = 0.005
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        # Reads run on the event loop: a locked file is a miss, not a stall
+        self.read_timeout = read_timeout
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._local = threading.local()
+        self._writer: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.dropped = 0
+        self.errors = 0
+        # As of the last compaction, to keep metric scrapes off the database
+        self.entries = 0
+        self.bytes = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["SharedCache"]:
+        """Build a shared cache from SHARED_CACHE_* environment variables (None unless a path is set)."""
+        path = getenv("SHARED_CACHE_PATH")
+        if not path:
+            return None
+        return cls(
+            path,
+            max_bytes=int(getenv("SHARED_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+            max_entries=int(getenv("SHARED_CACHE_MAX_ENTRIES", "100000")),
+            compact_interval=float(getenv("SHARED_CACHE_COMPACT_INTERVAL", "60")),
+            read_timeout=float(getenv("SHARED_CACHE_READ_TIMEOUT", "0.005"))
+        )
+
+    def _connect(self, timeout: float = 5.0) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL never corrupts the file; a power cut can lose the last few writes of a cache
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    @property
+    def _reader(self) -> sqlite3.Connection:
+        # One connection per thread and process; SQLite handles must not cross a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._connect(self.read_timeout)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @staticmethod
+    def _encode_key(key: Hashable) -> str:
+        return json.dumps(key, separators=(",", ":"), ensure_ascii=False)
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """
+        Read a live entry.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Tuple of (value, seconds left to live), or None on a miss or error
+            (including the file staying locked for longer than read_timeout)
+        """
+        try:
+            row = self._reader.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ? AND expires_at > ?",
+                (self._encode_key(key), time.time())
+            ).fetchone()
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) and "busy" not in str(e):
+                self.errors += 1
+                logger.warning(f"Shared cache read failed: {str(e)}")
+                return None
+            # Busy with a compaction or checkpoint: asking upstream beats blocking the loop
+            self.misses += 1
+            return None
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Shared cache read failed: {str(e)}")
+            return None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0]), row[1] - time.time()
+
+    def put(self, key: Hashable, value: Any, ttl: float) -> None:
+        """
+        Queue a write; it reaches the file within flush_interval.
+
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+            ttl: Time to live in seconds (<= 0 skips the write)
+        """
+        if ttl <= 0:
+            return
+        self._ensure_writer()
+        item = (self._encode_key(key), json.dumps(value, ensure_ascii=False), time.time() + ttl)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Never block a request on the cache; the answer is simply not shared
+            self.dropped += 1
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._writer is None or self._pid != os.getpid():
+                if self._pid != os.getpid():
+                    # Items queued by the parent belong to the parent
+                    self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._writer = threading.Thread(target=self._run, name="chaysh-shared-cache", daemon=True)
+                self._pid = os.getpid()
+                self._writer.start()
+                atexit.register(self.close)
+
+    def _run(self) -> None:
+        conn = self._connect()
+        # Stagger compaction so workers started together do not all compact at once
+        next_compaction = time.monotonic() + random.uniform(0, self.compact_interval)
+        while True:
+            batch: List[Tuple[str, str, float]] = []
+            stop = False
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                while True:
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                if batch:
+                    self._write(conn, batch)
+                if time.monotonic() >= next_compaction:
+                    self.compact(conn)
+                    next_compaction = time.monotonic() + self.compact_interval
+            except sqlite3.Error as e:
+                self.errors += 1
+                logger.warning(f"Shared cache write failed: {str(e)}")
+            if stop:
+                conn.close()
+                return
+
+    def _write(self, conn: sqlite3.Connection, batch: List[Tuple[str, str, float]]) -> None:
+        rows = [(key, value, len(key) + len(value.encode("utf-8")), expires_at) for key, value, expires_at in batch]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT OR REPLACE INTO entries (key, value, size, expires_at) VALUES (?, ?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        self.writes += len(rows)
+
+    def compact(self, conn: Optional[sqlite3.Connection] = None) -> None:
+        """Drop expired entries, evict the soonest-expiring ones while over the caps and trim the WAL."""
+        conn = conn or self._reader
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            while entries > self.max_entries or size > self.max_bytes:
+                # Evict in chunks proportional to the overshoot
+                excess = max(entries - self.max_entries, 1)
+                if size > self.max_bytes:
+                    excess = max(excess, int(entries * (size - self.max_bytes) / size) + 1)
+                conn.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY expires_at LIMIT ?)", (excess,)
+                )
+                entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        self.entries, self.bytes = entries, size
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush queued writes and stop this process's writer thread."""
+        if self._writer is None or self._pid != os.getpid():
+            return
+        self._queue.put(_STOP)
+        self._writer.join(timeout)
+        self._writer = None
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get shared cache counters.
+
+        Returns:
+            Dictionary with hit/miss/write counts and the size as of the last compaction
+        """
+        return {
+            "entries": self.entries,
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "dropped": self.dropped,
+            "errors": self.errors
+        }
@@ -0,0 +1,48 @@
+"""
+Server-Sent Events helpers for streamed chat completions.
+Parses the upstream OpenAI-style SSE stream and encodes events for our clients.
+"""
+
+import json
+import logging
+from typing import Any, AsyncIterator, Dict
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def sse_event(event: str, data: Any) -> str:
+    """
+    Encode one SSE event.
+
+    Args:
+        event: Event name (e.g. 'delta', 'done', 'error')
+        data: JSON-serializable payload
+
+    Returns:
+        Wire-format event string
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def iter_completion_chunks(response: httpx.Response) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield decoded JSON chunks from a streaming chat completion.
+
+    Args:
+        response: Open streaming httpx response
+
+    Yields:
+        Parsed `data:` payloads until the `[DONE]` sentinel
+    """
+    async for line in response.aiter_lines():
+        # Blank lines separate events; lines starting with ':' are keep-alive comments
+        if not line or line.startswith(":") or not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        try:
+            yield json.loads(data)
+        except ValueError:
+            logger.warning(f"Skipping malformed stream chunk: {data[:80]}")
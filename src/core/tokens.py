@@ -0,0 +1,116 @@
+"""
+Local token estimation and budget-driven context packing.
+Keeps prompt size (and upstream latency) bounded without calling a tokenizer.
+"""
+
+import re
+import threading
+from typing import Dict, List, Optional
+
+# Words, numbers and single punctuation marks; long words cost roughly one token per 4 chars
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+# Chat formats add a few tokens per message for role and separators
+MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the BPE token count of a text.
+
+    Args:
+        text: Any text
+
+    Returns:
+        Approximate number of tokens
+    """
+    total = 0
+    for piece in _PIECES.findall(text):
+        n = len(piece)
+        # Non-ASCII words (e.g. Polish diacritics) split into more tokens
+        if not piece.isascii():
+            n *= 2
+        total += (n + 3) // 4
+    return total
+
+
+def estimate_messages(messages: List[Dict[str, str]]) -> int:
+    """Estimate the prompt tokens of a chat message list."""
+    return sum(estimate_tokens(m.get("content", "")) + MESSAGE_OVERHEAD for m in messages)
+
+
+class TokenCalibration:
+    """Tracks estimated vs. actual prompt tokens and derives a correction ratio."""
+
+    def __init__(self, min_samples: int = 20):
+        self.min_samples = min_samples
+        self.samples = 0
+        self.estimated = 0
+        self.actual = 0
+        self._lock = threading.Lock()
+
+    def record(self, estimated: int, actual: int) -> None:
+        """
+        Record one request's estimate against the upstream `usage.prompt_tokens`.
+
+        Args:
+            estimated: Local estimate for the prompt
+            actual: Prompt tokens reported by the provider (ignored if 0)
+        """
+        if not actual or not estimated:
+            return
+        with self._lock:
+            self.samples += 1
+            self.estimated += estimated
+            self.actual += actual
+
+    @property
+    def ratio(self) -> float:
+        """Actual/estimated ratio, clamped to [0.5, 2.0]; 1.0 until enough samples exist."""
+        if self.samples < self.min_samples:
+            return 1.0
+        return min(2.0, max(0.5, self.actual / self.estimated))
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "samples": self.samples,
+            "estimated": self.estimated,
+            "actual": self.actual,
+            "ratio": self.ratio
+        }
+
+
+def pack_context(
+    context: List[Dict[str, str]],
+    budget: int,
+    ratio: float = 1.0,
+    collapse_chars: Optional[int] = None
+) -> List[Dict[str, str]]:
+    """
+    Keep the most recent messages that fit a token budget.
+
+    Args:
+        context: Conversation messages, oldest first
+        budget: Token budget for the packed context
+        ratio: Calibration ratio applied to local estimates
+        collapse_chars: If set, an older message that does not fit is shortened to
+            this many characters (when that fits) instead of being dropped
+
+    Returns:
+        Packed messages, oldest first
+    """
+    packed = []
+    remaining = budget
+    for message in reversed(context):
+        content = message.get("content", "")
+        cost = int((estimate_tokens(content) + MESSAGE_OVERHEAD) * ratio)
+        if cost > remaining and collapse_chars and len(content) > collapse_chars:
+            content = content[:collapse_chars].rstrip() + "…"
+            cost = int((estimate_tokens(content) + MESSAGE_OVERHEAD) * ratio)
+            message = {"role": message["role"], "content": content}
+        if cost > remaining:
+            break
+        packed.append(message)
+        remaining -= cost
+    packed.reverse()
+    return packed
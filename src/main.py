@@ -1,42 +1,155 @@
-from flask import Flask, request, jsonify, render_template
+import json
+from flask import Flask, Response, request, jsonify
 from src.core.assistant import Assistant
-import asyncio
-from functools import wraps
+from src.core.loop import background_loop
+from src.core.streaming import sse_event
+from src.core.sessions import SessionStore
+from src.core.batch import parse_batch, run_batch
+from src.core.scheduler import client_var, client_identity
+from src.core.metrics import ERRORS, REGISTRY, STAGE_SECONDS, register_flask
+from src.core.preload import warm_templates
+from src.core.delivery import install_delivery
+from src.core.capture import captured
+from functools import wraps, lru_cache
 
 app = Flask(__name__)
-assistant = Assistant()
+register_flask(app)
+# Pages are rendered and compressed once; large JSON responses are compressed per request
+delivery = install_delivery(app, pages=('chat.html', 'terms.html'))
+
+@lru_cache(maxsize=None)
+def get_assistant():
+    """The process-wide Assistant, created on first use (or by create_app) rather than at import."""
+    assistant = Assistant()
+    REGISTRY.add_collector(assistant.collect_metrics)
+    return assistant
+
+def create_app():
+    """
+    Return the app with the assistant built, templates compiled and pages prebuilt.
+
+    Use `src.main:create_app()` with gunicorn --preload so workers fork from a warmed parent.
+    """
+    get_assistant()
+    warm_templates(app)
+    delivery.build()
+    return app
 
 def async_route(f):
     @wraps(f)
     def wrapped(*args, **kwargs):
-        return asyncio.run(f(*args, **kwargs))
+        # Run on the worker's long-lived loop so pooled connections are reused
+        return background_loop.run(f(*args, **kwargs))
     return wrapped
 
-@app.route("/")
-def index():
-    return render_template('chat.html')
+async def handle_batch(data):
+    """Shared /api/ask/batch logic: answers every query and returns results in request order."""
+    try:
+        items, concurrency = parse_batch(data)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    
+    results = [None] * len(items)
+    async for index, result in run_batch(get_assistant(), items, concurrency):
+        results[index] = result
+    return {"results": results}, 200
 
-@app.route("/terms")
-def terms():
-    return render_template('terms.html')
+async def stream_batch(data):
+    """Shared /api/ask/batch/stream logic: yields one NDJSON line per query as it completes."""
+    try:
+        items, concurrency = parse_batch(data)
+    except ValueError as e:
+        yield json.dumps({"error": str(e)}) + "\n"
+        return
+    
+    async for index, result in run_batch(get_assistant(), items, concurrency):
+        yield json.dumps({"index": index, **result}) + "\n"
 
-@app.route("/api/ask", methods=['POST'])
-@async_route
-async def ask():
+def _session_id(data):
+    """Reuse the client's session id if it is well-formed, otherwise start a new session."""
+    session_id = data.get('session_id')
+    return session_id if SessionStore.is_valid_id(session_id) else SessionStore.new_id()
+
+@captured("/api/ask")
+async def handle_ask(data):
+    """Shared /api/ask logic for the WSGI view and the ASGI entry point (src.asgi)."""
     try:
-        data = request.get_json()
         query = data.get('query', '')
         lang = data.get('lang', 'en')  # Default to English if not specified
         
         if not query:
-            return jsonify({"error": "No query provided"}), 400
+            return {"error": "No query provided"}, 400
             
-        result = await assistant.process_query(query, lang)
-        return jsonify(result)
+        result = await get_assistant().get_response(
+            query,
+            category_override=data.get('category_override'),
+            lang=lang,
+            session_id=_session_id(data)
+        )
+        return result, 200
         
     except Exception as e:
+        ERRORS.inc("handler")
         print(f"Error processing query: {str(e)}")  # Add logging
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
+
+async def stream_ask(data):
+    """Shared /api/ask/stream logic: yields SSE events (delta..., then done or error)."""
+    query = data.get('query', '')
+    if not query:
+        yield sse_event("error", {"error": "No query provided"})
+        return
+    
+    async for event, payload in get_assistant().stream_response(
+        query,
+        category_override=data.get('category_override'),
+        lang=data.get('lang', 'en'),
+        session_id=_session_id(data)
+    ):
+        yield sse_event(event, payload)
+
+@app.before_request
+def tag_client():
+    # Upstream admission queues fairly per end client
+    client_var.set(client_identity(request.headers.get('X-Forwarded-For'), request.remote_addr))
+
+@app.route("/")
+def index():
+    return delivery.page('chat.html')
+
+@app.route("/terms")
+def terms():
+    return delivery.page('terms.html')
+
+@app.route("/api/ask", methods=['POST'])
+@async_route
+async def ask():
+    payload, status = await handle_ask(request.get_json(silent=True) or {})
+    with STAGE_SECONDS.time("serialize"):
+        response = jsonify(payload)
+    return response, status
+
+@app.route("/api/ask/stream", methods=['POST'])
+def ask_stream():
+    events = background_loop.iterate(stream_ask(request.get_json(silent=True) or {}))
+    return Response(
+        events,
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route("/api/ask/batch", methods=['POST'])
+@async_route
+async def ask_batch():
+    payload, status = await handle_batch(request.get_json(silent=True) or {})
+    with STAGE_SECONDS.time("serialize"):
+        response = jsonify(payload)
+    return response, status
+
+@app.route("/api/ask/batch/stream", methods=['POST'])
+def ask_batch_stream():
+    lines = background_loop.iterate(stream_batch(request.get_json(silent=True) or {}))
+    return Response(lines, mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
 
 if __name__ == "__main__":
-    app.run(debug=True) 
\ No newline at end of file
+    app.run(debug=True)
@@ -3,62 +3,100 @@ Category-based prompt rewriting system for Chaysh assistant.
 Defines categories, their keywords, and templates for prompt rewriting.
 """
 
-from typing import Dict, Tuple, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple, Optional
+from src.utils.matcher import KeywordMatcher
 
-# Category configuration with templates and keywords
+# Category configuration with templates, keywords, response cache TTLs (seconds) and
+# generation settings: max_tokens, temperature, optional stop sequences and an optional
+# "model" (used unless MODEL_CHAINS has a chain for the category)
 category_map: Dict[str, Dict] = {
     "weather": {
         "description": "Returns the current weather in a given location.",
         "template": "Get the current weather in {target}. Include temperature, humidity, and general conditions.",
-        "keywords": ["weather", "forecast", "pogoda", "prognoza", "temperatura", "deszcz", "śnieg"]
+        "keywords": ["weather", "forecast", "pogoda", "prognoza", "temperatura", "deszcz", "śnieg"],
+        "ttl": 600,  # 10 minutes
+        "max_tokens": 150,
+        "temperature": 0.3
     },
     "person": {
         "description": "Returns a short biography for a person.",
         "template": "Explain who {target} is. Provide a brief, relevant biography.",
-        "keywords": ["who is", "kto to", "kim jest", "czy znasz", "biografia", "życiorys"]
+        "keywords": ["who is", "kto to", "kim jest", "czy znasz", "biografia", "życiorys"],
+        "ttl": 86400,  # 1 day
+        "max_tokens": 250,
+        "temperature": 0.5
     },
     "compare": {
         "description": "Compares two items or concepts side-by-side.",
         "template": "Compare {target} with a clear breakdown of features.",
-        "keywords": ["compare", "porównaj", "powownaj", "różnice", "podobieństwa"]
+        "keywords": ["compare", "porównaj", "powownaj", "różnice", "podobieństwa"],
+        "ttl": 86400,  # 1 day
+        "max_tokens": 450,
+        "temperature": 0.4
     },
     "define": {
         "description": "Defines or explains a term clearly.",
         "template": "Give a concise definition of {target}.",
-        "keywords": ["define", "what is", "co to", "opisz", "wyjaśnij", "znaczenie"]
+        "keywords": ["define", "what is", "co to", "opisz", "wyjaśnij", "znaczenie"],
+        "ttl": 604800,  # 7 days
+        "max_tokens": 120,
+        "temperature": 0.3,
+        "stop": ["\n\n\n"]
     },
     "summary": {
         "description": "Summarizes input up to 500 characters, max 600 token output.",
         "template": "Summarize the following content: {target}. Use up to 600 tokens.",
-        "keywords": ["summarize", "skroc", "skróć", "streść", "stresc", "podsumuj"]
+        "keywords": ["summarize", "skroc", "skróć", "streść", "stresc", "podsumuj"],
+        "ttl": 3600,  # 1 hour
+        "max_tokens": 600,
+        "temperature": 0.5
     },
     "timeline": {
         "description": "Answers when something is happening or happened.",
         "template": "Tell when {target} is happening. Include name, date, and description if possible.",
-        "keywords": ["when", "kiedy", "kiedy gra", "termin", "data", "godzina"]
+        "keywords": ["when", "kiedy", "kiedy gra", "termin", "data", "godzina"],
+        "ttl": 3600,  # 1 hour
+        "max_tokens": 200,
+        "temperature": 0.3
     },
     "location": {
         "description": "Detects if a place (city/country/state) is mentioned and gives facts.",
         "template": "Provide useful facts and context about {target} as a place.",
-        "keywords": ["where is", "gdzie jest", "lokalizacja", "miasto", "kraj"]
+        "keywords": ["where is", "gdzie jest", "lokalizacja", "miasto", "kraj"],
+        "ttl": 604800,  # 7 days
+        "max_tokens": 250,
+        "temperature": 0.6
     },
     "price": {
         "description": "Compares prices or provides cost information.",
         "template": "Find and compare prices for {target}. Include current market rates if available.",
-        "keywords": ["price", "cost", "cena", "koszt", "ile kosztuje", "cennik"]
+        "keywords": ["price", "cost", "cena", "koszt", "ile kosztuje", "cennik"],
+        "ttl": 3600,  # 1 hour
+        "max_tokens": 350,
+        "temperature": 0.3
     },
     "contact": {
         "description": "Provides contact information or communication details.",
         "template": "Find contact information for {target}. Include official channels if available.",
-        "keywords": ["contact", "email", "phone", "kontakt", "telefon", "adres"]
+        "keywords": ["contact", "email", "phone", "kontakt", "telefon", "adres"],
+        "ttl": 86400,  # 1 day
+        "max_tokens": 150,
+        "temperature": 0.2
     },
     "event": {
         "description": "Provides information about events, schedules, or timetables.",
         "template": "Find event details for {target}. Include date, time, and location if available.",
-        "keywords": ["event", "schedule", "wydarzenie", "harmonogram", "terminarz"]
+        "keywords": ["event", "schedule", "wydarzenie", "harmonogram", "terminarz"],
+        "ttl": 1800,  # 30 minutes
+        "max_tokens": 200,
+        "temperature": 0.3
     }
 }
 
+# Built once at import; category_map is static configuration
+_matcher = KeywordMatcher(category_map)
+
 def detect_category(prompt: str) -> Optional[Tuple[str, str]]:
     """
     Detect the category of a prompt based on keywords.
@@ -69,17 +107,67 @@ def detect_category(prompt: str) -> Optional[Tuple[str, str]]:
     Returns:
         Tuple of (category_name, template) if a category is detected, None otherwise
     """
-    lowered = prompt.lower()
+    category = _matcher.match(prompt)
+    if category is None:
+        return None
+    return category, _matcher.templates[category]
+
+def resolve_category(prompt: str, category_override: Optional[str] = None) -> Optional[Tuple[str, str]]:
+    """
+    Resolve the category for a request: a valid override wins, otherwise detect it.
     
-    # First check for exact keyword matches
-    for category, config in category_map.items():
-        for kw in config["keywords"]:
-            if kw in lowered:
-                return category, config["template"]
+    Args:
+        prompt: The user's input prompt
+        category_override: Optional category chosen by the client
+        
+    Returns:
+        Tuple of (category_name, template) if a category applies, None otherwise
+    """
+    if category_override and category_override in category_map:
+        return category_override, category_map[category_override]["template"]
+    return detect_category(prompt)
+
+def get_category_ttl(category: Optional[str]) -> Optional[float]:
+    """
+    Get the response cache TTL for a category.
     
-    # If no category is detected, return None
+    Args:
+        category: Category name (or None for uncategorized prompts)
+        
+    Returns:
+        TTL in seconds, or None to use the cache default
+    """
+    if category and category in category_map:
+        return category_map[category].get("ttl")
     return None
 
+# Keys of a category_map entry sent to the upstream as sampling parameters
+GENERATION_PARAMS = ("max_tokens", "temperature", "top_p", "stop")
+
+def get_category_generation(category: Optional[str]) -> Dict[str, Any]:
+    """
+    Get the sampling parameters a category overrides.
+    
+    Args:
+        category: Category name (or None for uncategorized prompts)
+        
+    Returns:
+        Subset of max_tokens, temperature, top_p and stop set for the category
+    """
+    config = category_map.get(category) if category else None
+    if not config:
+        return {}
+    return {key: config[key] for key in GENERATION_PARAMS if key in config}
+
+def get_category_models() -> Dict[str, List[str]]:
+    """
+    Get the model configured per category.
+    
+    Returns:
+        Mapping of category to a one-model chain, for categories that set "model"
+    """
+    return {category: [config["model"]] for category, config in category_map.items() if config.get("model")}
+
 def get_category_examples() -> str:
     """
     Generate a formatted string of category examples for the system tip.
@@ -101,12 +189,14 @@ def get_category_examples() -> str:
     
     return "\n".join(examples)
 
-# Default system tip with category examples
-DEFAULT_TIP = {
-    "role": "system",
-    "content": (
-        "💡 You can use these categories to get better responses:\n\n"
-        f"{get_category_examples()}\n\n"
-        "Just include one of these keywords in your question!"
-    )
-} 
\ No newline at end of file
+@lru_cache(maxsize=None)
+def default_tip() -> Dict[str, str]:
+    """System tip listing category examples, built on first use rather than at import."""
+    return {
+        "role": "system",
+        "content": (
+            "💡 You can use these categories to get better responses:\n\n"
+            f"{get_category_examples()}\n\n"
+            "Just include one of these keywords in your question!"
+        )
+    }
@@ -5,6 +5,21 @@ Utility functions for cleaning and formatting GPT responses.
 import re
 from typing import List, Optional
 
+# Phrase openers of static-sounding filler endings; the reply is cut at the first one in its tail
+FILLER_PHRASES = [
+    "Can you elaborate", "Would you like more", "What specific aspects", "Would you like me to",
+    "Is there anything else", "Let me know if you need", "Feel free to ask", "I'm here to help",
+    "Would you like to know", "Do you want me to", "Should I", "I hope this helps",
+    "Let me know if", "Please let me know"
+]
+
+# Filler endings only appear in the last sentence or two, so only this many trailing
+# characters are searched; the cost is bounded regardless of reply length
+TAIL_WINDOW = 400
+
+# One alternation of literal phrases, compiled once; no backtracking across the reply
+_FILLER_PATTERN = re.compile("|".join(re.escape(p) for p in FILLER_PHRASES), re.IGNORECASE)
+
 def clean_gpt_reply(reply: str) -> str:
     """
     Clean and format the GPT response.
@@ -19,23 +34,96 @@ def clean_gpt_reply(reply: str) -> str:
     if not reply:
         return ""
         
-    # Remove suggestion-style endings and filler phrases
-    patterns = [
-        r"(Can you elaborate.*?|Would you like more.*?|What specific aspects.*?|Would you like me to.*?|Is there anything else.*?)$",
-        r"(Let me know if you need.*?|Feel free to ask.*?|I'm here to help.*?)$",
-        r"(Would you like to know.*?|Do you want me to.*?|Should I.*?)$",
-        r"(I hope this helps.*?|Let me know if.*?|Please let me know.*?)$"
-    ]
-    
-    cleaned = reply
-    for pattern in patterns:
-        cleaned = re.sub(pattern, "", cleaned, flags=re.IGNORECASE | re.DOTALL)
+    # Cut at the first filler phrase that starts within the tail window
+    match = _FILLER_PATTERN.search(reply, max(0, len(reply) - TAIL_WINDOW))
+    cleaned = reply[:match.start()] if match else reply
     
     # Clean up any remaining whitespace
     cleaned = cleaned.strip()
     
     return cleaned
 
+class StreamingCleaner:
+    """
+    Incremental counterpart of clean_gpt_reply for streamed replies.
+
+    Emits text as it arrives but holds back anything that could be the start of a
+    filler phrase. A phrase found mid-stream stays held until the reply has grown
+    past TAIL_WINDOW beyond it (it can then no longer be the ending), after which
+    streaming resumes. The final cleaned reply is available from finish(), and the
+    part of it not emitted yet from rest().
+    """
+
+    _holdback = max(len(p) for p in FILLER_PHRASES) - 1
+
+    def __init__(self):
+        self.text = ""
+        self.emitted = 0
+        self.sent = 0
+        self._scan = 0
+        self._held: Optional[int] = None
+
+    def feed(self, delta: str) -> str:
+        """
+        Add a streamed delta.
+        
+        Args:
+            delta: Newly received text
+            
+        Returns:
+            Text that is safe to forward to the client now
+        """
+        self.text += delta
+        while True:
+            if self._held is None:
+                match = _FILLER_PATTERN.search(self.text, self._scan)
+                if match is None:
+                    # A phrase could still be starting in the last few characters
+                    end = len(self.text) - self._holdback
+                    self._scan = max(self._scan, end)
+                    break
+                self._held = match.start()
+            if len(self.text) - self._held > TAIL_WINDOW:
+                # Too far from the end to be a filler ending; keep streaming past it
+                self._scan = self._held + 1
+                self._held = None
+                continue
+            end = self._held
+            break
+        
+        # Trailing whitespace waits for the next text: the final reply is stripped
+        while end > self.emitted and self.text[end - 1].isspace():
+            end -= 1
+        if end <= self.emitted:
+            return ""
+        chunk = self.text[self.emitted:end]
+        if not self.sent:
+            chunk = chunk.lstrip()
+        self.emitted = end
+        self.sent += len(chunk)
+        return chunk
+
+    def finish(self) -> str:
+        """
+        Get the fully cleaned reply once the stream has ended.
+        
+        Returns:
+            Cleaned response text
+        """
+        return clean_gpt_reply(self.text)
+
+    def rest(self, cleaned: str) -> str:
+        """
+        Get the end of the cleaned reply that feed() held back.
+        
+        Args:
+            cleaned: The reply returned by finish()
+            
+        Returns:
+            Text to forward after the last delta, so the deltas add up to the reply
+        """
+        return cleaned[self.sent:]
+
 def format_table_response(text: str) -> Optional[str]:
     """
     Format table-like responses for better display.
@@ -0,0 +1,51 @@
+"""
+Compiled keyword matcher for category detection.
+"""
+
+import re
+from typing import Dict, Optional, Tuple
+
+
+class KeywordMatcher:
+    """
+    Matches category keywords in a single regex pass over the input.
+
+    Keywords match on word boundaries, tolerating up to two trailing letters so
+    simple inflections still hit ("prices", "events", "koszty") while substrings of
+    unrelated words do not ("data" in "database"). When several categories match,
+    the one listed first in the category map wins, as with the old nested loop.
+    """
+
+    def __init__(self, category_map: Dict[str, Dict]):
+        self.templates: Dict[str, str] = {}
+        self._keywords: Dict[str, Tuple[int, str]] = {}
+        for priority, (category, config) in enumerate(category_map.items()):
+            self.templates[category] = config["template"]
+            for kw in config["keywords"]:
+                # First category to claim a keyword keeps it
+                self._keywords.setdefault(kw.lower(), (priority, category))
+
+        # Longest first so multi-word phrases win over their prefixes at the same position
+        alternation = "|".join(re.escape(kw) for kw in sorted(self._keywords, key=len, reverse=True))
+        self._pattern = re.compile(rf"(?<!\w)({alternation})\w{{0,2}}(?!\w)") if alternation else None
+
+    def match(self, text: str) -> Optional[str]:
+        """
+        Find the highest-priority category mentioned in the text.
+
+        Args:
+            text: Raw user input
+
+        Returns:
+            Category name, or None if no keyword matches
+        """
+        if self._pattern is None:
+            return None
+        best: Optional[Tuple[int, str]] = None
+        for found in self._pattern.finditer(text.lower()):
+            hit = self._keywords[found.group(1)]
+            if best is None or hit[0] < best[0]:
+                best = hit
+                if hit[0] == 0:
+                    break
+        return best[1] if best else None
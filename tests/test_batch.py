@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from src.core.assistant import Assistant
+from src.core.backends import MockBackend
+from src.core.batch import parse_batch, run_batch
+
+
+def test_parse_batch_normalizes_items_and_clamps_concurrency(monkeypatch):
+    monkeypatch.setenv("BATCH_MAX_CONCURRENCY", "4")
+    items, concurrency = parse_batch({
+        "queries": ["usd to eur", {"query": "pogoda", "lang": "pl", "category_override": "weather"}],
+        "concurrency": 100
+    })
+    assert items == [("usd to eur", "en", None), ("pogoda", "pl", "weather")]
+    assert concurrency == 4
+    assert parse_batch({"queries": ["a"], "concurrency": 0})[1] == 1
+
+
+@pytest.mark.parametrize("body", [
+    ["a"],
+    "a",
+    None,
+    {},
+    {"queries": []},
+    {"queries": "a"},
+    {"queries": [" "]},
+    {"queries": [5]},
+    {"queries": [{"query": "a", "lang": "de"}]},
+    {"queries": [{"query": "a", "lang": ["en"]}]},
+    {"queries": [{"query": "a", "category_override": 3}]},
+    {"queries": ["a"], "concurrency": "many"},
+])
+def test_parse_batch_rejects_malformed_bodies(body):
+    with pytest.raises(ValueError):
+        parse_batch(body)
+
+
+def test_parse_batch_enforces_the_item_limit(monkeypatch):
+    monkeypatch.setenv("BATCH_MAX_ITEMS", "2")
+    with pytest.raises(ValueError):
+        parse_batch({"queries": ["a", "b", "c"]})
+
+
+def test_run_batch_answers_duplicates_once_and_keeps_opposites_apart(monkeypatch):
+    monkeypatch.setenv("CACHE_ENABLED", "0")
+    calls = []
+    assistant = Assistant(backend=MockBackend("answer: {query}"))
+    get_response = assistant.get_response
+
+    async def counted(query, **kwargs):
+        calls.append(query)
+        return await get_response(query, **kwargs)
+
+    assistant.get_response = counted
+    items = [("convert usd to eur", "en", None), ("convert eur to usd", "en", None), ("Convert  USD to EUR", "en", None)]
+
+    async def main():
+        return dict([pair async for pair in run_batch(assistant, items, 2)])
+
+    results = asyncio.run(main())
+    assert len(calls) == 2
+    assert results[0] is results[2]
+    assert "usd to eur" in results[0]["response"] and "eur to usd" in results[1]["response"]
+    assert all("context" not in result for result in results.values())
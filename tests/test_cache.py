@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from src.core import cache as cache_module
+from src.core.cache import ResponseCache, make_key
+from src.core.fingerprint import NearDuplicateIndex, aligned, within_one_edit
+from src.core.singleflight import SingleFlight
+
+SCOPE = ("en", "", "model")
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(default_ttl=60)
+    cache.set("short", "a", size=1, ttl=10)
+    cache.set("default", "b", size=1)
+    now[0] += 30
+    assert cache.get("short") is None
+    assert cache.get("default") == "b"
+    assert cache.stats()["expirations"] == 1
+
+
+def test_non_positive_ttl_is_not_cached():
+    cache = ResponseCache()
+    cache.set("key", "value", size=1, ttl=0)
+    assert cache.get("key") is None
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", 1, size=1)
+    cache.set("b", 2, size=1)
+    cache.get("a")
+    cache.set("c", 3, size=1)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_budget_evicts_and_oversized_values_are_skipped():
+    cache = ResponseCache(max_bytes=10)
+    cache.set("a", 1, size=6)
+    cache.set("b", 2, size=6)
+    assert cache.get("a") is None and cache.get("b") == 2
+    cache.set("huge", 3, size=11)
+    assert cache.get("huge") is None
+    assert cache.stats()["bytes"] == 6
+
+
+def test_exact_key_keeps_word_order():
+    assert make_key("flights from warsaw to london", "en", None, "m") != make_key("flights from london to warsaw", "en", None, "m")
+    assert make_key("convert usd to eur", "en", None, "m") != make_key("convert eur to usd", "en", None, "m")
+    assert make_key("  Convert USD\tto EUR", "en", None, "m") == make_key("convert usd to eur", "en", None, "m")
+
+
+def test_follow_up_key_carries_a_context_digest():
+    context = [{"role": "user", "content": "best phone"}, {"role": "assistant", "content": "Pixel"}]
+    other = [{"role": "user", "content": "best laptop"}, {"role": "assistant", "content": "ThinkPad"}]
+    plain = make_key("which is cheaper", "en", None, "m")
+    keyed = make_key("which is cheaper", "en", None, "m", context)
+    assert keyed[:len(plain)] == plain and len(keyed) == len(plain) + 1
+    assert keyed == make_key("which is cheaper", "en", None, "m", list(context))
+    assert keyed != make_key("which is cheaper", "en", None, "m", other)
+
+
+def _indexed(*queries):
+    index = NearDuplicateIndex()
+    for query in queries:
+        index.add(query, *index.sketch(query, SCOPE))
+    return index
+
+
+def test_typo_matches_a_cached_query():
+    index = _indexed("porównaj telefony samsung")
+    assert index.find(*index.sketch("powownaj telefony samsung", SCOPE)) == "porównaj telefony samsung"
+
+
+@pytest.mark.parametrize("stored, query", [
+    ("flights from warsaw to london", "flights from london to warsaw"),
+    ("convert usd to eur", "convert eur to usd"),
+    ("price of iphone 15", "price of iphone 16"),
+    ("flights to warsaw tomorrow", "flights from warsaw tomorrow"),
+])
+def test_near_duplicates_must_keep_meaning(stored, query):
+    index = _indexed(stored)
+    assert index.find(*index.sketch(query, SCOPE)) is None
+
+
+def test_near_duplicates_are_scoped():
+    index = _indexed("porównaj telefony samsung")
+    assert index.find(*index.sketch("powownaj telefony samsung", ("pl", "", "model"))) is None
+
+
+def test_alignment_is_positional():
+    assert within_one_edit("telefony", "telefnoy")
+    assert aligned(("compare", "telefony"), ("compare", "telefnoy"))
+    assert not aligned(("warsaw", "london"), ("london", "warsaw"))
+    assert not aligned(("to", "warsaw"), ("do", "warsaw"))
+
+
+def test_single_flight_shares_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "reply"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["reply"] * 5
+    assert len(calls) == 1
+    assert (flight.leaders, flight.shared, len(flight)) == (1, 4, 0)
+
+
+def test_single_flight_shares_errors_and_forgets_the_key():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise RuntimeError("upstream down")
+
+    async def main():
+        return await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(flight) == 0
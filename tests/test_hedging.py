@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from src.core.hedging import LatencyStats, ModelChain, hedge
+
+
+def _attempt(delays, cancelled, failing=()):
+    async def attempt(model):
+        try:
+            await asyncio.sleep(delays[model])
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+        if model in failing:
+            raise RuntimeError(f"{model} failed")
+        return f"reply from {model}"
+    return attempt
+
+
+def _run(models, attempt, budget=0.02, stats=None):
+    async def main():
+        result = await hedge(models, attempt, lambda model: budget, stats or LatencyStats())
+        # Losers are awaited before hedge returns
+        assert [task for task in asyncio.all_tasks() if task is not asyncio.current_task()] == []
+        return result
+    return asyncio.run(main())
+
+
+def test_slow_model_is_hedged_and_cancelled():
+    cancelled = []
+    stats = LatencyStats()
+    result = _run(["slow", "fast"], _attempt({"slow": 1, "fast": 0.01}, cancelled), stats=stats)
+    assert result == ("fast", "reply from fast")
+    assert cancelled == ["slow"]
+    assert stats.count("fast") == 1 and stats.count("slow") == 0
+
+
+def test_failure_moves_on_without_waiting_for_the_budget():
+    cancelled = []
+    stats = LatencyStats()
+    result = _run(["broken", "backup"], _attempt({"broken": 0, "backup": 0}, cancelled, {"broken"}), budget=10, stats=stats)
+    assert result == ("backup", "reply from backup")
+    assert stats.stats()["broken"]["errors"] == 1
+
+
+def test_last_error_is_raised_when_every_model_fails():
+    with pytest.raises(RuntimeError, match="second failed"):
+        _run(["first", "second"], _attempt({"first": 0, "second": 0.01}, [], {"first", "second"}), budget=10)
+
+
+def test_budget_follows_observed_latency():
+    chain = ModelChain("primary", default_budget=4, min_budget=0.5, max_budget=15, min_samples=3)
+    stats = LatencyStats()
+    assert chain.budget("primary", stats) == 4
+    for seconds in (1.0, 2.0, 3.0):
+        stats.record("primary", seconds)
+    assert chain.budget("primary", stats) == 3.0
+    stats.record("primary", 100.0)
+    assert chain.budget("primary", stats) == 15
+    assert chain.models("unknown") == ["primary"]
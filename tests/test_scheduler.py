@@ -0,0 +1,121 @@
+import time
+import asyncio
+
+import httpx
+import pytest
+
+from src.core.scheduler import UpstreamBusy, UpstreamScheduler, client_identity, parse_retry_after
+
+
+def _response(status, **headers):
+    return httpx.Response(status, headers=headers)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after("Thu, 01 Jan 1970 00:00:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_client_identity_prefers_the_original_client():
+    assert client_identity("203.0.113.7, 10.0.0.1", "10.0.0.2") == "203.0.113.7"
+    assert client_identity(None, "10.0.0.2") == "10.0.0.2"
+
+
+def test_retry_after_is_honoured_and_429_pauses_the_key():
+    scheduler = UpstreamScheduler(max_retries=3)
+    before = time.monotonic()
+    assert scheduler.retry_delay(1, _response(429, **{"retry-after": "2"}), None) == 2.0
+    assert scheduler._paused_until >= before + 2
+    assert (scheduler.throttled, scheduler.retries) == (1, 1)
+
+
+def test_backoff_is_jittered_and_capped():
+    scheduler = UpstreamScheduler(base_delay=0.5, max_delay=1.0, max_retries=10)
+    for attempt in range(1, 8):
+        delay = scheduler.retry_delay(attempt, _response(503), None)
+        assert 0 <= delay <= min(1.0, 0.5 * 2 ** (attempt - 1))
+
+
+def test_no_retry_for_client_errors_exhausted_attempts_or_past_the_deadline():
+    scheduler = UpstreamScheduler(max_retries=2)
+    assert scheduler.retry_delay(1, _response(400), None) is None
+    assert scheduler.retry_delay(3, _response(503), None) is None
+    assert scheduler.retry_delay(1, _response(503, **{"retry-after": "10"}), time.monotonic() + 1) is None
+    assert scheduler.retries == 0
+
+
+def test_rate_limit_spaces_out_admissions():
+    scheduler = UpstreamScheduler(rps=20, max_concurrency=100)
+
+    async def main():
+        granted = []
+
+        async def one():
+            async with scheduler.slot():
+                granted.append(time.monotonic())
+
+        started = time.monotonic()
+        await asyncio.gather(*(one() for _ in range(30)))
+        return started, granted
+
+    started, granted = asyncio.run(main())
+    # A burst of 20, then the other 10 at 20 per second
+    assert granted[-1] - started >= 0.4
+
+
+def test_concurrency_cap_and_round_robin_between_clients():
+    scheduler = UpstreamScheduler(rps=0, max_concurrency=1)
+    order = []
+
+    async def one(client):
+        async with scheduler.slot(client):
+            order.append(client)
+            assert scheduler.active == 1
+            await asyncio.sleep(0)
+
+    async def main():
+        # "a" floods the queue first; once the first request is in, "b" gets every other slot
+        await asyncio.gather(*(one("a") for _ in range(4)), *(one("b") for _ in range(2)))
+
+    asyncio.run(main())
+    assert order == ["a", "a", "b", "a", "b", "a"]
+    assert scheduler.active == 0 and scheduler.queued == 0
+
+
+def test_admission_times_out_with_upstream_busy():
+    scheduler = UpstreamScheduler(rps=0, max_concurrency=1)
+
+    async def main():
+        await scheduler.acquire()
+        with pytest.raises(UpstreamBusy):
+            await scheduler.acquire(deadline=time.monotonic() + 0.01)
+        assert scheduler.queued == 0
+        scheduler.release()
+
+    asyncio.run(main())
+    assert scheduler.active == 0
+
+
+def test_send_retries_transient_errors_until_success():
+    scheduler = UpstreamScheduler(base_delay=0.001, max_delay=0.001)
+    statuses = [503, 502, 200]
+
+    async def factory():
+        return _response(statuses.pop(0))
+
+    response = asyncio.run(scheduler.send(factory))
+    assert response.status_code == 200
+    assert scheduler.retries == 2
+
+
+def test_send_returns_the_last_error_once_retries_run_out():
+    scheduler = UpstreamScheduler(max_retries=1, base_delay=0.001, max_delay=0.001)
+
+    async def factory():
+        return _response(500)
+
+    assert asyncio.run(scheduler.send(factory)).status_code == 500
+    assert scheduler.retries == 1
@@ -0,0 +1,94 @@
+import json
+import asyncio
+
+from src.core import sessions as sessions_module
+from src.core.assistant import Assistant
+from src.core.backends import MockBackend
+from src.core.sessions import SessionStore
+
+SESSION = "session-0001"
+
+
+class RecordingBackend(MockBackend):
+    """Mock backend remembering the messages of every upstream request."""
+
+    def __init__(self, reply: str = "answer: {query}"):
+        super().__init__(reply)
+        self.requests = []
+
+    def _handle(self, request):
+        self.requests.append(json.loads(request.content)["messages"])
+        return super()._handle(request)
+
+
+def _ask(assistant, query, **kwargs):
+    return asyncio.run(assistant.get_response(query, **kwargs))
+
+
+def test_store_keeps_the_last_turns_in_order():
+    store = SessionStore(max_messages=4, max_chars=5)
+    for turn in range(3):
+        store.record(SESSION, f"question {turn}", f"answer {turn}")
+    assert store.context(SESSION) == [
+        {"role": "user", "content": "quest"},
+        {"role": "assistant", "content": "answe"},
+        {"role": "user", "content": "quest"},
+        {"role": "assistant", "content": "answe"},
+    ]
+    assert store.context("unknown-session") == []
+
+
+def test_store_evicts_least_recently_used_and_idle_sessions(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sessions_module.time, "monotonic", lambda: now[0])
+    store = SessionStore(max_sessions=2, idle_ttl=60)
+    store.record("session-a", "q", "a")
+    store.record("session-b", "q", "a")
+    store.context("session-a")
+    store.record("session-c", "q", "a")
+    assert store.context("session-b") == []
+    assert len(store) == 2
+    now[0] += 61
+    assert store.context("session-a") == [] and len(store) == 0
+
+
+def test_session_ids_are_validated():
+    assert SessionStore.is_valid_id(SessionStore.new_id())
+    assert not SessionStore.is_valid_id("short")
+    assert not SessionStore.is_valid_id("../../etc/passwd")
+    assert not SessionStore.is_valid_id(None)
+
+
+def test_follow_ups_are_sent_with_the_session_history(monkeypatch):
+    monkeypatch.setenv("CACHE_ENABLED", "1")
+    backend = RecordingBackend()
+    assistant = Assistant(backend=backend)
+    _ask(assistant, "which phone is best", session_id=SESSION)
+    result = _ask(assistant, "which has the better camera", session_id=SESSION)
+    history = backend.requests[-1][1:-1]
+    assert [message["role"] for message in history] == ["user", "assistant"]
+    assert "which phone is best" in history[0]["content"]
+    assert "context" not in result
+
+
+def test_caller_context_is_never_dropped(monkeypatch):
+    monkeypatch.setenv("CACHE_ENABLED", "1")
+    backend = RecordingBackend()
+    assistant = Assistant(backend=backend)
+    context = [{"role": "user", "content": "best phone"}, {"role": "assistant", "content": "Pixel 9"}]
+    _ask(assistant, "ile kosztuje wersja pro", context=context, lang="pl")
+    assert [message["content"] for message in backend.requests[-1][1:-1]] == ["best phone", "Pixel 9"]
+
+
+def test_follow_ups_are_cached_per_conversation(monkeypatch):
+    monkeypatch.setenv("CACHE_ENABLED", "1")
+    backend = RecordingBackend()
+    assistant = Assistant(backend=backend)
+    phones = [{"role": "user", "content": "best phone"}, {"role": "assistant", "content": "Pixel 9"}]
+    laptops = [{"role": "user", "content": "best laptop"}, {"role": "assistant", "content": "ThinkPad"}]
+    _ask(assistant, "how much does the pro model cost", context=phones)
+    _ask(assistant, "how much does the pro model cost", context=list(phones))
+    assert len(backend.requests) == 1
+    _ask(assistant, "how much does the pro model cost", context=laptops)
+    _ask(assistant, "how much does the pro model cost")
+    assert len(backend.requests) == 3
@@ -0,0 +1,38 @@
+import asyncio
+
+from src.core.assistant import Assistant
+from src.core.backends import MockBackend
+from src.utils.cleaner import StreamingCleaner
+
+
+def _stream(assistant, query):
+    async def collect():
+        events = []
+        async for event, payload in assistant.stream_response(query):
+            events.append((event, payload))
+        return events
+    return asyncio.run(collect())
+
+
+def _joined(cleaner, deltas):
+    text = "".join(cleaner.feed(delta) for delta in deltas)
+    return text + cleaner.rest(cleaner.finish())
+
+
+def test_deltas_add_up_to_the_final_response(monkeypatch):
+    monkeypatch.setenv("CACHE_ENABLED", "0")
+    assistant = Assistant(backend=MockBackend("The answer to {query} is that it is hard to define"))
+    events = _stream(assistant, "What is a monad")
+    assert events[-1][0] == "done"
+    deltas = "".join(payload["text"] for event, payload in events if event == "delta")
+    assert deltas == events[-1][1]["response"]
+    assert deltas.endswith("hard to define")
+
+
+def test_cleaner_drops_filler_ending_but_keeps_held_text():
+    cleaner = StreamingCleaner()
+    deltas = ["  Rust is ", "a systems language. ", "Let me know if ", "you need more."]
+    assert _joined(cleaner, deltas) == cleaner.finish() == "Rust is a systems language."
+
+    cleaner = StreamingCleaner()
+    assert _joined(cleaner, ["Short ", "reply"]) == "Short reply"
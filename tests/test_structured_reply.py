@@ -0,0 +1,37 @@
+import json
+
+from app.services.structured_reply import error_reply, extract_json, fallback_reply, parse_structured_reply
+
+
+def test_json_is_found_in_fences_and_prose():
+    assert extract_json('```json\n{"name": "x"}\n```') == '{"name": "x"}'
+    assert extract_json('Here you go: {"name": "x"} Enjoy!') == '{"name": "x"}'
+    assert extract_json("no json here") is None
+
+
+def test_reply_is_normalized():
+    reply = parse_structured_reply(json.dumps({
+        "name": "Pixel 9",
+        "description": "A phone with a very long description",
+        "suggestions": ["Compare with iPhone", {"text": "Price", "actions": []}],
+        "actions": "not a list",
+        "price": 799
+    }), char_limit=10)
+    assert reply.description == ["A phone wi"]
+    assert reply.suggestions[0]["actions"] == [{"type": "chat", "label": "Ask More", "query": "Compare with iPhone"}]
+    assert reply.suggestions[1]["actions"] == []
+    assert reply.actions == []
+    assert json.loads(reply.to_json())["price"] == 799
+
+
+def test_defaults_are_not_shared_between_replies():
+    first = parse_structured_reply('{"name": "a"}')
+    first.description.append("changed")
+    assert parse_structured_reply('{"name": "b"}').description == []
+
+
+def test_invalid_json_falls_back_to_text():
+    assert parse_structured_reply('{"name": ') is None
+    reply = fallback_reply("```\nPlain answer\n```", char_limit=5)
+    assert reply.description == ["Plain"]
+    assert json.loads(error_reply("boom").to_json())["mode"] == "error"